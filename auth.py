@@ -1,22 +1,150 @@
 import streamlit as st
+import base64
 import hashlib
+import hmac
 import json
 import os
+import secrets
+import threading
+import time
 from datetime import datetime
 from users import USERS  # Import default users
 
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+# --- USER STORE --- #
+# users.json is the user index (username -> record). It is read once per
+# process and again only when the file changes. Passwords are hashed with
+# salted PBKDF2-SHA256; each record keeps its own iteration count, so raising
+# AUTH_PBKDF2_ITERATIONS upgrades hashes as users log in. A login pays for
+# one KDF run, for the user being checked only.
+USERS_PATH = "users.json"
+SECRET_PATH = os.path.join("data", "auth_secret")
+PBKDF2_ITERATIONS = int(os.environ.get("AUTH_PBKDF2_ITERATIONS", "600000"))
+TOKEN_TTL = int(os.environ.get("AUTH_TOKEN_TTL", str(7 * 24 * 3600)))
 
-def load_users():
-    users = {}
-    # Load default users first
-    for username, password in USERS.items():
-        users[username] = {
-            "password": hash_password(password),
-            "created_at": datetime.now().isoformat()
-        }
-    return users
+def hash_password(password, salt=None, iterations=PBKDF2_ITERATIONS):
+    salt = salt or secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), iterations).hex()
+    return f"pbkdf2_sha256${iterations}${salt}${digest}"
+
+def verify_password(password, stored):
+    if stored.startswith("pbkdf2_sha256$"):
+        _, iterations, salt, _ = stored.split("$")
+        return hmac.compare_digest(hash_password(password, salt, int(iterations)), stored)
+    # Unsalted SHA-256 records written by earlier versions
+    return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+
+def needs_rehash(stored):
+    return not stored.startswith(f"pbkdf2_sha256${PBKDF2_ITERATIONS}$")
+
+class UserStore:
+    def __init__(self, path=USERS_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.users = {}
+        self.mtime = None
+
+    def _refresh(self):
+        mtime = os.stat(self.path).st_mtime_ns if os.path.exists(self.path) else 0
+        if mtime != self.mtime:
+            try:
+                with open(self.path) as f:
+                    self.users = json.load(f)
+            except FileNotFoundError:
+                self.users = {}
+            self.mtime = mtime
+
+    def preload(self):
+        with self.lock:
+            self._refresh()
+
+    def usernames(self):
+        with self.lock:
+            self._refresh()
+            return sorted(self.users)
+
+    def get(self, username):
+        with self.lock:
+            self._refresh()
+            return self.users.get(username)
+
+    def set(self, username, record):
+        with self.lock:
+            self._refresh()
+            self.users[username] = record
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.users, f, indent=4)
+            os.replace(tmp_path, self.path)
+            self.mtime = os.stat(self.path).st_mtime_ns
+
+user_store = UserStore()
+
+def authenticate(username, password):
+    record = user_store.get(username)
+    if record is None:
+        # Built-in users from users.py get a stored record on first login
+        if username not in USERS or not hmac.compare_digest(password.encode(), USERS[username].encode()):
+            return False
+        record = {"password": "", "created_at": datetime.now().isoformat()}
+    elif not verify_password(password, record["password"]):
+        return False
+    if needs_rehash(record["password"]):
+        user_store.set(username, {**record, "password": hash_password(password)})
+    return True
+
+# --- SESSION TOKENS --- #
+# A successful login keeps a signed token in session state, never in the
+# URL, where it would end up in browser history, shared links and proxy
+# logs. Reruns and websocket reconnects reuse the session, so only the cheap
+# signature check runs, never the KDF. Tokens expire after AUTH_TOKEN_TTL
+# seconds and stop working when the user's password hash changes, which
+# ends every open session for that user. A reload or a new tab starts a new
+# session and asks for the password again.
+_secret = None
+
+def token_secret():
+    global _secret
+    if _secret is None:
+        secret = os.environ.get("AUTH_SECRET")
+        if secret:
+            _secret = secret.encode()
+        else:
+            os.makedirs(os.path.dirname(SECRET_PATH), exist_ok=True)
+            try:
+                # Created once, readable by the server's user only
+                fd = os.open(SECRET_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with os.fdopen(fd, "w") as f:
+                    f.write(secrets.token_hex(32))
+            except FileExistsError:
+                pass
+            with open(SECRET_PATH) as f:
+                _secret = f.read().strip().encode()
+    return _secret
+
+def _sign(body):
+    return hmac.new(token_secret(), body.encode(), hashlib.sha256).hexdigest()
+
+def _stamp(username):
+    record = user_store.get(username)
+    return record["password"][-8:] if record else ""
+
+def issue_token(username):
+    payload = f"{username}|{int(time.time()) + TOKEN_TTL}|{_stamp(username)}"
+    body = base64.urlsafe_b64encode(payload.encode()).decode()
+    return f"{body}.{_sign(body)}"
+
+def verify_token(token):
+    body, _, signature = token.rpartition(".")
+    if not body or not hmac.compare_digest(_sign(body), signature):
+        return None
+    try:
+        username, expires, stamp = base64.urlsafe_b64decode(body).decode().rsplit("|", 2)
+        expires = int(expires)
+    except ValueError:
+        return None
+    if expires < time.time() or not stamp or stamp != _stamp(username):
+        return None
+    return username
 
 def login():
     st.subheader("🔐 Login")
@@ -24,20 +152,28 @@ def login():
     password = st.text_input("Password", type="password")
 
     if st.button("Login"):
-        users = load_users()
-        if username in users and users[username]["password"] == hash_password(password):
+        if authenticate(username, password):
             st.session_state.logged_in = True
             st.session_state.username = username
+            st.session_state.session_token = issue_token(username)
             st.success(f"Welcome back, {username}!")
             st.rerun()
         else:
             st.error("Invalid credentials.")
 
 def auth_flow():
+    # Links saved before tokens left the URL still carry one; it is dropped
+    # without being honoured
+    if "session" in st.query_params:
+        del st.query_params["session"]
     if "logged_in" not in st.session_state:
         st.session_state.logged_in = False
+    token = st.session_state.get("session_token")
+    if st.session_state.logged_in and token and verify_token(token) != st.session_state.username:
+        st.session_state.logged_in = False
+        del st.session_state.session_token
 
     if not st.session_state.logged_in:
         st.sidebar.title("🔐 User Access")
         login()
-        st.stop()
\ No newline at end of file
+        st.stop()
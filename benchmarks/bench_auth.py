@@ -0,0 +1,54 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import auth
+
+# Login cost against a large users.json: loading the index, one password
+# check at the configured PBKDF2 cost, and the session-token check that
+# every later rerun does instead.
+#   AUTH_PBKDF2_ITERATIONS=600000 python -m benchmarks.bench_auth --users 100000
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "users.json")
+        # Every record shares one hash; only the lookup and the KDF matter here
+        record = {"password": auth.hash_password("secret"), "created_at": "2025-01-01T00:00:00"}
+        with open(path, "w") as f:
+            json.dump({f"user{i}": record for i in range(args.users)}, f)
+        auth.user_store = auth.UserStore(path)
+        auth.SECRET_PATH = os.path.join(tmp, "auth_secret")
+        user = f"user{args.users - 1}"
+
+        _, load_ms = timed(lambda: auth.user_store.get(user))
+        ok, login_ms = timed(lambda: auth.authenticate(user, "secret"), repeat=3)
+        _, wrong_ms = timed(lambda: auth.authenticate(user, "wrong"), repeat=3)
+        _, unknown_ms = timed(lambda: auth.authenticate("nobody", "secret"), repeat=3)
+        token = auth.issue_token(user)
+        name, token_ms = timed(lambda: auth.verify_token(token), repeat=1000)
+
+    assert ok and name == user
+    print(f"users:                 {args.users}")
+    print(f"PBKDF2 iterations:     {auth.PBKDF2_ITERATIONS}")
+    print(f"index load (once):     {load_ms:>9.1f} ms")
+    print(f"login:                 {login_ms:>9.1f} ms")
+    print(f"wrong password:        {wrong_ms:>9.1f} ms")
+    print(f"unknown user:          {unknown_ms:>9.3f} ms")
+    print(f"token check (rerun):   {token_ms:>9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import time
+import numpy as np
+from categorizer import KEYWORDS, Categorizer
+
+# Auto-categorization throughput on Razorpay-style descriptions: a cold batch
+# (every merchant normalized and classified) and a warm one served from the cache.
+#   python -m benchmarks.bench_categorizer --sizes 10000 1000000
+
+BRANDS = [word for words in KEYWORDS.values() for word in words] + ["sharma traders", "cityline", "raj enterprises"]
+SUFFIXES = ["", " Pvt Ltd", " India", "*Order", " UPI", " Payments"]
+
+
+def make_descriptions(n, merchants=50_000, seed=0):
+    rng = np.random.default_rng(seed)
+    brand = rng.integers(0, len(BRANDS), merchants)
+    suffix = rng.integers(0, len(SUFFIXES), merchants)
+    branch = rng.integers(1, 999, merchants)
+    names = np.array([f"{BRANDS[b].upper()}{SUFFIXES[s]} {c}" for b, s, c in zip(brand, suffix, branch)], dtype=object)
+    return names[rng.integers(0, merchants, n)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--merchants", type=int, default=50_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'cold s':>8} {'warm s':>8} {'categorized':>12}")
+    for n in args.sizes:
+        descriptions = make_descriptions(n, args.merchants)
+        categorizer = Categorizer()
+        start = time.perf_counter()
+        categories = categorizer.classify(descriptions)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        categorizer.classify(descriptions)
+        warm = time.perf_counter() - start
+        print(f"{n:>12} {cold:>8.2f} {warm:>8.2f} {(categories != '').mean():>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import time
+import numpy as np
+from chatbot import ChatIndex, chat_with_bot
+from benchmarks.ledger import make_ledger
+
+# Index build cost and per-question answer latency for the chatbot.
+#   python -m benchmarks.bench_chatbot --sizes 10000 1000000 10000000
+
+QUESTIONS = [
+    "How much did I spend on Rent?",
+    "how much did i spend on food delivery",
+    "How much did I spend on Shopping this year?",
+    "How much did I spend in March 2024?",
+    "how much did i spend in 2023",
+    "how much did i spend in december",
+    "Show me my weekly spending",
+    "what did I spend this week",
+    "Give me a nudge to save",
+    "any tips?",
+    "hello",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'index build ms':>15} {'answer p50 µs':>14} {'answer p99 µs':>14}")
+    for n in args.sizes:
+        df = make_ledger(n)
+        start = time.perf_counter()
+        index = ChatIndex(df)
+        build = time.perf_counter() - start
+        latencies = []
+        for _ in range(args.rounds):
+            for question in QUESTIONS:
+                start = time.perf_counter()
+                chat_with_bot(question, df, index)
+                latencies.append(time.perf_counter() - start)
+        latencies = np.array(latencies) * 1e6
+        print(f"{n:>12} {build * 1000:>15.1f} {np.percentile(latencies, 50):>14.1f} "
+              f"{np.percentile(latencies, 99):>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
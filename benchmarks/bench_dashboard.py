@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import metrics
+import store
+from generate_dataset import generate
+
+# Headless dashboard runs on a generated single-user partition at each size.
+# Each size renders dashboard.py itself under AppTest with METRICS=1 and
+# reads every section's time from the metrics.section spans, so the numbers
+# always come from the code the dashboard runs. A cold render is timed, then
+# a plain rerun, then the QUESTIONS asked through the chat box. A second,
+# fresh process repeats the cold render under tracemalloc for each section's
+# peak Python/NumPy allocation (Arrow's pool peak is reported separately).
+# Results are appended to a JSONL history, one line per (size, section), and
+# compared with earlier runs of other commits: a section slower than the
+# baseline median by more than --threshold (and by at least --min-ms) is
+# flagged, and --fail-on-regression turns flags into a non-zero exit.
+#   python -m benchmarks.bench_dashboard --sizes 10000 1000000 10000000
+#   python -m benchmarks.bench_dashboard --sizes 10000 --fail-on-regression
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY = os.path.join(ROOT, "benchmarks", "history.jsonl")
+USER = "user000000"
+QUESTIONS = [
+    "How much did I spend on Rent?",
+    "How much did I spend in March 2024?",
+    "Show me my weekly spending",
+    "Give me a nudge to save",
+]
+
+
+# --- ONE RENDER (in a fresh process) --- #
+def section_totals():
+    return {span[len("section:"):]: total for span, _, _, total in metrics.span_summary()
+            if span.startswith("section:")}
+
+
+def since(before, after):
+    return {name: total - before.get(name, 0.0) for name, total in after.items() if total > before.get(name, 0.0)}
+
+
+def open_app(user, users_dir):
+    from streamlit.testing.v1 import AppTest
+    store.USERS_DIR = users_dir
+    at = AppTest.from_file(os.path.join(ROOT, "dashboard.py"), default_timeout=3600)
+    at.session_state.logged_in = True
+    at.session_state.username = user
+    at.session_state.razorpay_configured = True
+    return at
+
+
+def checked_run(at):
+    at.run()
+    if at.exception:
+        sys.exit("dashboard raised: " + at.exception[0].message)
+
+
+def run_timings(user, users_dir):
+    at = open_app(user, users_dir)
+    before, start = section_totals(), time.perf_counter()
+    checked_run(at)
+    timings = since(before, section_totals())
+    timings["render"] = time.perf_counter() - start
+    start = time.perf_counter()
+    checked_run(at)
+    timings["rerun"] = time.perf_counter() - start
+    # The first question builds the chat index for the selection
+    before = section_totals()
+    for question in QUESTIONS:
+        at.chat_input[0].set_value(question)
+        checked_run(at)
+    timings["questions"] = since(before, section_totals()).get("chatbot", 0.0)
+    return {"seconds": timings}
+
+
+def run_peaks(user, users_dir):
+    # Each lap of metrics.section records the peak allocation above what
+    # was live when the section started
+    peaks, lap = {}, [None, 0]
+    section = metrics.section
+
+    def traced_section(name):
+        current, peak = tracemalloc.get_traced_memory()
+        if lap[0] is not None:
+            peaks[lap[0]] = max(peaks.get(lap[0], 0), peak - lap[1])
+        tracemalloc.reset_peak()
+        lap[:] = [name, current]
+        section(name)
+
+    metrics.section = traced_section
+    at = open_app(user, users_dir)
+    tracemalloc.start()
+    checked_run(at)
+    tracemalloc.stop()
+    return {"peak_bytes": peaks, "arrow_pool_bytes": pa.default_memory_pool().max_memory()}
+
+
+def measure(mode, user, users_dir):
+    env = {**os.environ, "METRICS": "1", "METRICS_PORT": "0"}
+    result = subprocess.run([sys.executable, "-m", "benchmarks.bench_dashboard", "--one", mode, user, users_dir],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def git_revision():
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return git("rev-parse", "--short", "HEAD") or "unknown", bool(git("status", "--porcelain", "--untracked-files=no"))
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def baseline(history, commit, rows, section, runs=5):
+    # Median of the latest runs of this (rows, section) on other commits
+    seconds = [r["seconds"] for r in history if r["rows"] == rows and r["section"] == section and r["commit"] != commit]
+    return float(np.median(seconds[-runs:])) if seconds else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--history", default=HISTORY)
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown vs baseline")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="ignore slowdowns smaller than this")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--one", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.one:
+        mode, user, users_dir = args.one
+        print(json.dumps((run_timings if mode == "timings" else run_peaks)(user, users_dir)))
+        return
+
+    commit, dirty = git_revision()
+    history = load_history(args.history)
+    at = datetime.now().isoformat(timespec="seconds")
+    records = []
+    print(f"{'rows':>10} {'section':<10} {'ms':>10} {'peak MB':>9} {'baseline ms':>12}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store.USERS_DIR = tmp
+            generate(users=1, rows=n, fmt="store")
+            timings = measure("timings", USER, tmp)["seconds"]
+            memory = measure("peaks", USER, tmp)
+            peaks = memory["peak_bytes"]
+        for section, seconds in timings.items():
+            base = baseline(history, commit, n, section)
+            regressed = (base is not None and seconds > base * (1 + args.threshold)
+                         and (seconds - base) * 1000 >= args.min_ms)
+            record = {
+                "at": at, "commit": commit, "dirty": dirty, "rows": n, "section": section,
+                "seconds": round(seconds, 6), "peak_mb": round(peaks[section] / 2**20, 2) if section in peaks else None,
+                "baseline": base, "regressed": regressed,
+                "python": platform.python_version(), "pandas": pd.__version__, "cpus": os.cpu_count(),
+            }
+            records.append(record)
+            flag = "  REGRESSION" if regressed else ""
+            base_ms = f"{base * 1000:>12.1f}" if base is not None else f"{'-':>12}"
+            peak = f"{record['peak_mb']:>9.1f}" if record["peak_mb"] is not None else f"{'-':>9}"
+            print(f"{n:>10} {section:<10} {seconds * 1000:>10.1f} {peak} {base_ms}{flag}")
+        print(f"{n:>10} {'arrow pool':<10} {'':>10} {memory['arrow_pool_bytes'] / 2**20:>9.1f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, "a") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    regressions = [r for r in records if r["regressed"]]
+    if regressions:
+        print(f"{len(regressions)} section(s) slower than baseline by more than {args.threshold:.0%}")
+    sys.exit(1 if regressions and args.fail_on_regression else 0)
+
+
+if __name__ == "__main__":
+    main()
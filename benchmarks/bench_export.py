@@ -0,0 +1,73 @@
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import exports
+import rollups
+import store
+from filters import FilterIndex
+from generate_dataset import generate
+
+# Streaming export of a whole single-user ledger in each format. Resident
+# memory is sampled while the export runs and reported above what the
+# loaded frame already holds, so it should stay flat as --rows grows. Each
+# format runs in a fresh process, so one run's peak cannot hide the next.
+#   python -m benchmarks.bench_export --rows 200000 2000000
+USER = "user000000"
+
+
+def resident_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def run_one(users_dir, fmt, out_dir):
+    store.USERS_DIR = users_dir
+    df = store.load_transactions(USER)
+    filter_index = FilterIndex(df)
+    cells = rollups.RollupCube.from_frame(df, USER).frame()
+    gc.collect()
+    base = peak = resident_mb()
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.wait(0.005):
+            peak = max(peak, resident_mb())
+
+    threading.Thread(target=sample, daemon=True).start()
+    start = time.perf_counter()
+    paths = exports.export_transactions(filter_index.chunks(exports.CHUNK_ROWS), cells, fmt, directory=out_dir)
+    seconds = time.perf_counter() - start
+    done.set()
+    size = sum(os.path.getsize(path) for path in paths) / 2**20
+    print(f"{len(df):>10} {fmt:<8} {seconds:>8.2f} {size:>9.1f} {len(paths):>6} {peak - base:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[200_000, 2_000_000])
+    parser.add_argument("--formats", nargs="+", default=exports.FORMATS)
+    parser.add_argument("--one", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.one:
+        run_one(*args.one)
+        return
+
+    print(f"{'rows':>10} {'format':<8} {'seconds':>8} {'MB out':>9} {'files':>6} {'extra MB':>10}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            users_dir = os.path.join(tmp, "users")
+            store.USERS_DIR = users_dir
+            generate(users=1, rows=rows, fmt="store")
+            for fmt in args.formats:
+                subprocess.run([sys.executable, "-m", "benchmarks.bench_export", "--one", users_dir, fmt,
+                                os.path.join(tmp, "exports")], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import time
+import pandas as pd
+from filters import FilterIndex
+from benchmarks.ledger import make_ledger
+
+# Compares the dashboard's original sidebar filter expression with FilterIndex.
+#   python -m benchmarks.bench_filters --sizes 10000 1000000 10000000
+
+
+def naive_filter(df, selected_type, selected_category, date_range):
+    return df[
+        (df["type"].isin(selected_type)) &
+        (df["category"].isin(selected_category)) &
+        (df["datetime"].dt.date >= date_range[0]) &
+        (df["datetime"].dt.date <= date_range[1])
+    ]
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'case':<22} {'naive ms':>10} {'index ms':>10} {'speedup':>8}")
+    for n in args.sizes:
+        df = make_ledger(n)
+        start, end = df["datetime"].iloc[n // 4].date(), df["datetime"].iloc[3 * n // 4].date()
+        all_types = list(df["type"].unique())
+        all_categories = list(df["category"].unique())
+        build, index = best_of(lambda: FilterIndex(df), 1)
+        cases = {
+            "all selected": (all_types, all_categories, (start, end)),
+            "3 categories": (all_types, all_categories[:3], (start, end)),
+            "1 type, 1 month": (all_types[:1], all_categories, (start, start + pd.Timedelta(days=30))),
+        }
+        print(f"{n:>12} {'index build':<22} {'':>10} {build * 1000:>10.1f}")
+        for name, (types, categories, dates) in cases.items():
+            naive_time, expected = best_of(lambda: naive_filter(df, types, categories, dates), args.repeat)
+            index_time, got = best_of(lambda: index.select(types, categories, *dates), args.repeat)
+            assert len(got) == len(expected) and got["amount"].sum() == expected["amount"].sum()
+            print(f"{n:>12} {name:<22} {naive_time * 1000:>10.1f} {index_time * 1000:>10.3f} "
+                  f"{naive_time / index_time:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
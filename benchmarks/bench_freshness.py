@@ -0,0 +1,100 @@
+import argparse
+import tempfile
+import threading
+import time
+import numpy as np
+import rollups
+import store
+from datacache import DataCache
+from ingest_service import IngestService
+from benchmarks.ledger import make_ledger
+from benchmarks.razorpay_stub import StubState, start_stub
+
+# Capture-to-screen freshness: payments are created on the local Razorpay
+# stub, the ingest service polls them into the user's partition, and a
+# simulated session checks the store version every --refresh seconds the way
+# the dashboard's live-refresh fragment does, then brings its cached frame
+# and rollup cube up to date and reads the total. Lag is measured per payment
+# from creation on the stub to the refresh that put it in the total.
+#   python -m benchmarks.bench_freshness --base-rows 1000000 --duration 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--rate", type=float, default=20.0, help="new payments per second")
+    parser.add_argument("--base-rows", type=int, default=100_000, help="rows already in the partition")
+    parser.add_argument("--refresh", type=float, default=5.0, help="session version check interval")
+    args = parser.parse_args()
+
+    state = StubState()
+    server, _ = start_stub(state)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    user = "bench"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store.USERS_DIR = tmp
+        ledger = make_ledger(args.base_rows)
+        ledger["ts"] = ledger.pop("datetime").to_numpy().view("int64")
+        store.write_table(store.to_table(ledger), store.payments_path(user))
+
+        cache = DataCache()
+
+        def open_view(version):
+            df = cache.get("store", user, version, lambda: store.load_transactions(user),
+                           lambda df, old: store.refresh_transactions(df, user, old, version))
+
+            def update(cube, old):
+                rows = store.appended_rows(user, old, version)
+                return None if rows is None else cube.extended(rows, user)
+            cube = cache.get("cube", user, version, lambda: rollups.RollupCube.from_frame(df, user), update)
+            return df, cube
+
+        start = time.perf_counter()
+        version = store.store_version(user)
+        df, cube = open_view(version)
+        cold = time.perf_counter() - start
+
+        service = IngestService(base_url=base_url)
+        service.register(user, "key", "secret")
+        stop = threading.Event()
+
+        def produce():
+            while not stop.wait(1.0):
+                state.add_payments(int(args.rate))
+
+        threading.Thread(target=produce, daemon=True).start()
+        shown = set()
+        lags = []
+        refreshes = []
+        deadline = time.time() + args.duration
+        while time.time() < deadline:
+            time.sleep(args.refresh)
+            latest = store.store_version(user)
+            if latest == version:
+                continue
+            start = time.perf_counter()
+            df, cube = open_view(latest)
+            rollups.totals(cube.frame())
+            refreshes.append(time.perf_counter() - start)
+            now = time.time()
+            ids = df["txn_id"]
+            new_ids = set(ids[ids.str.startswith("pay_stub")]) - shown
+            lags.extend(now - state.created_wall[txn_id] for txn_id in new_ids)
+            shown |= new_ids
+            version = latest
+        stop.set()
+        service.stop()
+    server.shutdown()
+
+    lags = np.array(lags) if lags else np.zeros(1)
+    refreshes = np.array(refreshes) if refreshes else np.zeros(1)
+    print(f"base rows:              {args.base_rows}")
+    print(f"cold load:              {cold * 1000:.1f} ms")
+    print(f"payments on screen:     {len(shown)} of {len(state.payments)}")
+    print(f"refresh p50/max:        {np.percentile(refreshes, 50) * 1000:.1f} / {refreshes.max() * 1000:.1f} ms")
+    print(f"capture-to-screen p50/p95/max: {np.percentile(lags, 50):.2f} / {np.percentile(lags, 95):.2f} / {lags.max():.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import time
+import metrics
+
+# Per-call cost of the instrumentation primitives with metrics off (the
+# default) and on. A dashboard rerun makes a few dozen of these calls, so
+# the off column times ~50 is what every rerun pays for the hooks.
+#   python -m benchmarks.bench_metrics --calls 1000000
+
+
+def per_call(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def noop():
+    pass
+
+
+def probes():
+    def span():
+        with metrics.span("bench"):
+            pass
+
+    def inc():
+        metrics.inc("bench_total", kind="store", result="hit")
+
+    def section():
+        metrics.section("bench")
+
+    timed = metrics.timed("bench_timed")(noop)
+    return [("span", span), ("inc", inc), ("section", section), ("timed call", timed)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    results = {}
+    for enabled in (False, True):
+        metrics.ENABLED = enabled
+        metrics.start_run()
+        results[enabled] = [(name, per_call(fn, args.calls)) for name, fn in probes()]
+        metrics.end_run()
+    baseline = per_call(noop, args.calls)
+    print(f"{'probe':<12} {'off ns':>8} {'on ns':>8}")
+    for (name, off), (_, on) in zip(results[False], results[True]):
+        print(f"{name:<12} {off:>8.0f} {on:>8.0f}")
+    print(f"{'bare call':<12} {baseline:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
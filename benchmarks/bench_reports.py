@@ -0,0 +1,47 @@
+import argparse
+import os
+import tempfile
+import time
+import reports
+import store
+from generate_dataset import generate
+
+# Batch statement rendering over generated users: a cold run that draws every
+# report, a second run that finds nothing changed, and a run after one user
+# gets a new tag, which redraws only that user's statement.
+#   python -m benchmarks.bench_reports --users 50 --rows 2000000 --workers 4
+
+
+def timed_run(label, **kwargs):
+    start = time.perf_counter()
+    summary = reports.render_reports(**kwargs)
+    seconds = time.perf_counter() - start
+    per_report = seconds / summary["rendered"] * 1000 if summary["rendered"] else 0
+    print(f"{label:<10} rendered {summary['rendered']:>5}  skipped {summary['skipped']:>5}  "
+          f"{seconds:>7.2f} s  ({per_report:.0f} ms per report)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=500_000, help="rows across all users")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--format", choices=["png", "pdf"], default="png")
+    parser.add_argument("--month", default="2024-06")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store.USERS_DIR = os.path.join(tmp, "users")
+        generate(users=args.users, rows=args.rows, fmt="store")
+        # Generated users are not in users.json, so they are named explicitly
+        users = [f"user{i:06d}" for i in range(args.users)]
+        options = dict(users=users, month=args.month, out=os.path.join(tmp, "reports"), fmt=args.format,
+                       workers=args.workers)
+        timed_run("cold", **options)
+        timed_run("unchanged", **options)
+        store.record_tags(["bench"], "Rent", users[0])
+        timed_run("one tag", **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+# Cold-start report: what each module the dashboard imports costs on a fresh
+# interpreter, and how long a new session takes to reach its first paint.
+# Budgets make it usable as a regression check (non-zero exit when exceeded).
+#   python -m benchmarks.bench_startup --user shatwik --max-render-ms 3000
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = [
+    "streamlit", "pandas", "pyarrow.feather", "store", "rollups", "filters", "forecast",
+    "chatbot", "nudges", "categorizer", "auth",
+    # Deferred: only the sections that need them import these
+    "ingest_service", "matplotlib.figure", "seaborn",
+]
+DEFERRED = {"ingest_service", "matplotlib.figure", "seaborn", "matplotlib.pyplot", "requests"}
+
+RENDER = """
+import sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("dashboard.py", default_timeout=600)
+at.session_state.logged_in = True
+at.session_state.username = sys.argv[1]
+at.session_state.razorpay_configured = True
+ready = time.perf_counter()
+at.run()
+first = time.perf_counter()
+at.run()
+second = time.perf_counter()
+if at.exception:
+    sys.exit("dashboard raised: " + at.exception[0].message)
+print((ready - start) * 1000, (first - ready) * 1000, (second - first) * 1000)
+"""
+
+
+def import_ms(module):
+    # -X importtime reports cumulative microseconds per module on stderr;
+    # pandas/streamlit are preloaded so each row is the module's own cost
+    preload = "import pandas, streamlit; " if module not in ("pandas", "streamlit") else ""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"{preload}import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    pattern = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|\s*" + re.escape(module) + r"$")
+    for line in result.stderr.splitlines():
+        match = pattern.search(line)
+        if match:
+            return int(match.group(1)) / 1000
+    return 0.0
+
+
+def eager_imports():
+    # Deferred modules that still get imported just by loading the dashboard's imports
+    names = ", ".join(m for m in MODULES if m not in DEFERRED)
+    code = f"import sys; import {names}; print(' '.join(sorted(m for m in {sorted(DEFERRED)!r} if m in sys.modules)))"
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout.split()
+
+
+def render_ms(user):
+    result = subprocess.run([sys.executable, "-c", RENDER, user], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(result.stderr.strip().splitlines()[-1])
+    return [float(v) for v in result.stdout.split()[-3:]]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--user", default="shatwik")
+    parser.add_argument("--max-import-ms", type=float, default=None, help="budget for the eager imports")
+    parser.add_argument("--max-render-ms", type=float, default=None, help="budget for the first render")
+    args = parser.parse_args()
+
+    print(f"{'module':<20} {'import ms':>10}")
+    eager = 0.0
+    for module in MODULES:
+        ms = import_ms(module)
+        if module not in DEFERRED and module not in ("streamlit", "pandas"):
+            eager += ms
+        print(f"{module:<20} {ms:>10.1f}{'  (deferred)' if module in DEFERRED else ''}")
+    print(f"{'app modules total':<20} {eager:>10.1f}")
+
+    leaked = eager_imports()
+    if leaked:
+        print("deferred modules imported eagerly:", ", ".join(leaked))
+
+    start = time.perf_counter()
+    setup, first, second = render_ms(args.user)
+    print(f"\ntest harness import {setup:>8.1f} ms")
+    print(f"first render        {first:>8.1f} ms")
+    print(f"warm rerun          {second:>8.1f} ms")
+    print(f"wall (fresh process){(time.perf_counter() - start) * 1000:>8.1f} ms")
+
+    failed = bool(leaked)
+    if args.max_import_ms is not None and eager > args.max_import_ms:
+        print(f"REGRESSION: app imports took {eager:.1f} ms (budget {args.max_import_ms:.1f} ms)")
+        failed = True
+    if args.max_render_ms is not None and first > args.max_render_ms:
+        print(f"REGRESSION: first render took {first:.1f} ms (budget {args.max_render_ms:.1f} ms)")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
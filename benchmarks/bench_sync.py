@@ -0,0 +1,71 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+from razorpay_sync import RazorpaySync
+from benchmarks.razorpay_stub import StubState, start_stub
+
+# Drives RazorpaySync against the local stub and reports requests per new
+# payment and capture-to-ingest latency.
+#   python -m benchmarks.bench_sync --duration 10 --rate 50
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--rate", type=float, default=20.0, help="new payments per second")
+    parser.add_argument("--backlog", type=int, default=1000, help="payments present before the first poll")
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth request with 429")
+    parser.add_argument("--min-interval", type=float, default=0.2)
+    args = parser.parse_args()
+
+    state = StubState(fail_every=args.fail_every)
+    state.add_payments(args.backlog)
+    server, _ = start_stub(state)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    seen = set()
+    latencies = []
+
+    def on_payments(items):
+        now = time.time()
+        new = [item for item in items if item["id"] not in seen]
+        for item in new:
+            seen.add(item["id"])
+            latencies.append(now - state.created_wall[item["id"]])
+        return len(new)
+
+    stop = threading.Event()
+
+    def produce():
+        while not stop.wait(1.0):
+            state.add_payments(int(args.rate))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sync = RazorpaySync("key", "secret", on_payments, base_url=base_url,
+                            cursor_path=os.path.join(tmp, "cursor.json"),
+                            min_interval=args.min_interval, max_idle_interval=2.0, max_backoff=2.0)
+        producer = threading.Thread(target=produce, daemon=True)
+        poller = threading.Thread(target=sync.run, args=(stop,), daemon=True)
+        producer.start()
+        poller.start()
+        time.sleep(args.duration)
+        stop.set()
+        poller.join()
+    server.shutdown()
+
+    backlog_latency = np.array(latencies[:args.backlog]) if latencies else np.zeros(1)
+    live_latency = np.array(latencies[args.backlog:]) if len(latencies) > args.backlog else np.zeros(1)
+    print(f"payments created:      {len(state.payments)}")
+    print(f"payments ingested:     {len(seen)}")
+    print(f"HTTP requests:         {state.requests}")
+    print(f"requests per payment:  {state.requests / max(len(seen), 1):.3f}")
+    print(f"backlog catch-up:      {backlog_latency.max() * 1000:.1f} ms")
+    print(f"live latency p50/p95:  {np.percentile(live_latency, 50) * 1000:.1f} / "
+          f"{np.percentile(live_latency, 95) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import os
+import resource
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import uploads
+from benchmarks.ledger import CATEGORIES
+
+# Streaming upload throughput and memory ceiling on a bank-export-shaped CSV.
+# Peak RSS should stay flat as --rows grows.
+#   python -m benchmarks.bench_upload --rows 6000000
+
+
+def write_export(path, rows, seed=0, chunk=200_000):
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        ts = pd.Timestamp("2020-01-01").value + rng.integers(0, 4 * 365 * 86_400, n) * 1_000_000_000
+        pd.DataFrame({
+            "datetime": pd.to_datetime(ts).strftime("%Y-%m-%d %H:%M:%S"),
+            "category": rng.choice(CATEGORIES, n),
+            "amount": rng.uniform(1, 5000, n).round(2),
+            "description": "NEFT/UPI narration text for a bank statement line",
+            "type": rng.choice(["need", "want"], n),
+        }).to_csv(path, mode="a", header=start == 0, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "export.csv")
+        write_export(path, args.rows)
+        size = os.path.getsize(path) / 2**20
+        uploads.store.USERS_DIR = os.path.join(tmp, "users")
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        start = time.perf_counter()
+        summary = uploads.ingest_upload(path, "bench", file_id="bench")
+        elapsed = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{'file MB':>8} {'rows':>10} {'seconds':>8} {'MB/s':>7} {'arrow peak MB':>14} {'peak RSS MB':>12}")
+    print(f"{size:>8.0f} {summary['rows']:>10} {elapsed:>8.1f} {size / elapsed:>7.0f} "
+          f"{pa.default_memory_pool().max_memory() / 2**20:>14.0f} {max(rss_before, rss_after):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+CATEGORIES = ["Groceries", "Rent", "Utilities", "Transport", "Healthcare", "Dining Out",
+              "Shopping", "Entertainment", "Travel", "Food Delivery", "Subscriptions"]
+
+
+def make_ledger(n, seed=0, start="2022-01-01", days=3 * 365):
+    # Store-shaped synthetic ledger for benchmarks, sorted by time
+    rng = np.random.default_rng(seed)
+    start_ns = pd.Timestamp(start).value
+    ts = np.sort(start_ns + rng.integers(0, days * 86_400, n) * 1_000_000_000)
+    category = pd.Categorical.from_codes(rng.integers(0, len(CATEGORIES), n), CATEGORIES)
+    kind = pd.Categorical.from_codes(rng.integers(0, 2, n), ["need", "want"])
+    datetime = pd.Series(ts.view("datetime64[ns]"))
+    return pd.DataFrame({
+        "txn_id": pd.RangeIndex(n).astype(str),
+        "datetime": datetime,
+        "amount": np.round(rng.uniform(100, 5000, n), 2),
+        "category": category,
+        "type": kind,
+        "app": "",
+        "description": "",
+        "date": datetime.dt.normalize(),
+    })
@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Minimal stand-in for GET /v1/payments: honours from/to/count/skip, returns
+# newest first, can inject 429/500 responses and can capture a payment later.
+
+
+class StubState:
+    def __init__(self, fail_every=0, fail_status=429):
+        self.lock = threading.Lock()
+        self.payments = []
+        self.created_wall = {}
+        self.requests = 0
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+
+    def add_payments(self, n, status="captured", description="Stub merchant", created_at=None):
+        now = time.time() if created_at is None else created_at
+        with self.lock:
+            start = len(self.payments)
+            for i in range(start, start + n):
+                payment_id = f"pay_stub{i:010d}"
+                self.payments.append({
+                    "id": payment_id,
+                    "entity": "payment",
+                    "amount": 100 * (100 + i % 900),
+                    "status": status,
+                    "description": description,
+                    "created_at": int(now),
+                })
+                self.created_wall[payment_id] = now
+
+    def set_status(self, payment_id, status):
+        with self.lock:
+            for payment in self.payments:
+                if payment["id"] == payment_id:
+                    payment["status"] = status
+
+    def query(self, params):
+        start = int(params.get("from", 0))
+        end = int(params.get("to", 2**62))
+        count = min(int(params.get("count", 10)), 100)
+        skip = int(params.get("skip", 0))
+        with self.lock:
+            window = [p for p in self.payments if start <= p["created_at"] <= end]
+        window.sort(key=lambda p: p["created_at"], reverse=True)
+        return window[skip:skip + count]
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            with state.lock:
+                state.requests += 1
+                number = state.requests
+            if url.path != "/v1/payments":
+                return self.reply(404, {"error": "not found"})
+            if state.fail_every and number % state.fail_every == 0:
+                return self.reply(state.fail_status, {"error": "injected"}, {"Retry-After": "0"})
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            items = state.query(params)
+            self.reply(200, {"entity": "collection", "count": len(items), "items": items})
+
+        def reply(self, status, body, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_stub(state=None, port=0):
+    state = state or StubState()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+import rollups
+import store
+
+# --- BUDGET STORE --- #
+# budget_data.json holds budgets per user per month:
+#   {user: {"YYYY-MM": {"total_budget": ..., "category_budgets": {...}}}}
+# It is read once per process (again only when the file changes) and
+# rewritten atomically. A month without its own entry inherits the user's
+# latest earlier month, so a budget set once carries forward.
+BUDGET_PATH = "budget_data.json"
+DEFAULT_TOTAL_BUDGET = 10000
+DEFAULT_CATEGORY_BUDGET = 1000
+UNTAGGED = "Uncategorized"  # label for untagged spend, which is "" in the store
+
+
+def month_key(month=None):
+    return pd.Period(month or pd.Timestamp.now(), freq="M").strftime("%Y-%m")
+
+
+class BudgetStore:
+    def __init__(self, path=BUDGET_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {}
+        self.mtime = None
+
+    def _refresh(self):
+        mtime = os.stat(self.path).st_mtime_ns if os.path.exists(self.path) else 0
+        if mtime != self.mtime:
+            try:
+                with open(self.path) as f:
+                    self.data = json.load(f)
+            except FileNotFoundError:
+                self.data = {}
+            self.mtime = mtime
+
+    def get(self, user, month=None):
+        month = month_key(month)
+        with self.lock:
+            self._refresh()
+            months = self.data.get(user, {})
+            earlier = [key for key in months if key <= month]
+            entry = months[max(earlier)] if earlier else {}
+        return {
+            "total_budget": entry.get("total_budget", DEFAULT_TOTAL_BUDGET),
+            "category_budgets": dict(entry.get("category_budgets", {})),
+        }
+
+    def set(self, user, month=None, total_budget=None, category_budgets=None):
+        month = month_key(month)
+        current = self.get(user, month)
+        if total_budget is not None:
+            current["total_budget"] = total_budget
+        if category_budgets is not None:
+            current["category_budgets"].update(category_budgets)
+        with self.lock:
+            self._refresh()
+            self.data.setdefault(user, {})[month] = current
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.data, f, indent=4)
+            os.replace(tmp_path, self.path)
+            self.mtime = os.stat(self.path).st_mtime_ns
+        return current
+
+    def frame(self):
+        # Long form: one row per (user, month, category); category "" is the total
+        with self.lock:
+            self._refresh()
+            rows = [
+                (user, month, category, budget)
+                for user, months in self.data.items()
+                for month, entry in months.items()
+                for category, budget in [("", entry.get("total_budget", DEFAULT_TOTAL_BUDGET))]
+                + list(entry.get("category_budgets", {}).items())
+            ]
+        return pd.DataFrame(rows, columns=["user", "month", "category", "budget"])
+
+
+budget_store = BudgetStore()
+
+
+# --- EVALUATION --- #
+# Spent, remaining and overspend for every (user, month, category) in one
+# grouping of rollup cells, with the carry-forward rule applied as an as-of
+# join on the month. Each user's monthly total is the row with is_total set
+# (category ""); untagged spend is reported as UNTAGGED, so it is never
+# matched against the total budget.
+def evaluate(cells, budgets=None):
+    budgets = budget_store.frame() if budgets is None else budgets
+    month = cells["day"].dt.to_period("M").astype("int64").rename("month")
+    category = cells["category"].astype(str).replace("", UNTAGGED).rename("category")
+    by_category = cells.groupby(["user", month, category])["sum"].sum()
+    total = cells.groupby(["user", month])["sum"].sum()
+    spent = pd.concat([
+        by_category.rename("spent").reset_index().assign(is_total=False),
+        total.rename("spent").reset_index().assign(category="", is_total=True),
+    ], ignore_index=True).sort_values("month", kind="stable")
+
+    budgets = budgets.astype({"user": str, "category": str, "budget": "float64"})
+    budgets = budgets.assign(month=pd.PeriodIndex(budgets["month"], freq="M").astype("int64"),
+                             is_total=budgets["category"] == "")
+    result = pd.merge_asof(
+        spent, budgets.sort_values("month", kind="stable"),
+        on="month", by=["user", "category", "is_total"], direction="backward",
+    )
+    # Categories the user never budgeted fall back to the dashboard defaults
+    defaults = np.where(result["is_total"], DEFAULT_TOTAL_BUDGET, DEFAULT_CATEGORY_BUDGET)
+    result["budget"] = result["budget"].fillna(pd.Series(defaults, index=result.index)).astype("float64")
+    result["remaining"] = result["budget"] - result["spent"]
+    result["overspend"] = (-result["remaining"]).clip(lower=0)
+    result["used"] = result["spent"] / result["budget"].where(result["budget"] > 0)
+    result["month"] = pd.PeriodIndex.from_ordinals(result["month"], freq="M").strftime("%Y-%m")
+    columns = ["user", "month", "category", "is_total", "spent", "budget", "remaining", "overspend", "used"]
+    return result[columns].sort_values(["user", "month", "category"], kind="stable", ignore_index=True)
+
+
+def alerts(evaluation, ratio=0.6):
+    # Rows past `ratio` of a non-zero budget, most used first
+    flagged = evaluation[evaluation["used"] > ratio]
+    return flagged.sort_values(["user", "used"], ascending=[True, False], kind="stable")
+
+
+# --- SCHEDULED JOB --- #
+# Evaluates this month's budgets for every user in users.json that has a
+# partition and prints one JSON line per alert for whatever delivers them.
+#   python budgets.py
+def user_cells(user, month=None):
+    cells = rollups.RollupCube.from_frame(store.load_transactions(user), user).frame()
+    return rollups.month_slice(cells, month)
+
+
+def run_alerts(users=None, month=None, ratio=0.6):
+    if users is None:
+        from auth import user_store
+        users = [user for user in user_store.usernames() if os.path.isdir(store.partition_dir(user))]
+    cells = pd.concat([user_cells(user, month) for user in users], ignore_index=True) if users else None
+    if cells is None or cells.empty:
+        return pd.DataFrame()
+    return alerts(evaluate(cells), ratio)
+
+
+if __name__ == "__main__":
+    for row in run_alerts().to_dict("records"):
+        print(json.dumps(row))
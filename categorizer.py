@@ -0,0 +1,111 @@
+import json
+import re
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# --- MERCHANT AUTO-CATEGORIZER --- #
+# Descriptions are normalized to a merchant key, looked up in an index
+# learned from manual tags, and otherwise matched against keyword lists.
+# Batches are factorized first so each distinct merchant is classified once.
+KEYWORDS = {
+    "Food Delivery": ["zomato", "swiggy", "eatsure", "dunzo", "faasos"],
+    "Groceries": ["bigbasket", "blinkit", "grofers", "zepto", "dmart", "jiomart", "grocery", "supermarket", "kirana"],
+    "Dining Out": ["restaurant", "cafe", "starbucks", "dominos", "mcdonalds", "kfc", "pizza", "burger", "bar"],
+    "Transport": ["uber", "ola", "rapido", "metro", "fuel", "petrol", "diesel", "fastag", "parking"],
+    "Travel": ["makemytrip", "goibibo", "irctc", "indigo", "airindia", "cleartrip", "oyo", "hotel", "airline", "yatra"],
+    "Shopping": ["amazon", "flipkart", "myntra", "ajio", "meesho", "nykaa", "decathlon", "ikea", "store", "mart"],
+    "Entertainment": ["bookmyshow", "pvr", "inox", "steam", "playstation", "cinema", "movie", "concert"],
+    "Subscriptions": ["netflix", "spotify", "hotstar", "prime", "youtube", "subscription", "membership", "gaana"],
+    "Utilities": ["electricity", "bescom", "airtel", "jio", "vodafone", "broadband", "water", "gas", "recharge", "bill"],
+    "Healthcare": ["pharmacy", "apollo", "medplus", "1mg", "pharmeasy", "hospital", "clinic", "diagnostic", "lab"],
+    "Rent": ["rent", "nobroker", "landlord", "housing", "society", "maintenance"],
+}
+NOISE_WORDS = ["pvt", "ltd", "private", "limited", "india", "inc", "llp", "payment", "payments",
+               "upi", "order", "txn", "ref", "www", "com", "in", "co"]
+
+_KEYWORD_CATEGORY = {word: category for category, words in KEYWORDS.items() for word in words}
+_KEYWORD_PATTERN = r"\b(" + "|".join(sorted(map(re.escape, _KEYWORD_CATEGORY), key=len, reverse=True)) + r")\b"
+_NOISE_PATTERN = r"\b(?:" + "|".join(NOISE_WORDS) + r")\b"
+
+
+def normalize_merchants(names):
+    # "SWIGGY*Order 8812 Bangalore" -> "swiggy bangalore"
+    names = pd.Series(names, dtype="object").fillna("").astype(str).str.lower()
+    names = names.str.replace(r"[^a-z0-9 ]+", " ", regex=True)
+    names = names.str.replace(r"\b\d+\b", " ", regex=True)
+    names = names.str.replace(_NOISE_PATTERN, " ", regex=True)
+    return names.str.split().str.join(" ").to_numpy(dtype=object)
+
+
+def keyword_categories(normalized):
+    matched = pd.Series(normalized, dtype="object").str.extract(_KEYWORD_PATTERN, expand=False)
+    return matched.map(_KEYWORD_CATEGORY).fillna("").to_numpy(dtype=object)
+
+
+class Categorizer:
+    def __init__(self, tags_path=None, cache_size=100_000):
+        self.tags_path = tags_path
+        self.tags_offset = 0
+        self.votes = {}
+        self.learned = {}
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+
+    # --- learning --- #
+    def learn(self, merchants, category):
+        for merchant in normalize_merchants(merchants):
+            if not merchant:
+                continue
+            votes = self.votes.setdefault(merchant, {})
+            votes[category] = votes.get(category, 0) + 1
+            self.learned[merchant] = max(votes, key=votes.get)
+            self.cache.pop(merchant, None)
+
+    def sync_tags(self):
+        # Learn online from entries appended to the tag log since the last call
+        if self.tags_path is None:
+            return
+        try:
+            with open(self.tags_path) as f:
+                f.seek(self.tags_offset)
+                while True:
+                    line = f.readline()
+                    if not line.endswith("\n"):
+                        break  # missing or partially written entry; retry next time
+                    self.tags_offset = f.tell()
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("apps"):
+                        self.learn(entry["apps"], entry["category"])
+        except FileNotFoundError:
+            pass
+
+    # --- classification --- #
+    def classify(self, descriptions):
+        self.sync_tags()
+        codes, uniques = pd.factorize(pd.Series(descriptions, dtype="object").fillna(""))
+        merchants = normalize_merchants(uniques)
+        decisions = np.empty(len(merchants), dtype=object)
+        misses = []
+        for position, merchant in enumerate(merchants):
+            cached = self.cache.get(merchant)
+            if cached is None:
+                misses.append(position)
+            else:
+                self.cache.move_to_end(merchant)
+                decisions[position] = cached
+        if misses:
+            missing = merchants[misses]
+            learned = np.array([self.learned.get(m, "") for m in missing], dtype=object)
+            unknown = learned == ""
+            if unknown.any():
+                learned[unknown] = keyword_categories(missing[unknown])
+            decisions[misses] = learned
+            for merchant, category in zip(missing, learned):
+                self.cache[merchant] = category
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return decisions[codes] if len(codes) else np.array([], dtype=object)
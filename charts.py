@@ -0,0 +1,110 @@
+import numpy as np
+import rollups
+
+# --- CHART DATA --- #
+# Series are built from the rollup cells and cut down to roughly one point
+# per pixel before they are sent to the browser. Line series use LTTB
+# (largest-triangle-three-buckets), which keeps the visual shape of a long
+# series; min/max bucketing is the cheaper alternative that keeps every spike.
+MAX_POINTS = 800
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def lttb(x, y, threshold):
+    # Indices of the points LTTB keeps; x must be numeric and increasing
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    # threshold - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, threshold - 1).astype("int64")
+    selected = np.empty(threshold, dtype="int64")
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, buckets):
+    # Lowest and highest point of each equal-width bucket, in order
+    n = len(y)
+    if 2 * buckets >= n:
+        return np.arange(n)
+    bucket = np.arange(n) * buckets // n
+    order = np.lexsort((np.asarray(y), bucket))
+    starts = np.searchsorted(bucket[order], np.arange(buckets))
+    ends = np.append(starts[1:], n) - 1
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+
+def downsample(frame, max_points=MAX_POINTS, method="lttb"):
+    # `frame` has two columns: x (numeric or datetime, sorted) and y
+    if len(frame) <= max_points:
+        return frame
+    x, y = frame.columns
+    if method == "minmax":
+        keep = minmax_indices(frame[y].to_numpy(), max_points // 2)
+    else:
+        xs = frame[x].to_numpy()
+        if np.issubdtype(xs.dtype, np.datetime64):
+            xs = xs.view("int64")
+        keep = lttb(xs, frame[y].to_numpy(), max_points)
+    return frame.iloc[keep].reset_index(drop=True)
+
+
+def weekday_hour(cells):
+    # 7 × 24 grid of spend from the cells' day and hour keys, in long form
+    grid = rollups.by_weekday_hour(cells)
+    frame = grid.stack().rename("amount").reset_index()
+    frame["weekday"] = frame["weekday"].map(dict(enumerate(WEEKDAYS)))
+    return frame
+
+
+# Each series is built on its own, so a page only pays for the charts it shows
+SERIES = {
+    "monthly": lambda cells, n: rollups.by_month(cells).rename_axis("month").reset_index(),
+    "weekly": lambda cells, n: downsample(rollups.by_week(cells).rename_axis("week").reset_index(), n),
+    "daily": lambda cells, n: downsample(rollups.by_day(cells).rename_axis("date").rename("amount").reset_index(), n),
+    "category": lambda cells, n: rollups.by_category(cells).sort_values(ascending=False).reset_index(),
+    "hourly": lambda cells, n: rollups.by_hour(cells).rename_axis("hour").reset_index(),
+    "weekday_hour": lambda cells, n: weekday_hour(cells),
+}
+
+
+def chart_series(cells, name, max_points=MAX_POINTS):
+    return SERIES[name](cells, max_points)
+
+
+
+# --- VEGA-LITE SPECS --- #
+# Specs go straight to the frontend: building them through st.bar_chart /
+# st.line_chart costs more than the rest of a dashboard rerun put together.
+def xy_spec(data, mark, x_type):
+    x, y = data.columns
+    return {
+        "mark": {"type": mark, "tooltip": True},
+        "encoding": {
+            "x": {"field": x, "type": x_type, "sort": None},
+            "y": {"field": y, "type": "quantitative", "title": None},
+        },
+    }
+
+
+def heatmap_spec():
+    return {
+        "mark": {"type": "rect", "tooltip": True},
+        "encoding": {
+            "x": {"field": "hour", "type": "ordinal", "title": "Hour of day"},
+            "y": {"field": "weekday", "type": "ordinal", "sort": WEEKDAYS, "title": None},
+            "color": {"field": "amount", "type": "quantitative", "title": "₹"},
+        },
+    }
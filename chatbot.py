@@ -1,92 +1,240 @@
 import pandas as pd
 import datetime
-from dateutil.parser import parse
+import metrics
 
 # Helper functions
+def _words(text):
+    return [word.strip("?.,!;:'\"") for word in text.split()]
+
 def extract_year(text):
-    for token in text.split():
+    for token in _words(text):
         if token.isdigit() and len(token) == 4:
             return int(token)
     return None
 
 def extract_month(text):
     months = {m.lower(): i for i, m in enumerate([
-        "", "January", "February", "March", "April", "May", "June", 
+        "", "January", "February", "March", "April", "May", "June",
         "July", "August", "September", "October", "November", "December"
     ])}
-    for word in text.split():
+    # "Feb", "Sept" and friends too
+    months.update({m[:3]: i for m, i in months.items() if m})
+    months["sept"] = 9
+    for word in _words(text):
         if word.lower() in months:
             return months[word.lower()]
     return None
 
-def get_week_number():
-    return datetime.datetime.now().isocalendar()[1]
+HELP_TEXT = (
+    "🤖 You can ask things like:\n"
+    "- How much did I spend on Food?\n"
+    "- Show me my weekly spending\n"
+    "- How much did I spend in March 2024?\n"
+    "- Give me a nudge to save\n"
+)
 
-def chat_with_bot(user_input, df):
-    user_input = user_input.lower()
+# --- CHAT INDEX --- #
+# Built once per dataset: every answer is a dictionary lookup into totals
+# pre-aggregated by category, year, month and ISO week, so answering no
+# longer scans the transactions.
+def aggregate(df, keys=()):
+    ts = df["datetime"]
+    iso = ts.dt.isocalendar()
+    frame = pd.DataFrame({
+        **{key: df[key] for key in keys},
+        "year": ts.dt.year,
+        "month": ts.dt.month,
+        "iso_year": iso["year"],
+        "iso_week": iso["week"],
+        "category": df["category"],
+        "amount": df["amount"],
+    })
+    keys = list(keys)
+    monthly = frame.groupby(keys + ["year", "month", "category"], observed=True)["amount"].agg(["sum", "count"])
+    weekly = frame.groupby(keys + ["iso_year", "iso_week", "category"], observed=True)["amount"].sum()
+    return monthly, weekly
 
-    # Ensure date column is datetime
-    df['date'] = pd.to_datetime(df['date'])
+class ChatIndex:
+    def __init__(self, df=None, monthly=None, weekly=None):
+        if df is not None:
+            monthly, weekly = aggregate(df)
+        self.total = 0.0
+        self.count = 0
+        self.by_category = {}
+        self.by_year = {}
+        self.by_month = {}
+        self.by_year_month = {}
+        self.by_category_period = {}
+        self.by_week = {}
+        levels = [monthly.index.get_level_values(i).tolist() for i in range(3)]
+        sums = monthly["sum"].to_numpy().tolist()
+        counts = monthly["count"].to_numpy().tolist()
+        for year, month, category, amount, count in zip(*levels, sums, counts):
+            self.total += amount
+            self.count += count
+            self.by_category[category] = self.by_category.get(category, 0.0) + amount
+            for table, key in ((self.by_year, year), (self.by_month, month), (self.by_year_month, (year, month))):
+                total, n = table.get(key, (0.0, 0))
+                table[key] = (total + amount, n + count)
+            # (year, month, category), with None standing for "any"
+            for key in ((year, month, category), (year, None, category), (None, month, category)):
+                total, n = self.by_category_period.get(key, (0.0, 0))
+                self.by_category_period[key] = (total + amount, n + count)
+        levels = [weekly.index.get_level_values(i).tolist() for i in range(3)]
+        for iso_year, iso_week, category, amount in zip(*levels, weekly.to_numpy().tolist()):
+            self.by_week.setdefault((iso_year, iso_week), []).append((category, amount))
+        # Longest names first so "Food Delivery" wins over "Food"
+        self.categories = sorted((c for c in self.by_category if c), key=len, reverse=True)
 
-    # 1️⃣ Category-based spending
-    if "how much did i spend on" in user_input:
-        for category in df['category'].unique():
-            if category.lower() in user_input:
-                total = df[df['category'].str.lower() == category.lower()]['amount'].sum()
-                return f"💸 You spent ₹{total:.2f} on {category} overall."
+    @classmethod
+    def for_users(cls, df):
+        # One aggregation pass over a multi-user frame with a `user` column
+        monthly, weekly = aggregate(df, keys=["user"])
+        weekly_by_user = {user: part.droplevel("user") for user, part in weekly.groupby(level="user", observed=True)}
+        return {
+            user: cls(monthly=part.droplevel("user"), weekly=weekly_by_user.get(user, weekly.iloc[:0].droplevel("user")))
+            for user, part in monthly.groupby(level="user", observed=True)
+        }
 
-    # 2️⃣ Yearly/Monthly spending
-    elif "how much did i spend in" in user_input:
-        year = extract_year(user_input)
-        month = extract_month(user_input)
-        filtered = df
+    def match_category(self, text):
+        for category in self.categories:
+            if category.lower() in text:
+                return category
+        return None
+
+    def period_total(self, year=None, month=None):
+        if year and month:
+            return self.by_year_month.get((year, month), (0.0, 0))
         if year:
-            filtered = filtered[filtered['date'].dt.year == year]
+            return self.by_year.get(year, (0.0, 0))
         if month:
-            filtered = filtered[filtered['date'].dt.month == month]
+            return self.by_month.get(month, (0.0, 0))
+        return (self.total, self.count)
 
-        total = filtered['amount'].sum()
-        if not filtered.empty:
-            date_label = f"{month and datetime.date(1900, month, 1).strftime('%B')} {year}" if month else str(year)
-            return f"📆 You spent ₹{total:.2f} in {date_label}."
-        else:
+    def category_total(self, category, year=None, month=None):
+        if year or month:
+            return self.by_category_period.get((year, month, category), (0.0, 0))[0]
+        return self.by_category.get(category, 0.0)
+
+# --- QUERY PLANNER --- #
+def plan_query(user_input, index):
+    text = user_input.lower()
+    if "how much did i spend on" in text:
+        return {"intent": "category_total", "category": index.match_category(text),
+                "year": extract_year(text), "month": extract_month(text)}
+    if "how much did i spend in" in text:
+        return {"intent": "period_total", "year": extract_year(text), "month": extract_month(text)}
+    if "weekly spending" in text or "this week" in text:
+        iso = datetime.datetime.now().isocalendar()
+        return {"intent": "week_summary", "year": iso[0], "week": iso[1]}
+    if "nudge" in text or "tip" in text:
+        return {"intent": "tips"}
+    return {"intent": "help"}
+
+def run_query(query, index):
+    intent = query["intent"]
+    if intent == "category_total":
+        category = query["category"]
+        amount = index.category_total(category, query.get("year"), query.get("month"))
+        return {**query, "found": category is not None, "amount": amount}
+    if intent == "period_total":
+        amount, count = index.period_total(query["year"], query["month"])
+        return {**query, "found": count > 0, "amount": amount}
+    if intent == "week_summary":
+        rows = index.by_week.get((query["year"], query["week"]), [])
+        return {**query, "found": bool(rows), "rows": rows}
+    if intent == "tips":
+        return {
+            **query,
+            "food": index.by_category.get("Food", 0.0),
+            "shopping": index.by_category.get("Shopping", 0.0),
+            "total": index.total,
+        }
+    return query
+
+def _period_label(year, month):
+    parts = [datetime.date(1900, month, 1).strftime('%B')] if month else []
+    parts += [str(year)] if year else []
+    return " ".join(parts)
+
+def format_answer(result):
+    intent = result["intent"]
+    # 1️⃣ Category-based spending
+    if intent == "category_total":
+        if not result["found"]:
+            return "🤷 I couldn't find that category in your transactions."
+        period = _period_label(result.get("year"), result.get("month"))
+        return f"💸 You spent ₹{result['amount']:.2f} on {result['category']} {'in ' + period if period else 'overall'}."
+
+    # 2️⃣ Yearly/Monthly spending
+    if intent == "period_total":
+        if not result["found"]:
             return "📂 No spending data found for that period."
+        return f"📆 You spent ₹{result['amount']:.2f} in {_period_label(result['year'], result['month']) or 'total'}."
 
     # 3️⃣ Weekly summary
-    elif "weekly spending" in user_input or "this week" in user_input:
-        week_num = get_week_number()
-        current_week = df[df['date'].dt.isocalendar().week == week_num]
-        if current_week.empty:
+    if intent == "week_summary":
+        if not result["found"]:
             return "📭 No spending activity recorded this week."
-
-        summary = current_week.groupby("category")["amount"].sum().reset_index()
-        response = f"📊 Spending Summary for Week {week_num}:\n"
-        for _, row in summary.iterrows():
-            response += f"• {row['category']}: ₹{row['amount']:.2f}\n"
+        response = f"📊 Spending Summary for Week {result['week']}:\n"
+        for category, amount in result["rows"]:
+            response += f"• {category}: ₹{amount:.2f}\n"
         return response
 
     # 4️⃣ Nudges & tips
-    elif "nudge" in user_input or "tip" in user_input:
-        food = df[df['category'] == "Food"]["amount"].sum()
-        shopping = df[df['category'] == "Shopping"]["amount"].sum()
-        total = df["amount"].sum()
-
+    if intent == "tips":
         tips = []
-        if food > 2000:
+        if result["food"] > 2000:
             tips.append("🍔 Try reducing food delivery — maybe meal prep this week?")
-        if shopping > 3000:
+        if result["shopping"] > 3000:
             tips.append("🛍️ A no-spend weekend challenge could help!")
-        if total > 10000:
+        if result["total"] > 10000:
             tips.append("💡 Consider setting a monthly budget to avoid overspending.")
-
         return "\n".join(tips) if tips else "✅ You're spending wisely! Keep it up!"
 
     # 5️⃣ General response
-    else:
-        return (
-            "🤖 You can ask things like:\n"
-            "- How much did I spend on Food?\n"
-            "- Show me my weekly spending\n"
-            "- How much did I spend in March 2024?\n"
-            "- Give me a nudge to save\n"
-        )
+    return HELP_TEXT
+
+@metrics.timed("chat_with_bot")
+def chat_with_bot(user_input, df, index=None):
+    # Pass a prebuilt ChatIndex to skip indexing `df`
+    if index is None:
+        index = ChatIndex(df)
+    return format_answer(run_query(plan_query(user_input, index), index))
+
+# --- BATCH ANSWERS --- #
+def _window(query):
+    return tuple(query.get(key) for key in ("intent", "category", "year", "month", "week"))
+
+def answer_batch(pairs, frames):
+    # `pairs` is an iterable of (user, question). `frames` is either one
+    # multi-user frame with a `user` column (indexed in a single pass), a
+    # dict of per-user frames, or a callable such as store.load_transactions.
+    # Each user's data is indexed once and identical resolved queries are run once.
+    pairs = list(pairs)
+    by_user = {}
+    for position, (user, question) in enumerate(pairs):
+        by_user.setdefault(user, []).append((position, question))
+
+    shared = ChatIndex.for_users(frames) if isinstance(frames, pd.DataFrame) else None
+    results = [None] * len(pairs)
+    for user, questions in by_user.items():
+        if shared is not None:
+            index = shared.get(user)
+        else:
+            df = frames(user) if callable(frames) else frames.get(user)
+            index = ChatIndex(df) if df is not None else None
+        answered = {}
+        for position, question in questions:
+            if index is None:
+                result = {"intent": "no_data", "found": False}
+                answer = "📭 No transactions found for this user."
+            else:
+                query = plan_query(question, index)
+                window = _window(query)
+                if window not in answered:
+                    result = run_query(query, index)
+                    answered[window] = (result, format_answer(result))
+                result, answer = answered[window]
+            results[position] = {"user": user, "question": question, "result": result, "answer": answer}
+    return results
@@ -18,24 +18,76 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from chatbot import chat_with_bot
-from nudges import get_gamified_nudges, get_category_warnings
-import hashlib
-from auth import auth_flow
-import time
-import numpy as np
-from sklearn.linear_model import LinearRegression
+from chatbot import chat_with_bot, ChatIndex
+from nudges import get_cube_nudges, get_cube_category_warnings
+from auth import auth_flow, user_store
 import threading
-from razorpay_realtime import start_realtime_tracking  # ⬅ NEW
+import store
+import rollups
+from filters import FilterIndex
+import forecast
+import charts
+import uploads
+import exports
+import os
+from budgets import budget_store, DEFAULT_CATEGORY_BUDGET
+from datacache import DataCache
+import metrics
+
+metrics.start_run()
 
 # --- PAGE CONFIG --- #
 #st.set_page_config(page_title="AI Finance Assistant", layout="wide")
 
+# --- BACKGROUND PREWARM --- #
+# The HTTP client is imported only once the ingestion service is created.
+# The first session of a new server process starts a thread that imports it
+# and opens the store and the user index while the login form is on screen.
+def prewarm():
+    store.ensure_store()
+    user_store.preload()
+    import ingest_service
+
+@st.cache_resource
+def start_prewarm():
+    thread = threading.Thread(target=prewarm, name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+start_prewarm()
+
+# --- METRICS ENDPOINT --- #
+# With METRICS=1 each server process serves Prometheus text on
+# 127.0.0.1:METRICS_PORT/metrics (see metrics.py)
+@st.cache_resource
+def start_metrics():
+    return metrics.serve() if metrics.ENABLED else None
+
+start_metrics()
+
+# --- EXPORT CLEANUP --- #
+# Exports stay on disk only briefly (and can be served without a login if
+# static serving is on, see exports.py), so expired ones are removed on a
+# timer from app start, not only when the next export runs
+@st.cache_resource
+def start_export_cleaner():
+    return exports.start_cleaner()
+
+start_export_cleaner()
+
 # --- AUTHENTICATION --- #
+metrics.section("auth")
 auth_flow()
 
+# --- SHARED INGESTION --- #
+# One service per server process polls every configured Razorpay account
+@st.cache_resource
+def get_ingest_service():
+    from ingest_service import IngestService
+    service = IngestService()
+    metrics.add_collector(service.stats)
+    return service
+
 # --- RAZORPAY CONFIG --- #
 if "razorpay_configured" not in st.session_state:
     st.session_state.razorpay_configured = False
@@ -49,128 +101,250 @@ if st.session_state.logged_in and not st.session_state.razorpay_configured:
             st.session_state.razorpay_key = key
             st.session_state.razorpay_secret = secret
             st.session_state.razorpay_configured = True
-            # Start the tracker
-            threading.Thread(target=start_realtime_tracking, daemon=True).start()
+            # Hand the account to the shared tracker
+            get_ingest_service().register(st.session_state.username, key, secret)
             st.success("✅ Razorpay configured successfully!")
             st.rerun()
         else:
             st.error("Please enter both API key and secret")
     st.stop()
 
-# --- LOGIN SYSTEM --- #
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def check_login():
-    if "logged_in" not in st.session_state:
-        st.session_state.logged_in = False
-
-    if not st.session_state.logged_in:
-        st.title("🔐 Login to Continue")
-        username = st.text_input("Username")
-        password = st.text_input("Password", type="password")
-        if st.button("Login"):
-            if username == "shatwik" and hash_password(password) == hash_password("12903478"):
-                st.session_state.logged_in = True
-                st.success("Login successful!")
-            else:
-                st.error("Invalid credentials")
-        st.stop()
-
-check_login()
-
-# --- LOADING SCREEN --- #
-with st.spinner("🧙‍♂ Summoning your Gringotts vault... Please wait..."):
-    time.sleep(2)
-
 # --- LOAD DATA --- #
-@st.cache_data
-def load_data():
-    df_local = pd.read_csv("mock_transactions_detailed.csv", parse_dates=["datetime"])
-    try:
-        df_rzp = pd.read_csv("razorpay_payments.csv", parse_dates=["datetime"])
-        df_rzp["type"] = "expense"
-        df_rzp["category"] = ""
-        df_combined = pd.concat([df_local, df_rzp], ignore_index=True)
-        return df_combined
-    except FileNotFoundError:
-        return df_local
-
+# Each user's data is cached per (user, store version) in one process-wide
+# cache bounded by memory (DATA_CACHE_MB), not by entry count. The frames
+# are memory-mapped and shared across reruns, so treat them as read-only.
+@st.cache_resource
+def get_data_cache():
+    cache = DataCache()
+    metrics.add_collector(cache.stats)
+    return cache
+
+# A newer version that only adds segments is derived from the cached one by
+# appending the new rows, instead of reloading the whole partition.
+def open_store(user, version):
+    return get_data_cache().get(
+        "store", user, version, lambda: store.load_transactions(user),
+        lambda df, old_version: store.refresh_transactions(df, user, old_version, version))
+
+# Dashboard aggregates come from a rollup cube built once per store version
+# and then extended with each batch of appended rows
+def open_cube(user, version):
+    def update(cube, old_version):
+        rows = store.appended_rows(user, old_version, version)
+        return None if rows is None else cube.extended(rows, user)
+    return get_data_cache().get(
+        "cube", user, version, lambda: rollups.RollupCube.from_frame(open_store(user, version), user), update)
+
+def open_filter_index(user, version):
+    return get_data_cache().get("filter_index", user, version, lambda: FilterIndex(open_store(user, version)))
+
+# Uploads are parsed in chunks into the user's upload dataset once per file
+# and then memory-mapped like the store, with their own cube and index
+def build_upload(user):
+    df = uploads.load_upload(user)
+    return df, rollups.RollupCube.from_frame(df, user), FilterIndex(df)
+
+def open_upload(user, version):
+    return get_data_cache().get("upload", user, version, lambda: build_upload(user))
+
+metrics.section("load")
 st.sidebar.subheader("📁 Upload Your Transactions (CSV)")
 uploaded_file = st.sidebar.file_uploader("Choose a CSV file", type="csv")
 
-if uploaded_file:
-    df = pd.read_csv(uploaded_file, parse_dates=["datetime"])
-    st.success("✅ File uploaded and loaded successfully!")
+using_upload = uploaded_file is not None
+ingest = None
+if using_upload:
+    try:
+        with st.spinner("📥 Reading your file..."):
+            upload_report = uploads.ensure_upload(uploaded_file, st.session_state.username, uploaded_file.file_id)
+    except uploads.UploadError as e:
+        st.error(f"❌ {e} Using default dataset.")
+        using_upload = False
+
+if using_upload:
+    st.success(f"✅ File uploaded and loaded successfully! {upload_report['rows']:,} transactions.")
+    if upload_report["bad_rows"]:
+        st.warning(f"⚠️ Skipped {upload_report['bad_rows']:,} row(s) that could not be read.")
+        with st.expander("Skipped rows"):
+            st.dataframe(pd.DataFrame(upload_report["report"]), hide_index=True)
+    user = st.session_state.username
+    store_version = store.store_version(user)
+    data_version = ("upload", user, uploads.upload_version(user), store_version)
+    df, cube, filter_index = open_upload(user, data_version)
 else:
-    df = load_data()
-
-# Validate CSV format
-expected_cols = {"datetime", "amount", "category", "type"}
-if not expected_cols.issubset(df.columns):
-    st.error("❌ Uploaded file is missing required columns. Using default dataset.")
-    df = load_data()
+    user = st.session_state.username
+    # Read before the store version, so every change up to it is on disk
+    ingest = get_ingest_service() if "razorpay_key" in st.session_state else None
+    feed_version = ingest.version(user) if ingest is not None else 0
+    # One version for all three, so they agree even if a payment lands mid-rerun
+    store_version = store.store_version(user)
+    with st.spinner("🧙‍♂ Summoning your Gringotts vault... Please wait..."):
+        df = open_store(user, store_version)
+    cube = open_cube(user, store_version)
+    filter_index = open_filter_index(user, store_version)
+    data_version = (user, store_version)
+
+# --- LIVE REFRESH --- #
+# Ingested payments move the store version. Open sessions check it every few
+# seconds (a handful of stat calls) and rerun when it has moved; the loaders
+# above then append just the new segments.
+REFRESH_SECONDS = 5
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def watch_store(user, version):
+    if store.store_version(user) != version:
+        st.rerun(scope="app")
+
+watch_store(user, store_version)
 
 # --- OPTIONAL TAGGING UI --- #
-st.subheader("🏷 Tag Unknown Categories")
-untagged = df[df["category"] == ""].copy()
-if not untagged.empty:
-    for i, row in untagged.iterrows():
-        col1, col2, col3 = st.columns([2, 2, 4])
-        with col1:
-            st.write(f"🧾 {row['app']} - ₹{row['amount']}")
-        with col2:
-            category = st.selectbox(f"Category for {row['app']}", options=[
-                "Shopping", "Transport", "Grocery", "Bills", "Entertainment", "Other"
-            ], key=f"tag_{i}")
-        with col3:
-            if st.button("Save", key=f"save_{i}"):
-                df.at[i, "category"] = category
-                df.to_csv("mock_transactions_detailed.csv", index=False)
-                st.success("✅ Category tagged!")
+# Tags are appended to the user's overlay log and merged at read time
+TAG_OPTIONS = ["Shopping", "Transport", "Grocery", "Bills", "Entertainment", "Other"]
+TAG_PAGE_SIZE = 50
+
+def save_tags(rows, category):
+    tagged = store.record_tags(rows["txn_id"], category, st.session_state.username, apps=rows["app"])
+    st.session_state.tag_message = f"✅ Tagged {tagged} transaction(s) as {category}!"
+    st.rerun()
+
+# Tagging widgets rerun only this fragment; saving a tag reruns the app
+@st.fragment
+def tagging_section(df):
+    st.subheader("🏷 Tag Unknown Categories")
+    if "tag_message" in st.session_state:
+        st.success(st.session_state.pop("tag_message"))
+    untagged = df[df["category"] == ""]
+    if not untagged.empty and "txn_id" in df.columns:
+        known = [c for c in df["category"].unique() if c and c not in TAG_OPTIONS]
+        tag_options = TAG_OPTIONS + sorted(known)
+        st.caption(f"{len(untagged):,} untagged transactions")
+
+        # Apply one category to every untagged payment from a merchant
+        merchants = untagged["app"].value_counts()
+        col1, col2, col3 = st.columns([3, 2, 2])
+        merchant = col1.selectbox("Merchant", merchants.index, format_func=lambda m: f"{m} ({merchants[m]})")
+        merchant_category = col2.selectbox("Category", tag_options, key="merchant_tag")
+        if col3.button("Apply to all from this merchant"):
+            save_tags(untagged[untagged["app"] == merchant], merchant_category)
+
+        # Paginated grid: pick a category per row, or tick rows and apply one
+        pages = (len(untagged) - 1) // TAG_PAGE_SIZE + 1
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1)
+        page_rows = untagged.iloc[(page - 1) * TAG_PAGE_SIZE:page * TAG_PAGE_SIZE]
+        grid = pd.DataFrame({
+            "select": False,
+            "txn_id": page_rows["txn_id"].to_numpy(),
+            "datetime": page_rows["datetime"].to_numpy(),
+            "app": page_rows["app"].to_numpy(),
+            "amount": page_rows["amount"].to_numpy(),
+            "category": None,
+        })
+        edited = st.data_editor(
+            grid,
+            key=f"tag_grid_{page}",
+            hide_index=True,
+            disabled=["datetime", "app", "amount"],
+            column_config={
+                "select": st.column_config.CheckboxColumn("✔"),
+                "txn_id": None,
+                "category": st.column_config.SelectboxColumn("Category", options=tag_options),
+            },
+        )
+        col1, col2, col3 = st.columns([2, 2, 2])
+        bulk_category = col1.selectbox("Category for ticked rows", tag_options, key="bulk_tag")
+        if col2.button("Apply to ticked rows"):
+            save_tags(edited[edited["select"]], bulk_category)
+        if col3.button("Save row categories"):
+            picked = edited[edited["category"].notna()]
+            for category, rows in picked.groupby("category"):
+                store.record_tags(rows["txn_id"], category, st.session_state.username, apps=rows["app"])
+            st.session_state.tag_message = f"✅ Tagged {len(picked)} transaction(s)!"
+            st.rerun()
+
+metrics.section("tagging")
+tagging_section(df)
+
 # --- TITLE --- #
 st.title("💰 AI Finance Assistant Dashboard")
 
 # --- SIDEBAR FILTERS --- #
+# Options scan every row, so they are worked out once per data version
+def open_filter_options(df, version):
+    return get_data_cache().get("filter_options", user, version, lambda: {
+        "types": list(df["type"].unique()),
+        "categories": list(df["category"].unique()),
+        "dates": [df["datetime"].min().date(), df["datetime"].max().date()],
+    })
+
+metrics.section("filters")
+filter_options = open_filter_options(df, data_version)
 st.sidebar.header("📊 Filters")
-selected_type = st.sidebar.multiselect("Type of Expense", df['type'].unique(), default=df['type'].unique())
-selected_category = st.sidebar.multiselect("Category", df['category'].unique(), default=df['category'].unique())
-date_range = st.sidebar.date_input("Date Range", [df["datetime"].min().date(), df["datetime"].max().date()])
+selected_type = st.sidebar.multiselect("Type of Expense", filter_options["types"], default=filter_options["types"])
+selected_category = st.sidebar.multiselect("Category", filter_options["categories"], default=filter_options["categories"])
+date_range = st.sidebar.date_input("Date Range", filter_options["dates"])
 
 # --- BUDGET SETTING --- #
+metrics.section("budgets")
+# Budgets are kept per user and month in budget_data.json (see budgets.py)
+month_budget = budget_store.get(user)
 st.sidebar.subheader("🎯 Monthly Budget")
-if "budget" not in st.session_state:
-    st.session_state.budget = 10000
-new_budget = st.sidebar.number_input("Set your budget (₹)", min_value=0, value=st.session_state.budget, step=500)
-if new_budget != st.session_state.budget:
-    st.session_state.budget = new_budget
-    st.sidebar.success(f"Budget updated to ₹{new_budget}")
+budget = st.sidebar.number_input("Set your budget (₹)", min_value=0, value=int(month_budget["total_budget"]), step=500)
 
 # --- CATEGORY-WISE BUDGET SETTING --- #
 st.sidebar.subheader("🎯 Category Budgets")
+stored_category_budgets = month_budget["category_budgets"]
 category_budgets = {}
-for cat in df['category'].unique():
-    category_budgets[cat] = st.sidebar.number_input(f"{cat} Budget (₹)", min_value=0, value=1000, step=100)
-
-filtered_df = df[
-    (df["type"].isin(selected_type)) &
-    (df["category"].isin(selected_category)) &
-    (df["datetime"].dt.date >= date_range[0]) &
-    (df["datetime"].dt.date <= date_range[1])
-]
+for cat in filter_options["categories"]:
+    stored = int(stored_category_budgets.get(cat, DEFAULT_CATEGORY_BUDGET))
+    category_budgets[cat] = st.sidebar.number_input(f"{cat} Budget (₹)", min_value=0, value=stored, step=100)
+
+changed_categories = {
+    cat: value for cat, value in category_budgets.items()
+    if value != stored_category_budgets.get(cat, DEFAULT_CATEGORY_BUDGET)
+}
+if budget != month_budget["total_budget"] or changed_categories:
+    budget_store.set(user, total_budget=budget, category_budgets=changed_categories)
+    if budget != month_budget["total_budget"]:
+        st.sidebar.success(f"Budget updated to ₹{budget}")
+
+# --- PER-FILTER CACHES --- #
+# Everything below is keyed by (data_version, filter_key), so a rerun that
+# leaves the data and filters alone reads cached slices instead of recomputing.
+# The slices live in the same byte-budgeted cache as the data, filed under
+# (user, filter_key): each selection keeps its own entry, and a new data
+# version replaces that selection's older one.
+filter_key = (tuple(selected_type), tuple(selected_category), tuple(date_range))
+
+def open_filtered_cells(cube, version, filter_key):
+    types, categories, dates = filter_key
+    return get_data_cache().get("filtered_cells", (user, filter_key), version,
+                                lambda: cube.query(types=types, categories=categories, start=dates[0], end=dates[1]))
+
+metrics.section("filter")
+filtered_cells = open_filtered_cells(cube, data_version, filter_key)
 
 # --- SUMMARY METRICS --- #
+metrics.section("summary")
 st.subheader("📈 Quick Summary")
+summary = rollups.totals(filtered_cells)
 col1, col2, col3 = st.columns(3)
-col1.metric("Total Spent", f"₹{filtered_df['amount'].sum():,.2f}")
-col2.metric("Transactions", f"{len(filtered_df)}")
-col3.metric("Avg. per Transaction", f"₹{filtered_df['amount'].mean():,.2f}")
+col1.metric("Total Spent", f"₹{summary['sum']:,.2f}")
+col2.metric("Transactions", f"{summary['count']}")
+col3.metric("Avg. per Transaction", f"₹{summary['mean']:,.2f}")
+
+# Capture-to-screen lag for payments that reached this session's totals
+if ingest is not None:
+    shown = st.session_state.setdefault("shown_feed_version", feed_version)
+    ingest.mark_shown(user, shown, feed_version)
+    st.session_state.shown_feed_version = feed_version
+    freshness = ingest.freshness(user)
+    if freshness:
+        st.caption(f"🟢 Live · latest payment on screen {freshness['last']:.1f}s after capture "
+                   f"(p95 {freshness['p95']:.1f}s over {freshness['samples']})")
 
 # --- BUDGET PROGRESS --- #
-current_month = pd.Timestamp.now().strftime('%Y-%m')
-df_this_month = filtered_df[filtered_df["datetime"].dt.to_period('M').astype(str) == current_month]
-spent_this_month = df_this_month["amount"].sum()
-budget = st.session_state.budget
+cells_this_month = rollups.month_slice(filtered_cells)
+spent_this_month = cells_this_month["sum"].sum()
 progress = min(spent_this_month / budget, 1.0)
 
 st.subheader("📊 Monthly Budget Progress")
@@ -181,60 +355,50 @@ col2.metric("Remaining Budget", f"₹{budget - spent_this_month:,.0f}")
 
 # --- CATEGORY-WISE SPENT & REMAINING --- #
 st.subheader("🧾 Category-wise Budget Tracking")
-for cat in df['category'].unique():
-    cat_spent = df_this_month[df_this_month['category'] == cat]['amount'].sum()
+spent_by_category = rollups.by_category(cells_this_month)
+for cat in category_budgets:
+    cat_spent = spent_by_category.get(cat, 0)
     cat_budget = category_budgets.get(cat, 0)
     cat_remaining = cat_budget - cat_spent
     st.write(f"{cat}: Spent ₹{cat_spent:.0f} / ₹{cat_budget} | Remaining: ₹{cat_remaining:.0f}")
 
 # --- EXPENSE FORECASTING --- #
-st.subheader("📉 Expense Forecasting")
-monthly_expenses = df.groupby(df["datetime"].dt.to_period("M"))['amount'].sum().reset_index()
-monthly_expenses['datetime'] = monthly_expenses['datetime'].dt.to_timestamp()
-monthly_expenses['month_num'] = range(1, len(monthly_expenses) + 1)
-
-if len(monthly_expenses) >= 2:
-    X = monthly_expenses[['month_num']]
-    y = monthly_expenses['amount']
-    model = LinearRegression()
-    model.fit(X, y)
-    next_month = np.array([[monthly_expenses['month_num'].max() + 1]])
-    prediction = model.predict(next_month)[0]
-
-    st.info(f"📅 Predicted expense for next month: ₹{prediction:,.0f}")
-
-    if prediction > budget:
-        st.warning("🚨 Your next month's expenses may exceed your set budget!")
-else:
-    st.info("📉 Not enough data to generate forecast.")
-
-# --- CATEGORY-WISE FORECASTING --- #
-st.subheader("🔍 Category-wise Expense Forecasting")
-future_forecasts = {}
-for cat in df['category'].unique():
-    cat_df = df[df['category'] == cat]
-    monthly_cat = cat_df.groupby(cat_df["datetime"].dt.to_period("M"))['amount'].sum().reset_index()
-    if len(monthly_cat) < 2:
-        continue
-    monthly_cat['datetime'] = monthly_cat['datetime'].dt.to_timestamp()
-    monthly_cat['month_num'] = range(1, len(monthly_cat) + 1)
-    X_cat = monthly_cat[['month_num']]
-    y_cat = monthly_cat['amount']
-    model = LinearRegression()
-    model.fit(X_cat, y_cat)
-    next_month_cat = np.array([[monthly_cat['month_num'].max() + 1]])
-    forecast_cat = model.predict(next_month_cat)[0]
-    future_forecasts[cat] = forecast_cat
-
-for cat, forecast in future_forecasts.items():
-    cat_budget = category_budgets.get(cat, 0)
-    forecast_msg = f"📌 *{cat}*: Forecasted ₹{forecast:.0f} / Budget ₹{cat_budget}"
-    if forecast > cat_budget:
-        st.warning(f"🚨 {forecast_msg} — Likely to overspend!")
+# Fits are cached per data version with the rest of the user's data; only
+# the budget comparison runs on a rerun. The category fits are only made
+# once their toggle is opened, and the toggle reruns just this fragment.
+def open_forecast(cube, version, kind, fit):
+    return get_data_cache().get(kind, user, version, lambda: fit(cube.frame()))
+
+@st.fragment
+def forecast_section(cube, version, budget, category_budgets):
+    st.subheader("📉 Expense Forecasting")
+    prediction = open_forecast(cube, version, "forecast", forecast.next_month_total)
+    if prediction is not None:
+        st.info(f"📅 Predicted expense for next month: ₹{prediction:,.0f}")
+
+        if prediction > budget:
+            st.warning("🚨 Your next month's expenses may exceed your set budget!")
     else:
-        st.info(f"✅ {forecast_msg} — Looks safe.")
+        st.info("📉 Not enough data to generate forecast.")
+
+    # --- CATEGORY-WISE FORECASTING --- #
+    st.subheader("🔍 Category-wise Expense Forecasting")
+    if not st.toggle("Show category forecasts", key="show_category_forecasts"):
+        return
+    future_forecasts = open_forecast(cube, version, "category_forecast", forecast.next_month_by_category)
+    for cat, cat_forecast in future_forecasts.items():
+        cat_budget = category_budgets.get(cat, 0)
+        forecast_msg = f"📌 *{cat}*: Forecasted ₹{cat_forecast:.0f} / Budget ₹{cat_budget}"
+        if cat_forecast > cat_budget:
+            st.warning(f"🚨 {forecast_msg} — Likely to overspend!")
+        else:
+            st.info(f"✅ {forecast_msg} — Looks safe.")
+
+metrics.section("forecast")
+forecast_section(cube, data_version, budget, category_budgets)
 
 # --- GAMIFIED BADGES --- #
+metrics.section("nudges")
 def get_savings_badge(savings):
     if 1 <= savings <= 100:
         return "🥉 Bronze Saver - Good start!"
@@ -255,56 +419,108 @@ if badge:
 
 # --- GAMIFIED NUDGES --- #
 st.subheader("🏆 Achievement Nudges")
-badges = get_gamified_nudges(df_this_month, budget)
+badges = get_cube_nudges(cells_this_month, budget)
 for badge in badges:
     st.success(badge)
 
 # --- CATEGORY BUDGET WARNINGS --- #
 st.subheader("⚠ Category Budget Warnings")
-category_warnings = get_category_warnings(df_this_month, category_budgets)
+category_warnings = get_cube_category_warnings(cells_this_month, category_budgets)
 for warning in category_warnings:
     st.warning(warning)
 
-# --- MONTHLY SPENDING --- #
-st.subheader("📅 Monthly Spending")
-filtered_df['month'] = filtered_df['datetime'].dt.to_period('M').astype(str)
-monthly = filtered_df.groupby("month")["amount"].sum().sort_index()
-st.bar_chart(monthly)
-
-# --- WEEKLY SPENDING --- #
-st.subheader("📆 Weekly Spending")
-filtered_df['week'] = filtered_df['datetime'].dt.isocalendar().week
-weekly = filtered_df.groupby("week")["amount"].sum().sort_index()
-st.line_chart(weekly)
-
-# --- DAILY HEATMAP --- #
-st.subheader("🕒 Daily Spending Heatmap")
-heatmap_data = filtered_df.copy()
-heatmap_data['date'] = heatmap_data['datetime'].dt.date
-heatmap = heatmap_data.groupby(['date'])['amount'].sum().reset_index()
-heatmap['date'] = pd.to_datetime(heatmap['date'])
-fig, ax = plt.subplots(figsize=(12, 4))
-sns.lineplot(x='date', y='amount', data=heatmap, ax=ax)
-ax.set_title("Daily Spending Over Time")
-st.pyplot(fig)
-
-# --- CATEGORY SPENDING --- #
-st.subheader("📂 Spending by Category")
-cat_data = filtered_df.groupby("category")["amount"].sum().sort_values(ascending=False)
-st.bar_chart(cat_data)
-
-# --- TIME OF DAY SPENDING --- #
-st.subheader("⏰ Spending by Time of Day")
-filtered_df['hour'] = filtered_df['datetime'].dt.hour
-hourly = filtered_df.groupby('hour')['amount'].sum()
-st.line_chart(hourly)
+# --- CHARTS --- #
+# Each chart sits behind its own toggle and only the monthly one starts
+# open. A series is built (and cached per data version and filter
+# selection) the first time its chart is shown; flipping a toggle reruns
+# just this fragment. Series are downsampled to screen resolution in charts.py.
+CHARTS = [
+    ("📅 Monthly Spending", [("monthly", "bar", "ordinal")]),
+    ("📆 Weekly Spending", [("weekly", "line", "ordinal")]),
+    ("🕒 Daily Spending Heatmap", [("daily", "line", "temporal"), ("weekday_hour", None, None)]),
+    ("📂 Spending by Category", [("category", "bar", "nominal")]),
+    ("⏰ Spending by Time of Day", [("hourly", "line", "ordinal")]),
+]
+
+def open_chart_series(cells, version, filter_key, name):
+    return get_data_cache().get("chart_" + name, (user, filter_key), version, lambda: charts.chart_series(cells, name))
+
+@st.fragment
+def charts_section(cells, version, filter_key):
+    for i, (title, series) in enumerate(CHARTS):
+        st.subheader(title)
+        if not st.toggle("Show chart", value=i == 0, key=f"show_chart_{i}"):
+            continue
+        for name, mark, x_type in series:
+            data = open_chart_series(cells, version, filter_key, name)
+            spec = charts.heatmap_spec() if mark is None else charts.xy_spec(data, mark, x_type)
+            st.vega_lite_chart(data, spec, use_container_width=True)
+
+metrics.section("charts")
+charts_section(filtered_cells, data_version, filter_key)
 
 # --- CHATBOT --- #
-st.subheader("💬 Ask Your Assistant")
-user_input = st.chat_input("Talk to your finance assistant (e.g., 'How much did I spend on shopping in Feb 2024?')")
-if user_input:
-    response = chat_with_bot(user_input, filtered_df)
-    st.success(response)
+# A question reruns only this fragment. Answers come from an index cached
+# per data version and filter selection. It is built on the first question
+# for a selection, never on reruns without one, so filter changes cost
+# nothing here.
+def open_chat_index(filter_index, version, filter_key):
+    types, categories, dates = filter_key
+    return get_data_cache().get("chat_index", (user, filter_key), version, lambda: ChatIndex(
+        filter_index.select(types=types, categories=categories, start=dates[0], end=dates[1])))
+
+@st.fragment
+def chatbot_section(filter_index, version, filter_key):
+    st.subheader("💬 Ask Your Assistant")
+    user_input = st.chat_input("Talk to your finance assistant (e.g., 'How much did I spend on shopping in Feb 2024?')")
+    if user_input:
+        chat_index = open_chat_index(filter_index, version, filter_key)
+        response = chat_with_bot(user_input, None, chat_index)
+        st.success(response)
+
+metrics.section("chatbot")
+chatbot_section(filter_index, data_version, filter_key)
+
+# --- EXPORT REPORTS --- #
+# The filtered transactions are written to disk a chunk at a time, with a
+# summary table, as CSV, Parquet or XLSX (see exports.py). By default they
+# go through a download button in the logged-in session, which Streamlit
+# holds in memory. With static serving switched on (opt-in, see
+# .streamlit/config.toml) the browser downloads them straight from disk
+# instead, bypassing the login.
+@st.fragment
+def export_section(filter_index, filtered_cells, version, filter_key):
+    st.subheader("📤 Export Reports")
+    col1, col2 = st.columns([2, 1])
+    export_format = col1.selectbox("Format", exports.FORMATS, format_func=str.upper)
+    request = (version, filter_key, export_format)
+    if col2.button("Prepare export"):
+        types, categories, dates = filter_key
+        chunks = filter_index.chunks(exports.CHUNK_ROWS, types=types, categories=categories, start=dates[0], end=dates[1])
+        # The previous export stops being downloadable as soon as it is replaced
+        exports.remove_export(st.session_state.pop("export", (None, []))[1])
+        with st.spinner("📦 Writing your export..."):
+            paths = exports.export_transactions(chunks, filtered_cells, export_format, stem=f"transactions-{dates[0]}-{dates[1]}")
+        st.session_state.export = (request, paths)
+    prepared, paths = st.session_state.get("export", (None, []))
+    if prepared != request:
+        return
+    if not all(os.path.exists(path) for path in paths):
+        st.info("⌛ This export has expired. Prepare it again.")
+        return
+    for path in paths:
+        name = os.path.basename(path)
+        size = os.path.getsize(path) / 2**20
+        if st.get_option("server.enableStaticServing"):
+            st.markdown(f'<a href="{exports.static_url(path)}" download="{name}">⬇️ {name}</a> ({size:.1f} MB)',
+                        unsafe_allow_html=True)
+        else:
+            with open(path, "rb") as f:
+                st.download_button(f"⬇️ {name} ({size:.1f} MB)", f, file_name=name,
+                                   mime=exports.MIME_TYPES[export_format], on_click="ignore", key=f"export_{name}")
+
+metrics.section("export")
+export_section(filter_index, filtered_cells, data_version, filter_key)
 
 # --- OPTIONAL ENHANCEMENTS SECTION --- #
 with st.expander("🛠 Optional Enhancements You Can Add"):
@@ -318,4 +534,14 @@ with st.expander("🛠 Optional Enhancements You Can Add"):
     | 🏆 *Gamified Nudges* | Earn fun *badges/achievements* when you hit savings goals |
     | 📤 *Export Reports* | Export your data and insights to *PDF or Excel* format |
     """)
-    st.info("💡 Let me know which one you want to build next and I’ll guide you step by step!")
\ No newline at end of file
+    st.info("💡 Let me know which one you want to build next and I’ll guide you step by step!")
+# --- DEBUG PANEL --- #
+# With METRICS=1, add ?debug=1 to the URL to see where this rerun's time went
+run_trace = metrics.end_run()
+if metrics.ENABLED and st.query_params.get("debug"):
+    with st.expander("🐞 Debug: timings and counters"):
+        st.caption("This rerun")
+        st.dataframe(pd.DataFrame(run_trace, columns=["span", "seconds"]), hide_index=True)
+        st.caption("Since the server started")
+        st.dataframe(pd.DataFrame(metrics.span_summary(), columns=["span", "count", "mean_s", "total_s"]), hide_index=True)
+        st.dataframe(pd.DataFrame(metrics.counter_summary(), columns=["counter", "labels", "value"]).astype({"labels": str}), hide_index=True)
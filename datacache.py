@@ -0,0 +1,125 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import metrics
+
+# --- PER-USER DATA CACHE --- #
+# Each user's hot data (transaction frame, rollup cube, filter index, upload,
+# and the dashboard's forecasts and per-filter slices) is cached under
+# (kind, user, data version) and the cache is bounded by bytes rather than
+# entry count: a handful of large tenants and many small ones can share one
+# server process. When a user's data version moves on,
+# their older entries are dropped (after being used to derive the new one,
+# where the kind supports it); past the budget, the least recently used
+# entries go first, whoever they belong to.
+BUDGET_MB = int(os.environ.get("DATA_CACHE_MB", "1024"))
+SAMPLE_ROWS = 1000
+
+
+def _frame_bytes(frame):
+    # memory_usage(deep=True) walks every string; a strided sample of each
+    # text column is close enough and stays cheap on million-row frames
+    size = int(frame.memory_usage(deep=False).sum())
+    for col in frame.columns[(frame.dtypes == object).to_numpy()]:
+        values = frame[col]
+        sample = values.iloc[::max(1, len(values) // SAMPLE_ROWS)]
+        if len(sample):
+            size += int(sample.map(sys.getsizeof).mean() * len(values))
+    return size
+
+
+def sizeof(value, seen):
+    # Rough resident size; objects whose id is in `seen` are not counted again
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, pd.Series):
+        value = value.to_frame()
+    if isinstance(value, pd.DataFrame):
+        return _frame_bytes(value)
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k, seen) + sizeof(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(sizeof(v, seen) for v in value)
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + sizeof(vars(value), seen)
+    return sys.getsizeof(value)
+
+
+class DataCache:
+    def __init__(self, budget_bytes=BUDGET_MB << 20):
+        self.budget = budget_bytes
+        self.entries = OrderedDict()  # (kind, user, version) -> (value, size)
+        self.total = 0
+        self.lock = threading.Lock()
+        self.building = {}
+
+    def get(self, kind, user, version, build, update=None):
+        # update(value, old_version) derives the entry from the user's cached
+        # older version; returning None falls back to build()
+        key = (kind, user, version)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                metrics.inc("data_cache_requests_total", kind=kind, result="hit")
+                return self.entries[key][0]
+            build_lock = self.building.setdefault(key, threading.Lock())
+        # Sessions asking for the same entry wait for one build
+        with build_lock:
+            try:
+                with self.lock:
+                    if key in self.entries:
+                        metrics.inc("data_cache_requests_total", kind=kind, result="wait")
+                        return self.entries[key][0]
+                value = None
+                result = "miss"
+                if update is not None:
+                    with self.lock:
+                        older = [(k, v) for k, (v, _) in self.entries.items() if k[:2] == key[:2]]
+                    if older:
+                        (_, _, old_version), old_value = older[-1]
+                        with metrics.span(f"data_cache_update:{kind}"):
+                            value = update(old_value, old_version)
+                        if value is not None:
+                            result = "update"
+                if value is None:
+                    with metrics.span(f"data_cache_build:{kind}"):
+                        value = build()
+                metrics.inc("data_cache_requests_total", kind=kind, result=result)
+                with self.lock:
+                    for old in [k for k in self.entries if k[:2] == key[:2]]:
+                        self._drop(old)
+                    # A frame shared with another entry (an index over the
+                    # store frame, say) is charged to the entry cached first
+                    size = sizeof(value, {id(v) for v, _ in self.entries.values()})
+                    self.entries[key] = (value, size)
+                    self.total += size
+                    # The entry just built stays even if it alone exceeds the budget
+                    while self.total > self.budget and len(self.entries) > 1:
+                        evicted = next(iter(self.entries))
+                        self._drop(evicted)
+                        metrics.inc("data_cache_evictions_total", kind=evicted[0])
+            finally:
+                # Also after a failed build, so the next caller retries
+                # instead of finding a stale lock
+                with self.lock:
+                    if self.building.get(key) is build_lock:
+                        del self.building[key]
+        return value
+
+    def stats(self):
+        # Gauges for the metrics endpoint
+        with self.lock:
+            return [("data_cache_bytes", {}, self.total), ("data_cache_entries", {}, len(self.entries)),
+                    ("data_cache_budget_bytes", {}, self.budget)]
+
+    def _drop(self, key):
+        _, size = self.entries.pop(key)
+        self.total -= size
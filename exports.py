@@ -0,0 +1,338 @@
+import logging
+import os
+import secrets
+import shutil
+import threading
+import time
+import zipfile
+from xml.sax.saxutils import escape
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import metrics
+
+# --- STREAMING EXPORT --- #
+# The filtered transactions are written to disk a chunk of source rows at a
+# time (see FilterIndex.chunks), so memory stays flat however many rows the
+# selection has. A summary table (total, per category, per month) comes from
+# the rollup cells. Files go into a random directory under static/exports.
+# By default the dashboard hands them out through the logged-in session. If
+# static serving is switched on (opt-in, .streamlit/config.toml), Streamlit's
+# static file handler streams them from disk instead, with no authentication:
+# the random directory name is the only key. Either way exports are
+# short-lived: a session's previous export is deleted when it prepares a new
+# one, and a background cleaner removes anything older than TTL_SECONDS.
+# The static handler refuses files over 200 MB, so large exports are split
+# into numbered parts.
+EXPORT_DIR = os.path.join("static", "exports")
+FORMATS = ["csv", "parquet", "xlsx"]
+MIME_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+COLUMNS = ["txn_id", "datetime", "amount", "category", "type", "app", "description"]
+CHUNK_ROWS = 100_000
+PART_BYTES = 190 << 20
+TTL_SECONDS = 30 * 60
+CLEAN_INTERVAL = 60
+XLSX_MAX_ROWS = 1_048_576
+XLSX_BATCH_ROWS = 20_000  # rows turned into XML at once
+
+log = logging.getLogger(__name__)
+
+
+def summary_table(cells):
+    # One long table in every format: section, label, spent, transactions
+    month = cells["day"].dt.to_period("M").astype(str).rename("label")
+    by_category = cells.groupby("category")[["sum", "count"]].sum().rename_axis("label").reset_index()
+    by_month = cells.groupby(month)[["sum", "count"]].sum().reset_index()
+    table = pd.concat([
+        pd.DataFrame({"section": "Total", "label": "All", "sum": [cells["sum"].sum()], "count": [cells["count"].sum()]}),
+        by_category.assign(section="Category"),
+        by_month.assign(section="Month"),
+    ], ignore_index=True)
+    table = table.rename(columns={"sum": "spent", "count": "transactions"})
+    table["spent"] = table["spent"].round(2)
+    return table[["section", "label", "spent", "transactions"]].astype({"transactions": "int64"})
+
+
+def to_text_table(frame):
+    # CSV and XLSX get plain strings and whole-second timestamps
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    columns = []
+    for field, column in zip(table.schema, table.columns):
+        if pa.types.is_dictionary(field.type):
+            column = column.cast(pa.string())
+        elif pa.types.is_timestamp(field.type):
+            column = column.cast(pa.timestamp("s"), safe=False)
+        columns.append(column)
+    return pa.Table.from_arrays(columns, names=table.column_names)
+
+
+# --- FORMAT WRITERS --- #
+# Each writes one part file: write(frame) per chunk, size() in bytes so far
+class CsvPart:
+    def __init__(self, path):
+        self.sink = pa.OSFile(path, "wb")
+        self.writer = None
+
+    def write(self, frame):
+        table = to_text_table(frame)
+        if self.writer is None:
+            self.writer = pacsv.CSVWriter(self.sink, table.schema)
+        self.writer.write_table(table)
+
+    def size(self):
+        return self.sink.tell()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.sink.close()
+
+
+class ParquetPart:
+    # Keeps dictionary categories and nanosecond timestamps; one row group per chunk
+    def __init__(self, path):
+        self.sink = pa.OSFile(path, "wb")
+        self.writer = None
+
+    def write(self, frame):
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.sink, table.schema, compression="zstd")
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def size(self):
+        return self.sink.tell()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.sink.close()
+
+
+XLSX_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+XLSX_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+XLSX_HEAD = b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+XLSX_STYLES = (
+    f'<styleSheet xmlns="{XLSX_NS}">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+EXCEL_EPOCH_SECONDS = 2209161600  # 1899-12-30, Excel's day zero, to 1970-01-01
+INVALID_XML = r"[\x00-\x08\x0b\x0c\x0e-\x1f]"
+
+
+def _xlsx_cells(column):
+    # One <c> element per value, built a column at a time by Arrow kernels
+    if pa.types.is_timestamp(column.type):
+        seconds = pc.add(pc.cast(column, pa.int64()), EXCEL_EPOCH_SECONDS)
+        days = pc.divide(pc.cast(seconds, pa.float64()), 86400.0)
+        cells = pc.binary_join_element_wise('<c s="1"><v>', pc.cast(days, pa.string()), "</v></c>", "")
+    elif pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+        cells = pc.binary_join_element_wise("<c><v>", pc.cast(column, pa.string()), "</v></c>", "")
+    else:
+        text = pc.replace_substring_regex(pc.cast(column, pa.string()), INVALID_XML, "")
+        for char, entity in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;")):
+            text = pc.replace_substring(text, char, entity)
+        cells = pc.binary_join_element_wise('<c t="inlineStr"><is><t xml:space="preserve">', text, "</t></is></c>", "")
+    return pc.fill_null(cells, "<c/>")
+
+
+class XlsxPart:
+    # A minimal streaming workbook: each sheet's XML is deflated straight
+    # into the zip as rows arrive, with strings inline so there is no
+    # shared-string table to hold. Rows past Excel's sheet limit continue
+    # on a new sheet.
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        # Fastest deflate level: sheet XML is repetitive enough that level 1
+        # comes close to the default size at a fraction of the time
+        self.zip = zipfile.ZipFile(self.file, "w", zipfile.ZIP_DEFLATED, compresslevel=1)
+        self.sheets = []
+        self.stream = None
+        self.rows = 0
+        self.title = "Transactions"
+
+    def add_sheet(self, name, columns):
+        self._end_sheet()
+        self.sheets.append(name)
+        self.stream = self.zip.open(f"xl/worksheets/sheet{len(self.sheets)}.xml", "w", force_zip64=True)
+        self.stream.write(XLSX_HEAD + f'<worksheet xmlns="{XLSX_NS}"><sheetData>'.encode())
+        header = "".join(f'<c t="inlineStr"><is><t>{escape(str(c))}</t></is></c>' for c in columns)
+        self.stream.write(f"<row>{header}</row>".encode())
+        self.rows = 1
+
+    def write_sheet(self, name, frame):
+        self.add_sheet(name, frame.columns)
+        self._write_rows(to_text_table(frame))
+        self._end_sheet()
+
+    def write(self, frame):
+        table = to_text_table(frame)
+        while len(table):
+            if self.stream is None or self.rows >= XLSX_MAX_ROWS:
+                number = sum(name.startswith(self.title) for name in self.sheets) + 1
+                self.add_sheet(self.title if number == 1 else f"{self.title} {number}", table.column_names)
+            room = XLSX_MAX_ROWS - self.rows
+            self._write_rows(table.slice(0, room))
+            table = table.slice(room)
+
+    def _write_rows(self, table):
+        for start in range(0, len(table), XLSX_BATCH_ROWS):
+            batch = table.slice(start, XLSX_BATCH_ROWS)
+            rows = pc.binary_join_element_wise("<row>", *[_xlsx_cells(column) for column in batch.columns], "</row>", "")
+            # The joined rows sit back to back in the array's data buffer
+            for chunk in rows.chunks:
+                offsets = np.frombuffer(chunk.buffers()[1], dtype="int32")
+                data = memoryview(chunk.buffers()[2])
+                self.stream.write(data[offsets[chunk.offset]:offsets[chunk.offset + len(chunk)]])
+        self.rows += len(table)
+
+    def _end_sheet(self):
+        if self.stream is not None:
+            self.stream.write(b"</sheetData></worksheet>")
+            self.stream.close()
+            self.stream = None
+
+    def size(self):
+        return self.file.tell()
+
+    def close(self):
+        if not any(name.startswith(self.title) for name in self.sheets):
+            self.add_sheet(self.title, COLUMNS)
+        self._end_sheet()
+        sheets = "".join(f'<sheet name="{escape(name)}" sheetId="{i}" r:id="rId{i}"/>'
+                         for i, name in enumerate(self.sheets, 1))
+        self.zip.writestr("xl/workbook.xml", XLSX_HEAD.decode()
+                          + f'<workbook xmlns="{XLSX_NS}" xmlns:r="{XLSX_REL}"><sheets>{sheets}</sheets></workbook>')
+        rels = "".join(f'<Relationship Id="rId{i}" Type="{XLSX_REL}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                       for i in range(1, len(self.sheets) + 1))
+        styles_id = len(self.sheets) + 1
+        rels += f'<Relationship Id="rId{styles_id}" Type="{XLSX_REL}/styles" Target="styles.xml"/>'
+        package = "http://schemas.openxmlformats.org/package/2006/relationships"
+        self.zip.writestr("xl/_rels/workbook.xml.rels", XLSX_HEAD.decode() + f'<Relationships xmlns="{package}">{rels}</Relationships>')
+        self.zip.writestr("xl/styles.xml", XLSX_HEAD.decode() + XLSX_STYLES)
+        self.zip.writestr("_rels/.rels", XLSX_HEAD.decode() + f'<Relationships xmlns="{package}">'
+                          f'<Relationship Id="rId1" Type="{XLSX_REL}/officeDocument" Target="xl/workbook.xml"/></Relationships>')
+        office = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+        overrides = "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{office}.worksheet+xml"/>'
+                            for i in range(1, len(self.sheets) + 1))
+        self.zip.writestr("[Content_Types].xml", XLSX_HEAD.decode()
+                          + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                          '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                          '<Default Extension="xml" ContentType="application/xml"/>'
+                          f'<Override PartName="/xl/workbook.xml" ContentType="{office}.sheet.main+xml"/>'
+                          f'<Override PartName="/xl/styles.xml" ContentType="{office}.styles+xml"/>'
+                          f'{overrides}</Types>')
+        self.zip.close()
+        self.file.close()
+
+
+WRITERS = {"csv": CsvPart, "parquet": ParquetPart, "xlsx": XlsxPart}
+
+
+# --- EXPORT FILES --- #
+def clean_exports(directory=EXPORT_DIR, ttl=TTL_SECONDS):
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    cutoff = time.time() - ttl
+    for name in names:
+        path = os.path.join(directory, name)
+        # A session replacing its export, or another cleaner, can remove
+        # the entry between the listing and here
+        try:
+            if os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.warning("Could not remove expired export %s: %s", path, e)
+
+
+def remove_export(paths, directory=EXPORT_DIR):
+    # All parts of one export share its random directory
+    if not paths:
+        return
+    out_dir = os.path.dirname(paths[0])
+    if os.path.dirname(os.path.abspath(out_dir)) == os.path.abspath(directory):
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def start_cleaner(directory=EXPORT_DIR, interval=CLEAN_INTERVAL):
+    # Expired exports go away even when nobody prepares another one
+    def run():
+        while True:
+            try:
+                clean_exports(directory)
+            except Exception:
+                log.exception("Export cleanup failed")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="export-cleaner", daemon=True)
+    thread.start()
+    return thread
+
+
+def part_name(stem, number, fmt):
+    return f"{stem}.{fmt}" if number == 1 else f"{stem}-part{number}.{fmt}"
+
+
+@metrics.timed("export")
+def export_transactions(chunks, cells, fmt, stem="transactions", directory=EXPORT_DIR,
+                        part_bytes=PART_BYTES):
+    # Returns the paths written, summary first for CSV and Parquet; in XLSX
+    # the summary is the first sheet of the first part
+    clean_exports(directory)
+    out_dir = os.path.join(directory, secrets.token_urlsafe(16))
+    os.makedirs(out_dir)
+    summary = summary_table(cells)
+    paths = []
+    if fmt != "xlsx":
+        paths.append(os.path.join(out_dir, f"{stem}-summary.{fmt}"))
+        part = WRITERS[fmt](paths[-1])
+        part.write(summary)
+        part.close()
+
+    part, number = None, 0
+    for chunk in chunks:
+        if part is None:
+            number += 1
+            paths.append(os.path.join(out_dir, part_name(stem, number, fmt)))
+            part = WRITERS[fmt](paths[-1])
+            if fmt == "xlsx" and number == 1:
+                part.write_sheet("Summary", summary)
+        part.write(chunk[COLUMNS])
+        if part.size() >= part_bytes:
+            part.close()
+            part = None
+    if part is None and number == 0:
+        # Nothing selected: still hand back a file with just the headers
+        paths.append(os.path.join(out_dir, part_name(stem, 1, fmt)))
+        part = WRITERS[fmt](paths[-1])
+        if fmt == "xlsx":
+            part.write_sheet("Summary", summary)
+        else:
+            part.write(pd.DataFrame({column: pd.Series(dtype="object") for column in COLUMNS}))
+    if part is not None:
+        part.close()
+    return paths
+
+
+def static_url(path):
+    # Streamlit serves ./static/<path> at app/static/<path>
+    return "app/static/" + os.path.relpath(path, "static").replace(os.sep, "/")
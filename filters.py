@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+# --- FILTER INDEX --- #
+# Rows are kept sorted by timestamp so a date range is two binary searches
+# and a positional slice (a view, not a copy). Category/type filters look up
+# categorical codes in a small boolean table instead of running isin on strings.
+
+
+def _codes(values):
+    categorical = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype("category")
+    # Shift by one so missing values (code -1) land on slot 0
+    return categorical.cat.codes.to_numpy() + 1, categorical.cat.categories
+
+
+def _allowed(categories, selected):
+    table = np.zeros(len(categories) + 1, dtype=bool)
+    table[1:] = categories.isin(list(selected))
+    return table
+
+
+class FilterIndex:
+    def __init__(self, df):
+        ts = df["datetime"].to_numpy(dtype="datetime64[ns]").view("int64")
+        if len(ts) and not (ts[1:] >= ts[:-1]).all():
+            order = np.argsort(ts, kind="stable")
+            df = df.iloc[order].reset_index(drop=True)
+            ts = ts[order]
+        self.df = df
+        self.ts = ts
+        self.category_codes, self.categories = _codes(df["category"])
+        self.type_codes, self.types = _codes(df["type"])
+
+    def bounds(self, start=None, end=None):
+        lo = 0 if start is None else np.searchsorted(self.ts, pd.Timestamp(start).value, side="left")
+        if end is None:
+            hi = len(self.ts)
+        else:
+            # `end` is an inclusive calendar day
+            day_after = (pd.Timestamp(end).normalize() + pd.Timedelta(days=1)).value
+            hi = np.searchsorted(self.ts, day_after, side="left")
+        return int(lo), int(max(hi, lo))
+
+    def select(self, types=None, categories=None, start=None, end=None):
+        lo, hi = self.bounds(start, end)
+        return self._select(lo, hi, types, categories)
+
+    def chunks(self, rows, types=None, categories=None, start=None, end=None):
+        # The same selection in pieces of at most `rows` source rows, so a
+        # caller streaming it out never holds more than one piece
+        lo, hi = self.bounds(start, end)
+        for chunk_lo in range(lo, hi, rows):
+            chunk = self._select(chunk_lo, min(chunk_lo + rows, hi), types, categories)
+            if len(chunk):
+                yield chunk
+
+    def _select(self, lo, hi, types, categories):
+        view = self.df.iloc[lo:hi]
+        mask = None
+        if types is not None:
+            allowed = _allowed(self.types, types)
+            if not allowed[1:].all():
+                mask = allowed[self.type_codes[lo:hi]]
+        if categories is not None:
+            allowed = _allowed(self.categories, categories)
+            if not allowed[1:].all():
+                category_mask = allowed[self.category_codes[lo:hi]]
+                mask = category_mask if mask is None else mask & category_mask
+        # Unfiltered dimensions keep the slice as a view of the shared frame
+        return view if mask is None else view[mask]
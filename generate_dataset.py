@@ -1,7 +1,31 @@
-import pandas as pd
+import argparse
+import os
+import time
 import numpy as np
-import random
-from datetime import datetime, timedelta
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import store
+
+# --- SYNTHETIC LEDGER --- #
+# Builds a multi-user ledger with NumPy, a chunk of users at a time, and
+# writes each chunk before generating the next, so memory is bounded by
+# --chunk-rows whatever the total. Output is reproducible: it depends on
+# --seed and the other arguments, but not on --chunk-rows.
+#
+# Each user gets a profile (transaction volume, spending power, a category
+# mix drawn around the typical one, a rent amount and due day, a set of
+# subscriptions). Day-to-day spend follows weekly and yearly seasonality and
+# a per-category time-of-day curve; rent and subscriptions recur monthly.
+# A share of rows look like untagged Razorpay payments: a merchant name, a
+# pay_ id and no category.
+#   python generate_dataset.py                                   # 1,000 rows, one user
+#
+# csv and arrow output goes to generated_transactions.csv or .arrow unless
+# --out is given; the bundled mock_transactions_*.csv files have a different schema.
+#   python generate_dataset.py --users 5000 --rows 20000000 --format arrow --out data/ledger.arrow
+#   python generate_dataset.py --users 200 --rows 1000000 --format store
 
 # Define categories as needs and wants
 categories = {
@@ -17,35 +41,258 @@ categories = {
     'Food Delivery': 'want',
     'Subscriptions': 'want'
 }
+CATEGORY_NAMES = [""] + list(categories)  # "" is an untagged payment
+TYPE_NAMES = ["need", "want", "expense"]
+
+# Day-to-day categories: share of a typical user's transactions, median
+# amount (₹) and log-normal spread
+DAILY = {
+    "Groceries": (0.18, 900, 0.6),
+    "Transport": (0.20, 250, 0.7),
+    "Food Delivery": (0.16, 450, 0.4),
+    "Dining Out": (0.10, 1200, 0.6),
+    "Shopping": (0.10, 2000, 0.9),
+    "Entertainment": (0.07, 700, 0.6),
+    "Utilities": (0.05, 1500, 0.5),
+    "Healthcare": (0.04, 800, 0.9),
+    "Travel": (0.02, 6000, 0.8),
+}
+DAILY_NAMES = list(DAILY)
+DAILY_SHARE = np.array([share for share, _, _ in DAILY.values()])
+DAILY_MEDIAN = np.array([median for _, median, _ in DAILY.values()])
+DAILY_SPREAD = np.array([spread for _, _, spread in DAILY.values()])
+RENT_MEDIAN = 18000
+SUBSCRIPTIONS = [("Netflix", 649), ("Spotify", 119), ("Hotstar", 299), ("Amazon Prime", 299),
+                 ("YouTube Premium", 129), ("Gaana", 99)]
+SUBSCRIPTION_RATE = 0.35
+SUBSCRIPTION_NAMES = np.array([name for name, _ in SUBSCRIPTIONS], dtype=object)
+SUBSCRIPTION_PRICES = np.array([price for _, price in SUBSCRIPTIONS], dtype="float64")
+
+MERCHANTS = {
+    "Groceries": ["BigBasket", "Blinkit", "Zepto", "DMart", "JioMart", "Sharma Kirana"],
+    "Transport": ["Uber", "Ola", "Rapido", "Namma Metro", "HP Petrol", "FASTag Recharge"],
+    "Food Delivery": ["Swiggy", "Zomato", "EatSure", "Faasos"],
+    "Dining Out": ["Starbucks", "Dominos", "McDonalds", "KFC", "Cafe Coffee Day", "Truffles"],
+    "Shopping": ["Amazon", "Flipkart", "Myntra", "Ajio", "Nykaa", "Decathlon"],
+    "Entertainment": ["BookMyShow", "PVR Cinemas", "INOX", "Steam"],
+    "Utilities": ["BESCOM Electricity", "Airtel Broadband", "Jio Recharge", "Water Bill"],
+    "Healthcare": ["Apollo Pharmacy", "MedPlus", "1mg", "PharmEasy", "City Clinic"],
+    "Travel": ["MakeMyTrip", "IRCTC", "IndiGo", "Goibibo", "OYO"],
+}
+MERCHANT_NAMES = np.array([name for category in DAILY_NAMES for name in MERCHANTS[category]], dtype=object)
+MERCHANT_COUNT = np.array([len(MERCHANTS[category]) for category in DAILY_NAMES])
+MERCHANT_OFFSET = np.concatenate([[0], np.cumsum(MERCHANT_COUNT)[:-1]])
+DAILY_CODES = np.array([CATEGORY_NAMES.index(name) for name in DAILY_NAMES])
+
+
+def _hour_curve(*peaks):
+    # Relative activity per hour: a sum of (hour, width, weight) bumps
+    hours = np.arange(24)
+    curve = sum(weight * np.exp(-0.5 * ((hours - hour) / width) ** 2) for hour, width, weight in peaks)
+    return np.cumsum(curve) / curve.sum()
+
+HOUR_CDF = np.array([{
+    "Groceries": _hour_curve((11, 3, 1), (19, 2, 1)),
+    "Transport": _hour_curve((9, 1.5, 1), (18.5, 1.5, 1), (23, 2, 0.3)),
+    "Food Delivery": _hour_curve((13, 1.5, 1), (21, 1.5, 1.4)),
+    "Dining Out": _hour_curve((13, 1.5, 0.6), (20.5, 1.5, 1)),
+    "Shopping": _hour_curve((15, 4, 1), (22, 1.5, 0.5)),
+    "Entertainment": _hour_curve((19, 3, 1)),
+    "Utilities": _hour_curve((11, 3, 1)),
+    "Healthcare": _hour_curve((11, 2.5, 1), (18, 2, 0.6)),
+    "Travel": _hour_curve((10, 3, 1), (21, 2, 0.5)),
+}[category] for category in DAILY_NAMES])
+
+
+def day_weights(days):
+    # Weekends and the Oct-Nov festive season spend more; a mild yearly wave
+    day = pd.DatetimeIndex(days)
+    doy = day.dayofyear.to_numpy()
+    weights = 1 + 0.1 * np.cos(2 * np.pi * (doy - 355) / 365)
+    weights += 0.3 * (day.dayofweek.to_numpy() >= 5)
+    weights += 0.6 * np.exp(-0.5 * ((doy - 305) / 12) ** 2)
+    return np.cumsum(weights) / weights.sum()
+
+
+# --- ONE USER --- #
+# Every user draws from their own generator, seeded with (seed, user index),
+# so a user's rows depend only on --seed, --users and --rows, not on how
+# the users are split into chunks. Transaction volumes are drawn for all
+# users up front and scaled to average 1, so the total stays near --rows.
+def user_volumes(seed, users):
+    volume = np.random.default_rng(seed).lognormal(0, 0.5, users)
+    return volume / volume.mean()
+
+
+def generate_user(rng, volume, daily_rows, days, months, day_cdf, end_ns, untagged):
+    # Profile
+    count = rng.poisson(daily_rows * volume)
+    mix = rng.dirichlet(DAILY_SHARE * 40).cumsum()
+    power = rng.lognormal(0, 0.35)
+    rent = np.round(RENT_MEDIAN * power * rng.lognormal(0, 0.2), -2)
+    rent_day = rng.integers(1, 6)
+    subscribed = np.flatnonzero(rng.random(len(SUBSCRIPTIONS)) < SUBSCRIPTION_RATE)
+
+    # Day-to-day spend
+    category = np.searchsorted(mix[:-1], rng.random(count), side="right")
+    day = np.searchsorted(day_cdf, rng.random(count))
+    hour = (rng.random(count)[:, None] > HOUR_CDF[category]).sum(axis=1)
+    ts = (days[day].astype("datetime64[s]").astype("int64") + hour * 3600 + rng.integers(0, 3600, count)) * 10**9
+    amount = np.round(DAILY_MEDIAN[category] * power * rng.lognormal(0, DAILY_SPREAD[category]), 2)
+    merchant = MERCHANT_NAMES[MERCHANT_OFFSET[category] + (rng.random(count) * MERCHANT_COUNT[category]).astype("int64")]
+    category_code = DAILY_CODES[category]
+
+    # Monthly rent and subscriptions
+    month_start = months.astype("datetime64[s]").astype("int64")
+    rent_ts = (month_start + (rent_day - 1) * 86_400 + 10 * 3600) * 10**9
+    sub_day = rng.integers(1, 29, len(subscribed))
+    sub_index = np.repeat(subscribed, len(months))
+    sub_ts = (np.tile(month_start, len(subscribed)) + (np.repeat(sub_day, len(months)) - 1) * 86_400 + 7 * 3600) * 10**9
+
+    ts = np.concatenate([ts, rent_ts, sub_ts])
+    amount = np.concatenate([amount, np.full(len(months), rent), SUBSCRIPTION_PRICES[sub_index]])
+    category_code = np.concatenate([
+        category_code,
+        np.full(len(months), CATEGORY_NAMES.index("Rent")),
+        np.full(len(sub_index), CATEGORY_NAMES.index("Subscriptions")),
+    ])
+    app = np.concatenate([merchant, np.full(len(months), "NoBroker Rent", dtype=object), SUBSCRIPTION_NAMES[sub_index]])
+    # Recurring payments outside the date range are dropped
+    order = np.argsort(ts, kind="stable")
+    order = order[ts[order] < end_ns]
+    return ts[order], amount[order], category_code[order], app[order], rng.random(len(order)) < untagged
+
+
+# --- ONE CHUNK OF USERS --- #
+def generate_chunk(seed, first_user, volume, daily_rows, start, end, untagged):
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D"))
+    months = np.unique(days.astype("datetime64[M]"))
+    day_cdf = day_weights(days)
+    end_ns = np.datetime64(end, "D").astype("datetime64[ns]").astype("int64")
+    parts = [
+        generate_user(np.random.default_rng([seed, first_user + i]), v, daily_rows, days, months, day_cdf, end_ns, untagged)
+        for i, v in enumerate(volume)
+    ]
+    ts, amount, category, app, untagged = (np.concatenate(column) for column in zip(*parts))
+    return pd.DataFrame({
+        "owner": np.repeat(np.arange(len(volume)), [len(part[0]) for part in parts]),
+        "ts": ts,
+        "amount": amount,
+        "category": category,
+        "app": app,
+        "untagged": untagged,
+    })
+
+
+def to_arrow(frame, first_user, first_row):
+    n = len(frame)
+    untagged = frame["untagged"].to_numpy()
+    category = np.where(untagged, 0, frame["category"].to_numpy()).astype("int32")
+    kind = np.array([TYPE_NAMES.index(categories.get(name, "want")) for name in CATEGORY_NAMES])
+    kind = np.where(untagged, TYPE_NAMES.index("expense"), kind[frame["category"].to_numpy()]).astype("int32")
+    row = pc.cast(pa.array(np.arange(first_row, first_row + n)), pa.string())
+    txn_id = pc.if_else(pa.array(untagged), pc.binary_join_element_wise("pay_G", row, ""), pc.binary_join_element_wise("gen-", row, ""))
+    app = pa.array(frame["app"].to_numpy(), pa.string())
+    labels = pa.array(np.array(CATEGORY_NAMES, dtype=object)[frame["category"].to_numpy()], pa.string())
+    description = pc.if_else(pa.array(untagged), app, pc.binary_join_element_wise(labels, pa.scalar(" expense"), ""))
+    user = pc.utf8_lpad(pc.cast(pa.array(frame["owner"].to_numpy() + first_user), pa.string()), 6, "0")
+    return pa.table({
+        "user": pc.binary_join_element_wise("user", user, ""),
+        "txn_id": txn_id,
+        "ts": pa.array(frame["ts"].to_numpy(), pa.int64()),
+        "amount": pa.array(frame["amount"].to_numpy(), pa.float64()),
+        "category": pa.DictionaryArray.from_arrays(pa.array(category), pa.array(CATEGORY_NAMES)),
+        "type": pa.DictionaryArray.from_arrays(pa.array(kind), pa.array(TYPE_NAMES)),
+        "app": app,
+        "description": description,
+    })
+
+
+# --- OUTPUT --- #
+# csv: one file with a user column; arrow: one Arrow IPC file in the store
+# schema plus a user column; store: each user's rows written straight into
+# their partition as payments.arrow, ready for the dashboard.
+def default_out(fmt):
+    return f"generated_transactions.{fmt}"
+
+
+def open_writer(fmt, out):
+    if fmt == "store":
+        return None
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    schema = pa.schema([("user", pa.string())] + list(store.SCHEMA))
+    if fmt == "arrow":
+        return pa.ipc.new_file(out, schema)
+    csv_schema = pa.schema([
+        ("user", pa.string()), ("txn_id", pa.string()), ("datetime", pa.timestamp("s")),
+        ("category", pa.string()), ("amount", pa.float64()), ("description", pa.string()),
+        ("type", pa.string()), ("app", pa.string()),
+    ])
+    return pacsv.CSVWriter(out, csv_schema)
+
+
+def write_chunk(writer, fmt, table):
+    if fmt == "arrow":
+        writer.write_table(table)
+    elif fmt == "csv":
+        writer.write_table(pa.table({
+            "user": table["user"],
+            "txn_id": table["txn_id"],
+            "datetime": pc.cast(pc.cast(table["ts"], pa.timestamp("ns")), pa.timestamp("s")),
+            "category": pc.cast(table["category"], pa.string()),
+            "amount": table["amount"],
+            "description": table["description"],
+            "type": pc.cast(table["type"], pa.string()),
+            "app": table["app"],
+        }))
+    else:
+        users = table["user"].to_numpy()
+        bounds = np.flatnonzero(users[1:] != users[:-1]) + 1
+        for lo, hi in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(users)]])):
+            store.write_table(table.slice(lo, hi - lo).drop_columns(["user"]), store.payments_path(users[lo]))
+
+
+def generate(users=1, rows=1000, start="2024-01-01", end="2025-04-05", untagged=0.1,
+             seed=0, fmt="csv", out=None, chunk_rows=500_000):
+    months = len(pd.period_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), freq="M"))
+    recurring = months * (1 + SUBSCRIPTION_RATE * len(SUBSCRIPTIONS))
+    daily_rows = max(rows / users - recurring, 0)
+    users_per_chunk = max(1, int(chunk_rows / max(rows / users, 1)))
+    volume = user_volumes(seed, users)
+    writer = open_writer(fmt, out or default_out(fmt))
+    written = 0
+    try:
+        for first_user in range(0, users, users_per_chunk):
+            chunk = volume[first_user:first_user + users_per_chunk]
+            frame = generate_chunk(seed, first_user, chunk, daily_rows, start, end, untagged)
+            write_chunk(writer, fmt, to_arrow(frame, first_user, written))
+            written += len(frame)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--rows", type=int, default=1000, help="approximate total rows")
+    parser.add_argument("--start", default="2024-01-01")
+    parser.add_argument("--end", default="2025-04-05", help="exclusive")
+    parser.add_argument("--untagged", type=float, default=0.1, help="share of untagged Razorpay-style rows")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["csv", "arrow", "store"], default="csv")
+    parser.add_argument("--out", help="file for csv/arrow output (default: generated_transactions.<format>)")
+    parser.add_argument("--chunk-rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = generate(args.users, args.rows, args.start, args.end, args.untagged,
+                       args.seed, args.format, args.out, args.chunk_rows)
+    target = store.USERS_DIR if args.format == "store" else args.out or default_out(args.format)
+    print(f"✅ Dataset generated: {written:,} rows for {args.users:,} user(s) in {target} "
+          f"({time.perf_counter() - start:.1f}s)")
+
 
-# Function to generate a single transaction
-def generate_transaction(start_date, end_date):
-    date = start_date + timedelta(seconds=random.randint(0, int((end_date - start_date).total_seconds())))
-    category = random.choice(list(categories.keys()))
-    amount = round(random.uniform(100, 5000), 2)
-    description = f"{category} expense"
-    type_of_expense = categories[category]
-    return {
-        'datetime': date,
-        'date': date.strftime('%Y-%m-%d'),
-        'time': date.strftime('%H:%M:%S'),
-        'month': date.strftime('%B %Y'),
-        'week': f"Week {date.isocalendar()[1]}",
-        'category': category,
-        'amount': amount,
-        'description': description,
-        'type': type_of_expense
-    }
-
-# Generate 1000 transactions between Jan 2024 and April 2025
-start = datetime(2024, 1, 1)
-end = datetime(2025, 4, 5)
-transactions = [generate_transaction(start, end) for _ in range(1000)]
-
-# Create a DataFrame
-df = pd.DataFrame(transactions)
-df.sort_values(by="datetime", inplace=True)
-
-# Save the data
-df.to_csv("mock_transactions_detailed.csv", index=False)
-print("✅ Dataset generated: mock_transactions_detailed.csv")
+if __name__ == "__main__":
+    main()
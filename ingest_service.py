@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import metrics
+import store
+from categorizer import Categorizer
+from razorpay_realtime import ingest_payments
+from razorpay_sync import API_URL, RateLimiter, RazorpaySync
+
+# --- SHARED INGESTION SERVICE --- #
+# One event loop polls every registered Razorpay account. Each account gets
+# its own sync engine, token bucket and on-disk partition; a semaphore caps
+# how many polls run at once across all accounts.
+#
+# Every batch that lands bumps the user's version and is recorded in a
+# short change feed with the newest capture time in the batch. Sessions
+# report which feed versions they have put on screen, which gives the
+# capture-to-screen lag (created_at has one-second resolution).
+FEED_SIZE = 1000
+
+log = logging.getLogger(__name__)
+
+
+class Account:
+    def __init__(self, service, user, key, secret):
+        self.user = user
+        self.credentials = (key, secret)
+        self.seen = store.SeenIndex(user)
+        # Learns from the user's tag log, so manual tags shape the next batch
+        self.categorizer = Categorizer(store.tags_path(user))
+        self.sync = RazorpaySync(
+            key, secret,
+            on_payments=self.on_payments,
+            base_url=service.base_url,
+            cursor_path=os.path.join(store.partition_dir(user), "razorpay_cursor.json"),
+            limiter=RateLimiter(service.requests_per_second, burst=service.burst),
+        )
+        self.service = service
+        self.task = None
+        # Held for a whole poll, so close() waits for one already running
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def on_payments(self, items):
+        # The capture time comes from the payments stored now, not from
+        # already-seen ones a lookback sweep fetched again
+        ingested = ingest_payments(items, self.seen, self.user, self.categorizer)
+        if ingested:
+            self.service.notify(self.user, len(ingested), max(item["created_at"] for item in ingested))
+        return len(ingested)
+
+    def step(self):
+        with self.lock:
+            if self.closed:
+                return 0
+            return self.sync.step()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.seen.close()
+
+
+class IngestService:
+    def __init__(self, max_concurrency=16, requests_per_second=2.0, burst=5, base_url=API_URL):
+        self.base_url = base_url
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.accounts = {}
+        self.versions = {}
+        self.listeners = {}
+        self.feed = {}
+        self.lags = {}
+        self.shown = {}
+        self.lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        # Blocking HTTP and disk work runs on this pool; the semaphore keeps
+        # it from queueing more polls than there are workers.
+        self.loop.set_default_executor(ThreadPoolExecutor(max_concurrency, thread_name_prefix="ingest"))
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.thread = threading.Thread(target=self.loop.run_forever, name="ingest-service", daemon=True)
+        self.thread.start()
+
+    # --- account management (safe to call from any thread) --- #
+    def register(self, user, key, secret):
+        asyncio.run_coroutine_threadsafe(self._register(user, key, secret), self.loop).result()
+
+    def unregister(self, user):
+        asyncio.run_coroutine_threadsafe(self._unregister(user), self.loop).result()
+
+    def stop(self):
+        for user in list(self.accounts):
+            self.unregister(user)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def _register(self, user, key, secret):
+        # Same credentials: keep polling. A new key or a rotated secret
+        # replaces the account, so the poller never keeps a stale secret.
+        existing = self.accounts.get(user)
+        if existing is not None and existing.credentials == (key, secret):
+            return
+        await self._unregister(user)
+        account = Account(self, user, key, secret)
+        account.task = asyncio.create_task(self._poll(account), name=f"poll-{user}")
+        self.accounts[user] = account
+
+    async def _unregister(self, user):
+        account = self.accounts.pop(user, None)
+        if account is not None:
+            account.task.cancel()
+            # Cancelling doesn't stop a poll already on a worker thread
+            await asyncio.to_thread(account.close)
+
+    async def _poll(self, account):
+        while True:
+            async with self.semaphore:
+                delay = await asyncio.to_thread(account.step)
+            await asyncio.sleep(delay)
+
+    # --- subscriptions --- #
+    def version(self, user):
+        with self.lock:
+            return self.versions.get(user, 0)
+
+    def subscribe(self, user, callback):
+        # callback(user, version, ingested) runs on an ingest worker thread
+        with self.lock:
+            self.listeners.setdefault(user, []).append(callback)
+
+    def unsubscribe(self, user, callback):
+        with self.lock:
+            callbacks = self.listeners.get(user, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def notify(self, user, ingested, captured_at=None):
+        if not ingested:
+            return
+        now = time.time()
+        with self.lock:
+            self.versions[user] = self.versions.get(user, 0) + 1
+            version = self.versions[user]
+            change = (version, ingested, now if captured_at is None else captured_at, now)
+            self.feed.setdefault(user, deque(maxlen=FEED_SIZE)).append(change)
+            callbacks = list(self.listeners.get(user, []))
+        metrics.inc("ingest_batches_total")
+        metrics.inc("ingest_rows_total", ingested)
+        for callback in callbacks:
+            try:
+                callback(user, version, ingested)
+            except Exception:
+                log.exception("Ingest subscriber failed for %s", user)
+                metrics.inc("ingest_subscriber_errors_total")
+
+    # --- freshness --- #
+    def mark_shown(self, user, shown, version):
+        # A session has just rendered the changes in (shown, version]
+        now = time.time()
+        with self.lock:
+            lags = self.lags.setdefault(user, deque(maxlen=FEED_SIZE))
+            self.shown[user] = max(self.shown.get(user, 0), version)
+            for change_version, _, captured_at, _ in self.feed.get(user, ()):
+                if shown < change_version <= version:
+                    lags.append(now - captured_at)
+
+    def freshness(self, user):
+        with self.lock:
+            lags = np.array(self.lags.get(user, ()), dtype="float64")
+        if not len(lags):
+            return None
+        return {
+            "samples": len(lags),
+            "last": lags[-1],
+            "p50": np.percentile(lags, 50),
+            "p95": np.percentile(lags, 95),
+        }
+
+    def stats(self):
+        # Gauges for the metrics endpoint, across all accounts: batches
+        # ingested but not yet on any session's screen, and capture-to-screen
+        # lag over each user's recent changes
+        with self.lock:
+            backlog = sum(version - self.shown.get(user, 0) for user, version in self.versions.items())
+            lags = np.fromiter((lag for user_lags in self.lags.values() for lag in user_lags), dtype="float64")
+            accounts = len(self.accounts)
+        samples = [("ingest_accounts", {}, accounts), ("ingest_backlog_batches", {}, backlog)]
+        if len(lags):
+            for quantile in (0.5, 0.95):
+                samples.append(("ingest_lag_seconds", {"quantile": quantile}, round(np.quantile(lags, quantile), 3)))
+            samples.append(("ingest_lag_seconds", {"quantile": 1.0}, round(lags.max(), 3)))
+        return samples
@@ -0,0 +1,214 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- INSTRUMENTATION --- #
+# Timing spans, counters and gauges for the dashboard, the data cache and the
+# ingest service, exposed as Prometheus text on a local port and in the
+# dashboard's debug panel. Off unless METRICS=1: a disabled span() is a
+# shared no-op context, inc() returns at once and timed() hands back the
+# undecorated function, so instrumented code pays next to nothing.
+#   METRICS=1 METRICS_PORT=9464 streamlit run dashboard.py
+#   curl localhost:9464/metrics
+ENABLED = os.environ.get("METRICS", "") not in ("", "0")
+PORT = int(os.environ.get("METRICS_PORT", "9464"))
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_collectors = []  # callables returning [(name, labels dict, value)] at scrape time
+_local = threading.local()
+_NULL = nullcontext()
+log = logging.getLogger(__name__)
+
+
+def _labels(labels):
+    # Values are strings, as in the exposition format, so keys always sort
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    if not ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    if not ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(BUCKETS) + 3)
+        hist[bisect.bisect_left(BUCKETS, seconds)] += 1
+        hist[-2] += seconds
+        hist[-1] += 1
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.append((labels.get("span", name), seconds))
+
+
+class _Span:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe("span_seconds", time.perf_counter() - self.start, span=self.name)
+
+
+def span(name):
+    return _Span(name) if ENABLED else _NULL
+
+
+def timed(name):
+    # Decorator; decided once at import, so a disabled build keeps the bare function
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def add_collector(collect):
+    if ENABLED:
+        with _lock:
+            _collectors.append(collect)
+
+
+# --- RERUN SECTIONS --- #
+# The dashboard is one flat script, so sections are laps: section(name)
+# closes the running section and opens the next. Spans finished on the
+# script thread between start_run() and end_run() make up that run's trace
+# for the debug panel.
+def start_run():
+    if not ENABLED:
+        return
+    _local.trace = []
+    _local.section = None
+    _local.run_start = time.perf_counter()
+
+
+def section(name):
+    if not ENABLED or getattr(_local, "trace", None) is None:
+        return
+    now = time.perf_counter()
+    if _local.section is not None:
+        observe("span_seconds", now - _local.section[1], span="section:" + _local.section[0])
+    _local.section = (name, now) if name else None
+
+
+def end_run():
+    if not ENABLED or getattr(_local, "trace", None) is None:
+        return []
+    section(None)
+    observe("span_seconds", time.perf_counter() - _local.run_start, span="rerun")
+    trace, _local.trace = _local.trace, None
+    return trace
+
+
+# --- EXPOSITION --- #
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(name, labels, value):
+    if labels:
+        pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+        return f"{name}{{{pairs}}} {value}"
+    return f"{name} {value}"
+
+
+def render():
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, list(hist)) for key, hist in _histograms.items())
+        collectors = list(_collectors)
+    lines = []
+    typed = set()
+
+    def declare(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in counters:
+        declare(name, "counter")
+        lines.append(_format(name, labels, value))
+    for (name, labels), hist in histograms:
+        declare(name, "histogram")
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), hist):
+            cumulative += count
+            lines.append(_format(name + "_bucket", labels + (("le", bound),), cumulative))
+        lines.append(_format(name + "_sum", labels, round(hist[-2], 6)))
+        lines.append(_format(name + "_count", labels, hist[-1]))
+    for collect in collectors:
+        try:
+            samples = collect()
+        except Exception as e:
+            log.warning("Metrics collector failed: %s", e)
+            continue
+        for name, labels, value in samples:
+            declare(name, "gauge")
+            lines.append(_format(name, _labels(labels), value))
+    return "\n".join(lines) + "\n"
+
+
+def span_summary():
+    # (span, count, mean seconds, total seconds) for the debug panel
+    with _lock:
+        rows = [(dict(labels).get("span", name), hist[-1], hist[-2])
+                for (name, labels), hist in _histograms.items()]
+    return sorted(((name, count, total / count, total) for name, count, total in rows if count),
+                  key=lambda row: -row[3])
+
+
+def counter_summary():
+    with _lock:
+        return [(name, dict(labels), value) for (name, labels), value in sorted(_counters.items())]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port=PORT, host="127.0.0.1"):
+    # Local only; returns None if the port is taken (another server process)
+    try:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    except OSError as e:
+        log.warning("Metrics endpoint not started on port %s: %s", port, e)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
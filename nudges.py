@@ -1,79 +1,167 @@
 import pandas as pd
-
-def get_gamified_nudges(df, budget, category_budgets=None):
-    nudges = []
-
-    if df.empty:
-        return ["📭 No transactions found for this period. Try adjusting your filters!"]
-
-    total_spent = df["amount"].sum()
-    total_saved = max(budget - total_spent, 0)
-    num_txns = len(df)
-
+import metrics
+import rollups
+
+NO_DATA_NUDGE = "📭 No transactions found for this period. Try adjusting your filters!"
+
+# --- SPEND STATS --- #
+# Every nudge and warning reads one stats table with a row per user, built
+# from a single (user, day, category) grouping. Rules are written as
+# column expressions, so the same rule list scores one user on the
+# dashboard or every user in a nightly batch.
+
+
+def daily_category_from_frame(df, user=""):
+    grouped = df.groupby([df["datetime"].dt.normalize(), "category"], observed=True)["amount"].sum()
+    return grouped.rename_axis(["day", "category"]).reset_index().assign(user=user)
+
+
+def daily_category_from_cells(cells):
+    return cells.groupby(["user", "day", "category"])["sum"].sum().rename("amount").reset_index()
+
+
+def spend_stats(daily_category, budgets):
+    # `budgets` is a scalar or a per-user Series
+    daily = daily_category.groupby(["user", "day"], observed=True)["amount"].sum()
+    by_user = daily.groupby(level="user")
+    stats = pd.DataFrame({
+        "total_spent": by_user.sum(),
+        "active_days": by_user.size(),
+        "low_spend_days": (daily < 200).groupby(level="user").sum(),
+        "high_spend_days": (daily > 2000).groupby(level="user").sum(),
+    })
+    category_spend = daily_category.groupby(["user", "category"], observed=True)["amount"].sum()
+    top = category_spend.sort_values(ascending=False, kind="stable").groupby(level="user").head(1)
+    top = top.reset_index(level="category")
+    stats["top_category"] = top["category"]
+    stats["top_amount"] = top["amount"]
+    stats["budget"] = budgets if not isinstance(budgets, pd.Series) else budgets.reindex(stats.index)
+    stats["total_saved"] = (stats["budget"] - stats["total_spent"]).clip(lower=0)
+    stats["daily_average"] = stats["total_spent"] / stats["active_days"]
+    stats["top_share"] = stats["top_amount"] / stats["total_spent"]
+    return stats
+
+
+# --- RULES --- #
+class Rule:
+    # `when` maps the stats table to a boolean column; `message` is formatted
+    # with the user's stats row. Within a group only the first match fires.
+    def __init__(self, name, when, message, group=None):
+        self.name = name
+        self.when = when
+        self.message = message
+        self.group = group
+
+
+NUDGE_RULES = [
     # 🏅 Budget milestones
-    if total_spent < budget * 0.5:
-        nudges.append("🏅 Great job! You've spent less than 50% of your budget!")
-    elif total_spent < budget:
-        nudges.append("✅ You're within your budget! Keep it going!")
-    else:
-        nudges.append("🚨 You've exceeded your budget. Let’s get back on track!")
-
+    Rule("under_half_budget", lambda s: s["total_spent"] < s["budget"] * 0.5,
+         "🏅 Great job! You've spent less than 50% of your budget!", group="budget"),
+    Rule("within_budget", lambda s: s["total_spent"] < s["budget"],
+         "✅ You're within your budget! Keep it going!", group="budget"),
+    Rule("over_budget", lambda s: s["total_spent"] >= s["budget"],
+         "🚨 You've exceeded your budget. Let’s get back on track!", group="budget"),
     # 🔥 Low-spend streaks
-    df['date'] = df['datetime'].dt.date
-    daily_spend = df.groupby("date")["amount"].sum()
-    low_spend_days = (daily_spend < 200).sum()
-    if low_spend_days >= 3:
-        nudges.append(f"🔥 You had {low_spend_days} low-spend days! That’s solid discipline!")
-
+    Rule("low_spend_days", lambda s: s["low_spend_days"] >= 3,
+         "🔥 You had {low_spend_days} low-spend days! That’s solid discipline!"),
     # 🎯 Single category dominance
-    cat_spend = df.groupby("category")["amount"].sum()
-    if not cat_spend.empty:
-        top_category = cat_spend.idxmax()
-        top_amount = cat_spend.max()
-        if top_amount / total_spent > 0.4:
-            nudges.append(f"🧐 Most of your spend went to **{top_category}**. Consider dialing it down.")
-
+    Rule("category_dominance", lambda s: s["top_share"] > 0.4,
+         "🧐 Most of your spend went to **{top_category}**. Consider dialing it down."),
     # 🎖️ Consistent saving habit
-    daily_average = total_spent / len(daily_spend)
-    if daily_average < 500:
-        nudges.append("🎖️ You’re averaging under ₹500/day. That’s budget champion behavior!")
-
+    Rule("low_daily_average", lambda s: s["daily_average"] < 500,
+         "🎖️ You’re averaging under ₹500/day. That’s budget champion behavior!"),
     # 🧠 Spending awareness
-    high_txn_days = (daily_spend > 2000).sum()
-    if high_txn_days > 2:
-        nudges.append(f"⚠️ You had {high_txn_days} high-spend days. Watch out for spikes!")
-
+    Rule("high_spend_days", lambda s: s["high_spend_days"] > 2,
+         "⚠️ You had {high_spend_days} high-spend days. Watch out for spikes!"),
     # 🏆 Saving badges
-    if total_saved >= 2000:
-        nudges.append("💎 You earned the **Diamond** badge for saving ₹2000+!")
-    elif total_saved >= 1001:
-        nudges.append("🏆 You earned the **Platinum** badge for saving ₹1001–2000!")
-    elif total_saved >= 501:
-        nudges.append("🥇 You earned the **Gold** badge for saving ₹501–1000!")
-    elif total_saved >= 101:
-        nudges.append("🥈 You earned the **Silver** badge for saving ₹101–500!")
-    elif total_saved >= 1:
-        nudges.append("🥉 You earned the **Bronze** badge for saving ₹1–100!")
+    Rule("diamond", lambda s: s["total_saved"] >= 2000,
+         "💎 You earned the **Diamond** badge for saving ₹2000+!", group="badge"),
+    Rule("platinum", lambda s: s["total_saved"] >= 1001,
+         "🏆 You earned the **Platinum** badge for saving ₹1001–2000!", group="badge"),
+    Rule("gold", lambda s: s["total_saved"] >= 501,
+         "🥇 You earned the **Gold** badge for saving ₹501–1000!", group="badge"),
+    Rule("silver", lambda s: s["total_saved"] >= 101,
+         "🥈 You earned the **Silver** badge for saving ₹101–500!", group="badge"),
+    Rule("bronze", lambda s: s["total_saved"] >= 1,
+         "🥉 You earned the **Bronze** badge for saving ₹1–100!", group="badge"),
+]
+
+
+def evaluate(stats, rules=NUDGE_RULES):
+    # Returns {user: [messages]} in rule order
+    messages = {user: [] for user in stats.index}
+    claimed = {}
+    for rule in rules:
+        hits = rule.when(stats).fillna(False).astype(bool)
+        if rule.group is not None:
+            taken = claimed.setdefault(rule.group, pd.Series(False, index=stats.index))
+            hits &= ~taken
+            claimed[rule.group] = taken | hits
+        for user, row in stats[hits].iterrows():
+            messages[user].append(rule.message.format(**row))
+    return messages
+
+
+def evaluate_users(cells, budgets, users=None):
+    # Nightly batch: nudges for every user in a cube slice in one pass
+    messages = evaluate(spend_stats(daily_category_from_cells(cells), budgets))
+    for user in users or []:
+        messages.setdefault(user, [NO_DATA_NUDGE])
+    return messages
+
+
+# --- SINGLE-USER ENTRY POINTS --- #
+@metrics.timed("get_gamified_nudges")
+def get_gamified_nudges(df, budget, category_budgets=None):
+    if df.empty:
+        return [NO_DATA_NUDGE]
+    return evaluate(spend_stats(daily_category_from_frame(df), budget))[""]
 
-    return nudges
 
+@metrics.timed("get_cube_nudges")
+def get_cube_nudges(cells, budget):
+    if cells.empty:
+        return [NO_DATA_NUDGE]
+    stats = spend_stats(daily_category_from_cells(cells.assign(user="")), budget)
+    return evaluate(stats)[""]
 
-def get_category_warnings(df, category_budgets):
-    warnings = []
 
-    if df.empty:
-        return warnings
+# --- CATEGORY BUDGET WARNINGS --- #
+WARNING_RATIO = 0.6
+
 
-    df['month'] = df['datetime'].dt.to_period('M')
-    monthly_df = df[df['month'] == pd.Timestamp.now().to_period('M')]
+def _warning(category, spent, budget):
+    return f"⚠️ You've spent ₹{spent:.0f} in **{category}**, which is over 60% of its ₹{budget} budget!"
 
-    cat_spending = monthly_df.groupby("category")["amount"].sum()
 
-    for category, spent in cat_spending.items():
+def category_warnings(category_spend, category_budgets):
+    warnings = []
+    for category, spent in category_spend.items():
         budget = category_budgets.get(category, None)
-        if budget:
-            ratio = spent / budget
-            if ratio > 0.6:
-                warnings.append(f"⚠️ You've spent ₹{spent:.0f} in **{category}**, which is over 60% of its ₹{budget} budget!")
+        if budget and spent / budget > WARNING_RATIO:
+            warnings.append(_warning(category, spent, budget))
+    return warnings
+
 
+def category_warnings_by_user(cells, category_budgets):
+    # Batch version: `category_budgets` is a Series indexed by (user, category)
+    spend = cells.groupby(["user", "category"])["sum"].sum()
+    budget = category_budgets.reindex(spend.index)
+    over = (budget > 0) & (spend / budget > WARNING_RATIO)
+    warnings = {}
+    for (user, category), spent in spend[over].items():
+        warnings.setdefault(user, []).append(_warning(category, spent, budget[(user, category)]))
     return warnings
+
+
+def get_category_warnings(df, category_budgets):
+    if df.empty:
+        return []
+    monthly_df = df[df['datetime'].dt.to_period('M') == pd.Timestamp.now().to_period('M')]
+    return category_warnings(monthly_df.groupby("category", observed=True)["amount"].sum(), category_budgets)
+
+
+def get_cube_category_warnings(cells, category_budgets):
+    if cells.empty:
+        return []
+    return category_warnings(rollups.by_category(rollups.month_slice(cells)), category_budgets)
@@ -1,39 +1,28 @@
-import requests
-import streamlit as st
 import pandas as pd
-import time
-from datetime import datetime
+import store
 
-def start_realtime_tracking():
-    user_key = st.session_state.razorpay_key
-    user_secret = st.session_state.razorpay_secret
-    seen_ids = set()
-    while True:
-        try:
-            response = requests.get(
-                "https://api.razorpay.com/v1/payments",
-                auth=( user_key , user_secret )
-            )
-            data = response.json()["items"]
-            new_rows = []
-            for item in data:
-                if item["id"] not in seen_ids and item["status"] == "captured":
-                    seen_ids.add(item["id"])
-                    new_rows.append({
-                        "payment_id": item["id"],
-                        "amount": item["amount"] / 100,
-                        "app": item.get("description", "Unknown"),
-                        "datetime": pd.to_datetime(item["created_at"], unit="s"),
-                        "category": ""
-                    })
-            if new_rows:
-                new_df = pd.DataFrame(new_rows)
-                try:
-                    existing_df = pd.read_csv("razorpay_payments.csv")
-                    combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-                except FileNotFoundError:
-                    combined_df = pd.DataFrame(new_rows)
-                combined_df.to_csv("razorpay_payments.csv", index=False)
-        except Exception as e:
-            print("Error fetching Razorpay data:", e)
-        time.sleep(1)
\ No newline at end of file
+def payments_to_frame(items):
+    return pd.DataFrame({
+        "txn_id": [item["id"] for item in items],
+        "ts": pd.to_datetime([item["created_at"] for item in items], unit="s").asi8,
+        "amount": [item["amount"] / 100 for item in items],
+        "category": "",
+        "type": "expense",
+        "app": [item.get("description") or "Unknown" for item in items],
+        "description": [item.get("description") or "" for item in items],
+    })
+
+def ingest_payments(items, seen, user=None, categorizer=None):
+    # Append only captured payments we have never stored before; returns them
+    captured = {item["id"]: item for item in items if item["status"] == "captured"}
+    new_ids = seen.unseen(captured)
+    if not new_ids:
+        return []
+    new_items = [captured[i] for i in new_ids]
+    frame = payments_to_frame(new_items)
+    if categorizer is not None:
+        frame["category"] = categorizer.classify(frame["app"])
+    store.append_segment(frame, user)
+    seen.add(new_ids)
+    store.compact_if_needed(user)
+    return new_items
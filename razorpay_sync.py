@@ -0,0 +1,223 @@
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+import requests
+import metrics
+from requests.adapters import HTTPAdapter
+
+API_URL = "https://api.razorpay.com"
+CURSOR_PATH = os.path.join("data", "razorpay_cursor.json")
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+PAGE_SIZE = 100  # Razorpay's maximum `count`
+# Payments that may still be captured later; they hold the cursor back
+PENDING_STATUSES = {"created", "authorized"}
+# Razorpay refunds uncaptured payments after a few days; past this age a
+# pending payment stops holding the cursor
+MAX_PENDING_AGE = 5 * 24 * 3600
+
+log = logging.getLogger(__name__)
+
+
+class RetryableError(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"Razorpay returned HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    # Thread-safe token bucket: `rate` requests per second, bursts up to `burst`
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def error_label(error):
+    # HTTP status for failed responses (retryable or not), else the exception type
+    if isinstance(error, RetryableError):
+        return str(error.status)
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return str(error.response.status_code)
+    return type(error).__name__
+
+
+def parse_retry_after(value):
+    # Retry-After is either delay-seconds or an HTTP-date (RFC 9110);
+    # anything else is ignored and the usual backoff applies
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+        return max(seconds, 0.0) if math.isfinite(seconds) else None
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)  # HTTP-dates are always GMT
+    return max(date.timestamp() - time.time(), 0.0)
+
+
+def make_session(key, secret, pool_size=4):
+    # One keep-alive session per account instead of a new connection per poll
+    session = requests.Session()
+    session.auth = (key, secret)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def load_cursor(path):
+    try:
+        with open(path) as f:
+            return json.load(f).get("created_at", 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def save_cursor(path, created_at):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"created_at": created_at}, f)
+    os.replace(tmp_path, path)
+
+
+class RazorpaySync:
+    # Polls /v1/payments from a persisted created_at high-water mark, walks
+    # every page of the window and backs off with jitter on 429/5xx.
+    def __init__(self, key, secret, on_payments, base_url=API_URL, cursor_path=CURSOR_PATH,
+                 page_size=PAGE_SIZE, min_interval=1.0, max_idle_interval=15.0,
+                 max_backoff=300.0, lookback=300, max_pending_age=MAX_PENDING_AGE, timeout=10,
+                 session=None, limiter=None):
+        self.on_payments = on_payments
+        self.base_url = base_url.rstrip("/")
+        self.cursor_path = cursor_path
+        self.page_size = page_size
+        self.min_interval = min_interval
+        self.max_idle_interval = max_idle_interval
+        self.max_backoff = max_backoff
+        # Payments can be captured a while after they are created, so each
+        # sweep re-reads a short window behind the cursor; the seen index dedupes.
+        self.lookback = lookback
+        # A payment captured long after it was created (manual or delayed
+        # capture) is only picked up if the cursor has not moved past it, so
+        # the cursor stops at the oldest payment still pending.
+        self.max_pending_age = max_pending_age
+        self.timeout = timeout
+        self.session = session or make_session(key, secret)
+        self.limiter = limiter
+        self.cursor = load_cursor(cursor_path)
+        self.sweep = None
+        self.interval = min_interval
+        self.failures = 0
+        self.requests_made = 0
+
+    def fetch_page(self, params):
+        if self.limiter is not None:
+            self.limiter.acquire()
+        self.requests_made += 1
+        response = self.session.get(f"{self.base_url}/v1/payments", params=params, timeout=self.timeout)
+        if response.status_code in RETRY_STATUSES:
+            raise RetryableError(response.status_code, parse_retry_after(response.headers.get("Retry-After")))
+        response.raise_for_status()
+        return response.json().get("items", [])
+
+    def poll_once(self):
+        # A sweep walks every page of a frozen [from, to] window. Each page is
+        # handed off as soon as it arrives (ingest is idempotent), and after a
+        # failure the next call resumes at the failed page instead of page one.
+        if self.sweep is None:
+            self.sweep = {
+                "from": max(self.cursor - self.lookback, 0),
+                "to": int(time.time()),
+                "skip": 0,
+                "newest": self.cursor,
+                "pending": None,
+            }
+        sweep = self.sweep
+        ingested = 0
+        while True:
+            page = self.fetch_page({
+                "from": sweep["from"],
+                "to": sweep["to"],
+                "count": self.page_size,
+                "skip": sweep["skip"],
+            })
+            if page:
+                ingested += self.on_payments(page)
+                sweep["newest"] = max(sweep["newest"], max(item["created_at"] for item in page))
+                pending = [item["created_at"] for item in page if item.get("status") in PENDING_STATUSES
+                           and item["created_at"] >= sweep["to"] - self.max_pending_age]
+                if pending:
+                    oldest = min(pending)
+                    sweep["pending"] = oldest if sweep["pending"] is None else min(sweep["pending"], oldest)
+            if len(page) < self.page_size:
+                break
+            sweep["skip"] += self.page_size
+        self.sweep = None
+        cursor = sweep["newest"] if sweep["pending"] is None else min(sweep["newest"], sweep["pending"])
+        if cursor != self.cursor:
+            self.cursor = cursor
+            save_cursor(self.cursor_path, self.cursor)
+        return ingested
+
+    def next_delay(self, ingested=0, error=None):
+        if error is not None:
+            self.failures += 1
+            backoff = min(self.max_backoff, self.min_interval * 2 ** self.failures)
+            delay = random.uniform(0, backoff)  # full jitter
+            if getattr(error, "retry_after", None):
+                delay = max(delay, error.retry_after)
+            return delay
+        self.failures = 0
+        # Poll fast while payments are flowing, slow down gradually when idle
+        if ingested:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_idle_interval, self.interval * 1.5)
+        return self.interval
+
+    def step(self):
+        try:
+            with metrics.span("razorpay_poll"):
+                ingested = self.poll_once()
+        except Exception as e:
+            log.warning("Error fetching Razorpay data: %s", e)
+            metrics.inc("razorpay_poll_errors_total", error=error_label(e))
+            return self.next_delay(error=e)
+        metrics.inc("razorpay_polls_total")
+        metrics.inc("razorpay_ingested_total", ingested)
+        return self.next_delay(ingested=ingested)
+
+    def run(self, stop_event=None):
+        while stop_event is None or not stop_event.is_set():
+            delay = self.step()
+            if stop_event is None:
+                time.sleep(delay)
+            else:
+                stop_event.wait(delay)
@@ -0,0 +1,196 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import matplotlib
+matplotlib.use("Agg")
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.ticker import MaxNLocator
+import store
+import visualize
+
+# --- MONTHLY STATEMENTS --- #
+# One statement image (or PDF) per user per month, drawn with the plots in
+# visualize.py: the monthly trend up to the statement month, the category
+# pie for the month's last week, and the month's category totals. Users are
+# spread over a process pool; each worker reads a user's ledger once and
+# redraws one figure it keeps for the whole run. A report is skipped when
+# the user's store version (and the layout) match the last render.
+#   python reports.py --month 2024-06 --format pdf --workers 4
+REPORT_DIR = "reports"
+LAYOUT_VERSION = 1  # bump when the statement layout changes to redraw every report
+TREND_MONTHS = 12
+MANIFEST = "manifest.json"
+
+log = logging.getLogger(__name__)
+
+_template = None
+
+
+def statement_template():
+    # Built once per worker; every statement clears and redraws its axes
+    global _template
+    if _template is None:
+        fig = Figure(figsize=(12, 12), dpi=100)
+        grid = fig.add_gridspec(2, 2, height_ratios=[1, 1.2])
+        axes = (fig.add_subplot(grid[0, :]), fig.add_subplot(grid[1, 0]), fig.add_subplot(grid[1, 1]))
+        # Fixed margins instead of tight_layout, which re-measures every label
+        fig.subplots_adjust(left=0.08, right=0.97, top=0.92, bottom=0.06, hspace=0.35, wspace=0.45)
+        _template = fig, axes
+    return _template
+
+
+def statement_frames(ledger, month):
+    period = pd.Period(month, freq="M")
+    df = pd.DataFrame({"date": ledger["datetime"], "category": ledger["category"], "amount": ledger["amount"]})
+    df = df[df["date"] <= period.end_time]
+    trend = visualize.monthly_totals(df[df["date"] >= (period - (TREND_MONTHS - 1)).start_time])
+    in_month = df[df["date"] >= period.start_time]
+    last_day = in_month["date"].max() if len(in_month) else period.end_time
+    week = visualize.week_start(last_day)
+    pie = visualize.week_by_category(df, week)
+    pie.index = pie.index.astype(str).str.replace("^$", "Untagged", regex=True)
+    pie = pie[pie > 0]
+    # Slivers under 2% go into one slice so their labels do not pile up
+    small = pie < pie.sum() * 0.02
+    if small.sum() > 1:
+        pie = pd.concat([pie[~small], pd.Series({"Other": pie[small].sum()})])
+    totals = visualize.category_totals(in_month)
+    totals["category"] = totals["category"].astype(str).replace("", "Untagged")
+    return trend, (pie, week), totals
+
+
+def draw_statement(user, month, trend, pie, totals):
+    fig, (trend_ax, pie_ax, totals_ax) = statement_template()
+    for ax in (trend_ax, pie_ax, totals_ax):
+        ax.clear()
+    fig.suptitle(f"Statement for {user} – {month}", fontsize=16)
+    if len(trend):
+        visualize.draw_monthly_trend(trend_ax, trend, title="Monthly Spending Trend")
+    pie_data, week = pie
+    label = week.strftime("%G-W%V")
+    if len(pie_data):
+        visualize.draw_weekly_pie(pie_ax, pie_data, f"Spending by Category – {label}")
+    else:
+        pie_ax.set_title(f"No spending in {label}")
+    if len(totals):
+        visualize.draw_category_spending(totals_ax, totals, title=f"Spending by Category – {month}")
+        totals_ax.xaxis.set_major_locator(MaxNLocator(5))
+    else:
+        totals_ax.set_title(f"No spending in {month}")
+    return fig
+
+
+def init_worker(users_dir):
+    # Spawned workers do not inherit a USERS_DIR set at runtime
+    store.USERS_DIR = users_dir
+
+
+def render_statement(user, month, path, fmt):
+    start = time.perf_counter()
+    ledger = store.load_transactions(user)
+    fig = draw_statement(user, month, *statement_frames(ledger, month))
+    tmp_path = path + ".tmp"
+    fig.savefig(tmp_path, format=fmt)
+    os.replace(tmp_path, path)
+    return len(ledger), time.perf_counter() - start
+
+
+def fingerprint(user, month, fmt):
+    # store_version reseeds a stale ledger first, so the version is the one
+    # the worker reads
+    return json.dumps([LAYOUT_VERSION, month, fmt, store.store_version(user)])
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(manifest, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def render_reports(users=None, month=None, out=REPORT_DIR, fmt="png", workers=None, force=False):
+    if users is None:
+        from auth import user_store
+        users = [user for user in user_store.usernames() if os.path.isdir(store.partition_dir(user))]
+    # Default: the last full month
+    month = month or str(pd.Period(pd.Timestamp.now(), freq="M") - 1)
+    month_dir = os.path.join(out, month)
+    os.makedirs(month_dir, exist_ok=True)
+    manifest_path = os.path.join(out, MANIFEST)
+    manifest = load_manifest(manifest_path)
+
+    jobs = {}
+    for user in users:
+        name = f"{month}/{store.partition_name(user)}.{fmt}"
+        stamp = fingerprint(user, month, fmt)
+        if force or manifest.get(name) != stamp or not os.path.exists(os.path.join(out, name)):
+            jobs[user] = (name, stamp)
+    summary = {"month": month, "users": len(users), "rendered": 0, "skipped": len(users) - len(jobs),
+               "failed": 0, "rows": 0}
+    if not jobs:
+        return summary
+
+    def finished(user, result):
+        name, stamp = jobs[user]
+        manifest[name] = stamp
+        summary["rendered"] += 1
+        summary["rows"] += result[0]
+
+    try:
+        if workers == 1:
+            for user, (name, _) in jobs.items():
+                try:
+                    finished(user, render_statement(user, month, os.path.join(out, name), fmt))
+                except Exception:
+                    log.exception("Report for %s failed", user)
+                    summary["failed"] += 1
+        else:
+            with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(store.USERS_DIR,)) as pool:
+                futures = {
+                    pool.submit(render_statement, user, month, os.path.join(out, name), fmt): user
+                    for user, (name, _) in jobs.items()
+                }
+                for future in as_completed(futures):
+                    user = futures[future]
+                    try:
+                        finished(user, future.result())
+                    except Exception:
+                        log.exception("Report for %s failed", user)
+                        summary["failed"] += 1
+    finally:
+        # Whatever finished is recorded, so an interrupted run resumes
+        save_manifest(manifest, manifest_path)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--month", help="YYYY-MM (default: last month)")
+    parser.add_argument("--users", nargs="+")
+    parser.add_argument("--out", default=REPORT_DIR)
+    parser.add_argument("--format", choices=["png", "pdf"], default="png")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--force", action="store_true", help="redraw reports that are up to date")
+    args = parser.parse_args()
+    # Failures go to stderr; stdout is only the JSON summary
+    logging.basicConfig(format="%(levelname)s %(name)s: %(message)s")
+    start = time.perf_counter()
+    summary = render_reports(args.users, args.month, args.out, args.format, args.workers, args.force)
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
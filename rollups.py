@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+# --- ROLLUP CUBE --- #
+# Spend pre-aggregated per (user, day, hour, category, type) cell with sum,
+# count and sum of squares. Dashboard totals, charts and nudges read these
+# cells instead of grouping raw rows on every rerun.
+KEYS = ["user", "day", "hour", "category", "type"]
+MEASURES = ["sum", "count", "sumsq"]
+
+
+def rollup_frame(df, user=None):
+    ts = df["datetime"]
+    amount = df["amount"].to_numpy(dtype="float64")
+    cells = pd.DataFrame({
+        "user": "" if user is None else user,
+        "day": ts.dt.normalize(),
+        "hour": ts.dt.hour.astype("int8"),
+        "category": df["category"],
+        "type": df["type"],
+        "sum": amount,
+        "count": np.ones(len(df), dtype="int64"),
+        "sumsq": amount * amount,
+    })
+    grouped = cells.groupby(KEYS, observed=True, sort=False)[MEASURES].sum().reset_index()
+    return _normalize(grouped)
+
+
+def _normalize(cells):
+    for col in ("user", "category", "type"):
+        cells[col] = cells[col].astype(str)
+    return cells[cells["count"] != 0].reset_index(drop=True)
+
+
+def _regroup(cells):
+    cells = _normalize(cells)
+    return _normalize(cells.groupby(KEYS, sort=False)[MEASURES].sum().reset_index())
+
+
+class RollupCube:
+    def __init__(self, cells=None):
+        self.cells = cells if cells is not None else pd.DataFrame(columns=KEYS + MEASURES)
+        self.pending = {}
+
+    @classmethod
+    def from_frame(cls, df, user=None):
+        return cls(rollup_frame(df, user))
+
+    def add(self, user, ts, amount, category, type_, count=1):
+        # O(1): deltas collect in a dict and are merged on the next read
+        key = ("" if user is None else user, ts.normalize(), ts.hour, category, type_)
+        delta = self.pending.setdefault(key, [0.0, 0, 0.0])
+        delta[0] += count * amount
+        delta[1] += count
+        delta[2] += count * amount * amount
+
+    def remove(self, user, ts, amount, category, type_):
+        self.add(user, ts, amount, category, type_, count=-1)
+
+    def add_frame(self, df, user=None):
+        self.cells = _regroup(pd.concat([self.frame(), rollup_frame(df, user)], ignore_index=True))
+
+    def extended(self, df, user=None):
+        # New cube with the rows folded in; this one is left untouched for
+        # readers still holding it. Only cells on the days the rows touch
+        # are regrouped, the rest are carried over as they are.
+        cells = self.frame()
+        delta = rollup_frame(df, user)
+        touched = cells["day"].isin(delta["day"].unique()).to_numpy()
+        merged = _regroup(pd.concat([cells[touched], delta], ignore_index=True))
+        return RollupCube(pd.concat([cells[~touched], merged], ignore_index=True))
+
+    def frame(self):
+        if self.pending:
+            keys, values = zip(*self.pending.items())
+            delta = pd.DataFrame(list(keys), columns=KEYS).join(pd.DataFrame(list(values), columns=MEASURES))
+            delta["hour"] = delta["hour"].astype("int8")
+            self.cells = _regroup(pd.concat([self.cells, delta], ignore_index=True))
+            self.pending = {}
+        return self.cells
+
+    def query(self, user=None, types=None, categories=None, start=None, end=None):
+        cells = self.frame()
+        mask = np.ones(len(cells), dtype=bool)
+        if user is not None:
+            mask &= (cells["user"] == user).to_numpy()
+        if types is not None:
+            mask &= cells["type"].isin(list(map(str, types))).to_numpy()
+        if categories is not None:
+            mask &= cells["category"].isin(list(map(str, categories))).to_numpy()
+        if start is not None:
+            mask &= (cells["day"] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            mask &= (cells["day"] <= pd.Timestamp(end)).to_numpy()
+        return cells[mask]
+
+
+# --- READS OVER A CUBE SLICE --- #
+def totals(cells):
+    total = cells["sum"].sum()
+    count = int(cells["count"].sum())
+    mean = total / count if count else float("nan")
+    variance = cells["sumsq"].sum() / count - mean * mean if count else float("nan")
+    return {"sum": total, "count": count, "mean": mean, "std": np.sqrt(max(variance, 0.0))}
+
+
+def month_slice(cells, month=None):
+    period = pd.Period(month or pd.Timestamp.now(), freq="M")
+    return cells[(cells["day"] >= period.start_time) & (cells["day"] <= period.end_time)]
+
+
+def by_month(cells):
+    return cells.groupby(cells["day"].dt.to_period("M").astype(str))["sum"].sum().sort_index()
+
+
+def by_week(cells):
+    return cells.groupby(cells["day"].dt.isocalendar().week)["sum"].sum().sort_index()
+
+
+def by_day(cells):
+    return cells.groupby("day")["sum"].sum().sort_index()
+
+
+def by_category(cells):
+    return cells.groupby("category")["sum"].sum()
+
+
+def by_hour(cells):
+    return cells.groupby("hour")["sum"].sum().sort_index()
+
+
+def by_weekday_hour(cells):
+    grouped = cells.groupby([cells["day"].dt.dayofweek.rename("weekday"), "hour"])["sum"].sum()
+    return grouped.unstack(fill_value=0.0).reindex(index=range(7), columns=range(24), fill_value=0.0)
@@ -0,0 +1,405 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+import metrics
+from categorizer import Categorizer
+
+# --- STORE LAYOUT --- #
+# Transactions live in one uncompressed Arrow IPC file so they can be
+# memory-mapped: int64 timestamps, float amounts and dictionary-encoded
+# category/type columns come back as pandas columns without a parse step.
+DATA_DIR = "data"
+STORE_PATH = os.path.join(DATA_DIR, "transactions.arrow")
+LOCAL_CSV = "mock_transactions_detailed.csv"
+RAZORPAY_CSV = "razorpay_payments.csv"
+# Ingested payments are partitioned per user under data/users/<user>/: new
+# batches land as small immutable segment files, compaction folds them into
+# payments.arrow, and payment ids already ingested live in seen_ids.db.
+USERS_DIR = os.path.join(DATA_DIR, "users")
+COMPACT_AFTER = 64
+READ_ATTEMPTS = 3  # listings retried when compaction races a read
+
+SCHEMA = pa.schema([
+    ("txn_id", pa.string()),
+    ("ts", pa.int64()),  # nanoseconds since epoch
+    ("amount", pa.float64()),
+    ("category", pa.dictionary(pa.int32(), pa.string())),
+    ("type", pa.dictionary(pa.int32(), pa.string())),
+    ("app", pa.string()),
+    ("description", pa.string()),
+])
+COLUMNS = [field.name for field in SCHEMA]
+
+
+# --- CSV IMPORT --- #
+def _to_ns(values):
+    return pd.to_datetime(values).to_numpy(dtype="datetime64[ns]").view("int64")
+
+
+def read_local_csv(path=LOCAL_CSV):
+    raw = pd.read_csv(path, usecols=["datetime", "category", "amount", "description", "type"])
+    return pd.DataFrame({
+        "txn_id": [f"local-{i}" for i in range(len(raw))],
+        "ts": _to_ns(raw["datetime"]),
+        "amount": raw["amount"].astype("float64"),
+        "category": raw["category"].fillna(""),
+        "type": raw["type"].fillna(""),
+        "app": "",
+        "description": raw["description"].fillna(""),
+    })
+
+
+def read_razorpay_csv(path=RAZORPAY_CSV):
+    raw = pd.read_csv(path, dtype={"payment_id": str, "app": str})
+    return pd.DataFrame({
+        "txn_id": raw["payment_id"],
+        "ts": _to_ns(raw["datetime"]),
+        "amount": raw["amount"].astype("float64"),
+        "category": Categorizer().classify(raw["app"]),
+        "type": "expense",
+        "app": raw["app"].fillna("Unknown"),
+        "description": raw["app"].fillna(""),
+    })
+
+
+TEXT_COLUMNS = ["txn_id", "category", "type", "app", "description"]
+
+
+def to_table(frame):
+    frame = frame.reindex(columns=COLUMNS)
+    for col in TEXT_COLUMNS:
+        values = frame[col].astype(object)
+        frame[col] = values.where(values.notna(), "")
+    return pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False)
+
+
+def write_table(table, path=STORE_PATH):
+    # Write next to the target and rename so readers never see a half-written file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+
+def _sources():
+    return [path for path in (LOCAL_CSV, RAZORPAY_CSV) if os.path.exists(path)]
+
+
+def needs_import():
+    if not os.path.exists(STORE_PATH):
+        return True
+    store_mtime = os.path.getmtime(STORE_PATH)
+    return any(os.path.getmtime(path) > store_mtime for path in _sources())
+
+
+def import_csvs():
+    frames = [read_local_csv()]
+    if os.path.exists(RAZORPAY_CSV):
+        rzp = read_razorpay_csv()
+        SeenIndex(None).add(rzp["txn_id"])
+        frames.append(rzp)
+    combined = pd.concat(frames, ignore_index=True).sort_values("ts", kind="stable")
+    write_table(to_table(combined))
+
+
+# The bundled CSVs are parsed once into data/transactions.arrow, which is
+# only ever a seed: each user gets a private copy as ledger.arrow in their
+# partition, so no file is read or written by more than one tenant.
+def ledger_path(user):
+    if user is None:
+        return STORE_PATH
+    return os.path.join(partition_dir(user), "ledger.arrow")
+
+
+def seed_ledger(user):
+    path = ledger_path(user)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    shutil.copyfile(STORE_PATH, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    # Payments already in the seed are not ingested a second time
+    ids = read_table(path).column("txn_id").to_pandas()
+    SeenIndex(user).add(ids[~ids.str.startswith("local-")])
+
+
+_import_lock = threading.Lock()
+
+
+def ensure_store(user=None):
+    # CSVs are parsed once; afterwards only a newer CSV triggers a re-import
+    # and a re-seed. The lock keeps a background prewarm and a session from
+    # importing twice.
+    with _import_lock:
+        if needs_import():
+            import_csvs()
+        path = ledger_path(user)
+        if user is not None and _mtime_ns(path) < _mtime_ns(STORE_PATH):
+            seed_ledger(user)
+
+
+def _mtime_ns(path):
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+
+
+def store_version(user=None):
+    ensure_store(user)
+    # Segment names are part of the version, so a reader holding an older
+    # version can tell exactly which files were appended since
+    return (
+        _mtime_ns(ledger_path(user)),
+        _mtime_ns(payments_path(user)),
+        tuple(os.path.basename(path) for path in segment_paths(user)),
+        _mtime_ns(tags_path(user)),
+    )
+
+
+# --- PARTITIONS --- #
+# Directory names are the percent-encoded username, which maps every user
+# to a different name ("alice smith" -> alice%20smith, "alice_smith" stays
+# as is) and can never be "." or ".." or contain a path separator. The
+# mapping only goes one way: list users from the user store, not from here.
+def partition_name(user):
+    name = quote(str(user), safe="")
+    if name.startswith("."):
+        name = "%2E" + name[1:]
+    return name or "%"
+
+
+def partition_dir(user):
+    if user is None:
+        return DATA_DIR
+    return os.path.join(USERS_DIR, partition_name(user))
+
+
+def payments_path(user):
+    return os.path.join(partition_dir(user), "payments.arrow")
+
+
+def segment_dir(user):
+    return os.path.join(partition_dir(user), "segments")
+
+
+def segment_paths(user=None):
+    directory = segment_dir(user)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith(".arrow")
+    )
+
+
+# --- READING --- #
+def to_frame(table):
+    df = table.to_pandas()
+    ts = df.pop("ts").to_numpy()
+    df.insert(1, "datetime", pd.Series(ts.view("datetime64[ns]"), index=df.index))
+    df["date"] = df["datetime"].dt.normalize()
+    return df
+
+
+def read_table(path=STORE_PATH):
+    return feather.read_table(path, memory_map=True)
+
+
+def _concat(tables):
+    if len(tables) == 1:
+        return tables[0]
+    # A crash between compaction and segment cleanup can leave a payment in
+    # two files; the first copy wins. Only the small payment and segment
+    # tables are filtered, so the mapped ledger is never copied: the ledger
+    # ids are scanned against the new ids, and only the few that match are
+    # hashed to drop the repeats.
+    head, rest = tables[0], tables[1:]
+    new_ids = pa.chunked_array([t.column("txn_id") for t in rest], type=pa.string())
+    ids = head.column("txn_id")
+    seen = ids.filter(pc.is_in(ids, value_set=pc.unique(new_ids)))
+    kept = []
+    for table in rest:
+        ids = table.column("txn_id")
+        fresh = pc.invert(pc.is_in(ids, value_set=seen))
+        table = table.filter(fresh)
+        kept.append(table)
+        seen = pa.chunked_array(seen.chunks + table.column("txn_id").chunks, type=pa.string())
+    return pa.concat_tables([head] + kept, promote_options="permissive")
+
+
+def _partition_tables(user):
+    # Compaction can delete a listed segment before it is read; by then its
+    # rows are in payments.arrow, so list the files again and retry
+    for attempt in range(READ_ATTEMPTS):
+        paths = [payments_path(user)] if os.path.exists(payments_path(user)) else []
+        try:
+            return [read_table(path) for path in paths + segment_paths(user)]
+        except FileNotFoundError:
+            if attempt == READ_ATTEMPTS - 1:
+                raise
+
+
+@metrics.timed("load_transactions")
+def load_transactions(user=None):
+    ensure_store(user)
+    df = to_frame(_concat([read_table(ledger_path(user))] + _partition_tables(user)))
+    return apply_tags(df, load_tags(user))
+
+
+# --- CHANGE FEED --- #
+# Ingestion only ever adds segment files, so going from one store version to
+# the next is usually "read the new segments and append them". Compaction,
+# a re-seed or a new tag changes the other fields and forces a full reload.
+def appended_rows(user, old_version, new_version):
+    old_segments = set(old_version[2])
+    if (old_version[:2] != new_version[:2] or old_version[3] != new_version[3]
+            or not old_segments <= set(new_version[2])):
+        return None
+    added = [os.path.join(segment_dir(user), name) for name in new_version[2] if name not in old_segments]
+    try:
+        return to_frame(_concat([read_table(path) for path in added]))
+    except FileNotFoundError:
+        return None  # compacted away since the version was taken
+
+
+def extend_frame(df, rows):
+    # Returns a new frame; the cached one may still be in use by other sessions.
+    # Categorical columns keep their codes and gain any values the rows add.
+    df = df.copy(deep=False)
+    rows = rows[df.columns].copy(deep=False)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            categories = df[col].cat.categories
+            values = rows[col].astype(object)
+            categories = categories.append(pd.Index(values.unique()).difference(categories))
+            df[col] = df[col].cat.set_categories(categories)
+            rows[col] = pd.Categorical(values, categories=categories)
+    return pd.concat([df, rows], ignore_index=True)
+
+
+def refresh_transactions(df, user, old_version, new_version):
+    rows = appended_rows(user, old_version, new_version)
+    return None if rows is None else extend_frame(df, rows)
+
+
+# --- APPEND-ONLY INGESTION --- #
+class SeenIndex:
+    # On-disk set of ingested payment ids so dedupe survives restarts
+    def __init__(self, user=None):
+        directory = partition_dir(user)
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(directory, "seen_ids.db"), check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen (payment_id TEXT PRIMARY KEY)")
+
+    def unseen(self, ids):
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+        found = set()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT payment_id FROM seen WHERE payment_id IN ({placeholders})", chunk
+            )
+            found.update(row[0] for row in rows)
+        return [payment_id for payment_id in ids if payment_id not in found]
+
+    def add(self, ids):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO seen (payment_id) VALUES (?)", [(i,) for i in ids]
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+def append_segment(frame, user=None):
+    # Cost is proportional to the batch, never to the stored history
+    if frame.empty:
+        return None
+    directory = segment_dir(user)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"seg-{time.time_ns():020d}.arrow")
+    write_table(to_table(frame), path)
+    return path
+
+
+def compact(user=None, min_segments=1):
+    paths = segment_paths(user)
+    if not paths or len(paths) < min_segments:
+        return 0
+    df = _concat(_partition_tables(user)).to_pandas()
+    write_table(to_table(df.sort_values("ts", kind="stable")), payments_path(user))
+    for path in paths:
+        os.remove(path)
+    return len(paths)
+
+
+def compact_if_needed(user=None):
+    return compact(user, min_segments=COMPACT_AFTER)
+
+
+# --- TAG OVERLAY --- #
+# Manual category tags are appended to a small per-user log and merged into
+# the frame at read time, so tagging never rewrites the transaction files.
+def tags_path(user):
+    return os.path.join(partition_dir(user), "tags.jsonl")
+
+
+def record_tags(txn_ids, category, user=None, apps=None):
+    # `apps` are the tagged rows' merchant names; the categorizer learns from them
+    txn_ids = [str(txn_id) for txn_id in txn_ids]
+    if not txn_ids:
+        return 0
+    path = tags_path(user)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    entry = {"ids": txn_ids, "category": category, "at": time.time()}
+    if apps is not None:
+        entry["apps"] = [str(app) for app in apps]
+    entry = json.dumps(entry)
+    with open(path, "a") as f:
+        f.write(entry + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return len(txn_ids)
+
+
+def load_tags(user=None):
+    tags = {}
+    try:
+        with open(tags_path(user)) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from a crash mid-append
+                for txn_id in entry["ids"]:
+                    tags[txn_id] = entry["category"]
+    except FileNotFoundError:
+        pass
+    return tags
+
+
+def apply_tags(df, tags):
+    if not tags or df.empty:
+        return df
+    tagged = pd.Series(tags)
+    positions = np.flatnonzero(df["txn_id"].isin(tagged.index).to_numpy())
+    if not len(positions):
+        return df
+    new_values = tagged.reindex(df["txn_id"].to_numpy()[positions]).to_numpy()
+    categories = df["category"].astype("category").cat.categories
+    categories = categories.append(pd.Index(sorted(set(new_values) - set(categories))))
+    current = pd.Categorical(df["category"], categories=categories)
+    codes = current.codes.copy()
+    codes[positions] = categories.get_indexer(new_values)
+    df["category"] = pd.Categorical.from_codes(codes, categories)
+    return df
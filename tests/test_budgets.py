@@ -0,0 +1,58 @@
+import pandas as pd
+import budgets
+
+
+def cells(rows):
+    return pd.DataFrame(rows, columns=["user", "day", "category", "sum"]).assign(day=lambda df: pd.to_datetime(df["day"]))
+
+
+def budget_frame(rows):
+    return pd.DataFrame(rows, columns=["user", "month", "category", "budget"])
+
+
+def row(evaluation, category, is_total=False):
+    match = evaluation[(evaluation["category"] == category) & (evaluation["is_total"] == is_total)]
+    assert len(match) == 1
+    return match.iloc[0]
+
+
+def test_untagged_spend_is_not_the_total():
+    spend = cells([("alice", "2024-03-02", "", 9000.0), ("alice", "2024-03-05", "Food", 500.0)])
+    evaluation = budgets.evaluate(spend, budget_frame([("alice", "2024-03", "", 10000)]))
+    assert (evaluation["category"] == "").sum() == 1
+    untagged = row(evaluation, budgets.UNTAGGED)
+    assert untagged["spent"] == 9000
+    assert untagged["budget"] == budgets.DEFAULT_CATEGORY_BUDGET
+    total = row(evaluation, "", is_total=True)
+    assert total["spent"] == 9500
+    assert total["budget"] == 10000
+    assert total["used"] == 0.95
+
+
+def test_budgets_carry_forward():
+    spend = cells([("alice", "2024-01-10", "Food", 100.0), ("alice", "2024-03-10", "Food", 300.0)])
+    evaluation = budgets.evaluate(spend, budget_frame([
+        ("alice", "2024-01", "", 5000), ("alice", "2024-01", "Food", 200), ("alice", "2024-03", "Food", 250),
+    ]))
+    food = evaluation[evaluation["category"] == "Food"].set_index("month")
+    assert food.loc["2024-01", "budget"] == 200
+    assert food.loc["2024-03", "budget"] == 250
+    assert food.loc["2024-03", "overspend"] == 50
+    march_total = evaluation[evaluation["is_total"] & (evaluation["month"] == "2024-03")].iloc[0]
+    assert march_total["budget"] == 5000
+
+
+def test_alerts_flag_untagged_against_its_own_budget():
+    # 500 untagged is half the default category budget; only the total is over
+    spend = cells([("alice", "2024-03-02", "", 500.0)])
+    flagged = budgets.alerts(budgets.evaluate(spend, budget_frame([("alice", "2024-03", "", 600)])))
+    assert flagged["is_total"].tolist() == [True]
+    assert flagged["used"].round(2).tolist() == [0.83]
+
+
+def test_budget_store_round_trip(tmp_path):
+    store = budgets.BudgetStore(str(tmp_path / "budget_data.json"))
+    store.set("alice", "2024-01", total_budget=5000, category_budgets={"Food": 200})
+    assert store.get("alice", "2024-04") == {"total_budget": 5000, "category_budgets": {"Food": 200}}
+    assert store.get("bob")["total_budget"] == budgets.DEFAULT_TOTAL_BUDGET
+    assert len(store.frame()) == 2
@@ -0,0 +1,31 @@
+import pandas as pd
+from chatbot import ChatIndex, chat_with_bot, extract_month, plan_query
+
+DF = pd.DataFrame({
+    "datetime": pd.to_datetime(["2024-02-03", "2024-02-20", "2024-03-05", "2024-02-11", "2023-02-14"]),
+    "category": pd.Categorical(["Shopping", "Shopping", "Shopping", "Food", "Shopping"]),
+    "amount": [100.0, 50.0, 200.0, 30.0, 400.0],
+})
+PLACEHOLDER = "How much did I spend on shopping in Feb 2024?"
+
+
+def test_extract_month_abbreviations():
+    assert extract_month("spent in Feb") == 2
+    assert extract_month("spent in Sept 2024") == 9
+    assert extract_month("spent in March") == 3
+
+
+def test_category_question_keeps_period():
+    query = plan_query(PLACEHOLDER, ChatIndex(DF))
+    assert query == {"intent": "category_total", "category": "Shopping", "year": 2024, "month": 2}
+
+
+def test_placeholder_question():
+    assert chat_with_bot(PLACEHOLDER, DF) == "💸 You spent ₹150.00 on Shopping in February 2024."
+
+
+def test_category_question_partial_periods():
+    index = ChatIndex(DF)
+    assert chat_with_bot("How much did I spend on shopping in 2024?", DF, index).startswith("💸 You spent ₹350.00")
+    assert chat_with_bot("How much did I spend on shopping in February?", DF, index).startswith("💸 You spent ₹550.00")
+    assert chat_with_bot("How much did I spend on shopping?", DF, index) == "💸 You spent ₹750.00 on Shopping overall."
@@ -0,0 +1,106 @@
+import os
+import pandas as pd
+import pytest
+import exports
+
+
+def make_export(directory, name, age):
+    path = directory / name
+    path.mkdir(parents=True)
+    (path / "transactions.csv").write_text("txn_id\n")
+    stamp = os.path.getmtime(path) - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_clean_exports_removes_only_expired(tmp_path):
+    old = make_export(tmp_path, "old", exports.TTL_SECONDS + 60)
+    fresh = make_export(tmp_path, "fresh", 0)
+    exports.clean_exports(str(tmp_path))
+    assert not old.exists()
+    assert fresh.exists()
+
+
+def test_clean_exports_survives_a_vanished_entry(tmp_path, monkeypatch):
+    # Another cleaner (or remove_export) deletes "gone" after the listing
+    make_export(tmp_path, "gone", exports.TTL_SECONDS + 60)
+    old = make_export(tmp_path, "old", exports.TTL_SECONDS + 60)
+    getmtime = os.path.getmtime
+
+    def racing_getmtime(path):
+        if path.endswith("gone"):
+            exports.shutil.rmtree(path)
+        return getmtime(path)
+
+    monkeypatch.setattr(exports.os.path, "getmtime", racing_getmtime)
+    exports.clean_exports(str(tmp_path))
+    assert os.listdir(tmp_path) == []
+    assert not old.exists()
+
+
+def test_clean_exports_without_directory(tmp_path):
+    exports.clean_exports(str(tmp_path / "missing"))
+
+
+def test_remove_export_stays_inside_the_export_dir(tmp_path):
+    inside = make_export(tmp_path / "exports", "abc", 0)
+    outside = make_export(tmp_path, "elsewhere", 0)
+    exports.remove_export([str(outside / "transactions.csv")], directory=str(tmp_path / "exports"))
+    assert outside.exists()
+    exports.remove_export([str(inside / "transactions.csv")], directory=str(tmp_path / "exports"))
+    assert not inside.exists()
+
+
+def make_transactions(n):
+    return pd.DataFrame({
+        "txn_id": [f"t{i}" for i in range(n)],
+        "datetime": pd.date_range("2024-01-01 09:30:15", periods=n, freq="h"),
+        "amount": [100.5 + i for i in range(n)],
+        "category": pd.Categorical(["Food", "Travel"] * (n // 2) + ["Food"] * (n % 2)),
+        "type": "debit",
+        "app": "GPay",
+        "description": [f'Tom & Jerry <{i}> "quoted"' for i in range(n)],
+    })[exports.COLUMNS]
+
+
+def test_xlsx_round_trip_keeps_text_and_types(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    frame = make_transactions(3)
+    frame.loc[1, "description"] = "bell\x07 & <tag>"
+    path = str(tmp_path / "t.xlsx")
+    part = exports.XlsxPart(path)
+    part.write(frame)
+    part.close()
+
+    sheet = openpyxl.load_workbook(path)["Transactions"]
+    rows = list(sheet.values)
+    assert list(rows[0]) == exports.COLUMNS
+    assert rows[1][0] == "t0"
+    assert rows[1][1] == pd.Timestamp("2024-01-01 09:30:15").to_pydatetime()
+    assert rows[1][2] == 100.5
+    assert rows[1][3] == "Food"
+    assert rows[1][6] == 'Tom & Jerry <0> "quoted"'
+    # Control characters are not valid XML and are dropped
+    assert rows[2][6] == "bell & <tag>"
+    assert len(rows) == 4
+
+
+def test_xlsx_rolls_over_to_new_sheets(tmp_path, monkeypatch):
+    openpyxl = pytest.importorskip("openpyxl")
+    # Header plus two rows per sheet
+    monkeypatch.setattr(exports, "XLSX_MAX_ROWS", 3)
+    frame = make_transactions(5)
+    cells = pd.DataFrame({"day": pd.to_datetime(["2024-01-01"]), "category": ["Food"], "sum": [250.0], "count": [2]})
+    paths = exports.export_transactions([frame.iloc[:3], frame.iloc[3:]], cells, "xlsx", directory=str(tmp_path))
+
+    assert len(paths) == 1
+    book = openpyxl.load_workbook(paths[0])
+    assert book.sheetnames == ["Summary", "Transactions", "Transactions 2", "Transactions 3"]
+    assert len(list(book["Summary"].values)) == len(exports.summary_table(cells)) + 1
+    ids = []
+    for name in book.sheetnames[1:]:
+        rows = list(book[name].values)
+        assert list(rows[0]) == exports.COLUMNS
+        assert len(rows) <= 3
+        ids += [row[0] for row in rows[1:]]
+    assert ids == list(frame["txn_id"])
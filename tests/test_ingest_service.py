@@ -0,0 +1,56 @@
+import sqlite3
+import time
+import pytest
+import store
+from benchmarks.razorpay_stub import StubState, start_stub
+from ingest_service import IngestService
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, "USERS_DIR", str(tmp_path / "users"))
+    state = StubState()
+    server, _ = start_stub(state)
+    service = IngestService(max_concurrency=2, base_url=f"http://127.0.0.1:{server.server_address[1]}")
+    yield service, state
+    service.stop()
+    server.shutdown()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.05)
+
+
+def test_polls_registered_accounts_and_notifies(service):
+    service, state = service
+    state.add_payments(3)
+    batches = []
+    service.subscribe("alice", lambda user, version, ingested: batches.append(ingested))
+    service.register("alice", "key", "secret")
+    wait_for(lambda: batches)
+    assert batches == [3]
+    assert service.version("alice") == 1
+
+
+def test_unregister_closes_the_seen_index(service):
+    service, _ = service
+    service.register("alice", "key", "secret")
+    account = service.accounts["alice"]
+    service.unregister("alice")
+    assert "alice" not in service.accounts
+    with pytest.raises(sqlite3.ProgrammingError):
+        account.seen.unseen(["pay_1"])
+
+
+def test_rotated_secret_replaces_the_account(service):
+    service, _ = service
+    service.register("alice", "key", "secret")
+    old = service.accounts["alice"]
+    service.register("alice", "key", "secret")
+    assert service.accounts["alice"] is old
+    service.register("alice", "key", "rotated")
+    assert service.accounts["alice"] is not old
+    assert old.closed
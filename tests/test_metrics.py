@@ -0,0 +1,47 @@
+import requests
+import metrics
+import razorpay_sync
+
+
+def enable(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(metrics, "_counters", {})
+    monkeypatch.setattr(metrics, "_histograms", {})
+    monkeypatch.setattr(metrics, "_collectors", [])
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    response.url = "http://razorpay.test/v1/payments"
+    try:
+        response.raise_for_status()
+    except requests.HTTPError as e:
+        return e
+
+
+def test_error_label_is_always_a_string():
+    assert razorpay_sync.error_label(razorpay_sync.RetryableError(503)) == "503"
+    assert razorpay_sync.error_label(http_error(401)) == "401"
+    assert razorpay_sync.error_label(requests.ConnectionError()) == "ConnectionError"
+
+
+def test_render_with_mixed_label_kinds(monkeypatch):
+    enable(monkeypatch)
+    metrics.inc("razorpay_poll_errors_total", error=503)
+    metrics.inc("razorpay_poll_errors_total", error="ConnectionError")
+    metrics.observe("span_seconds", 0.2, span="load", attempt=1)
+    metrics.observe("span_seconds", 0.3, span="load", attempt="retry")
+    text = metrics.render()
+    assert 'razorpay_poll_errors_total{error="503"} 1' in text
+    assert 'razorpay_poll_errors_total{error="ConnectionError"} 1' in text
+    assert 'span_seconds_count{attempt="1",span="load"} 1' in text
+    assert len(metrics.counter_summary()) == 2
+
+
+def test_render_histogram_buckets(monkeypatch):
+    enable(monkeypatch)
+    metrics.observe("span_seconds", 100.0, span="slow")
+    text = metrics.render()
+    assert 'span_seconds_bucket{span="slow",le="+Inf"} 1' in text
+    assert 'span_seconds_sum{span="slow"} 100.0' in text
@@ -0,0 +1,88 @@
+import time
+from email.utils import formatdate
+import pytest
+import razorpay_sync
+from benchmarks.razorpay_stub import StubState, start_stub
+from razorpay_sync import RazorpaySync, RetryableError, parse_retry_after
+
+
+@pytest.fixture
+def stub():
+    state = StubState()
+    server, _ = start_stub(state)
+    yield state, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def make_sync(base_url, tmp_path, ingested, **kwargs):
+    # Stands in for ingest_payments: keeps captured payments not seen before
+    def on_payments(items):
+        new = [item["id"] for item in items if item["status"] == "captured" and item["id"] not in ingested]
+        ingested.extend(new)
+        return len(new)
+    return RazorpaySync("key", "secret", on_payments, base_url=base_url,
+                        cursor_path=str(tmp_path / "cursor.json"), **kwargs)
+
+
+def test_walks_every_page_and_persists_the_cursor(stub, tmp_path):
+    state, base_url = stub
+    state.add_payments(250)
+    ingested = []
+    sync = make_sync(base_url, tmp_path, ingested, page_size=100)
+    assert sync.poll_once() == 250
+    assert sync.requests_made == 3
+    assert razorpay_sync.load_cursor(sync.cursor_path) == state.payments[-1]["created_at"]
+    assert sync.poll_once() == 0
+
+
+def test_late_capture_is_ingested(stub, tmp_path):
+    state, base_url = stub
+    now = time.time()
+    state.add_payments(1, status="authorized", created_at=now - 3600)
+    late_id = state.payments[-1]["id"]
+    state.add_payments(3, created_at=now)
+    ingested = []
+    sync = make_sync(base_url, tmp_path, ingested, lookback=300)
+    assert sync.poll_once() == 3
+    # The authorized payment holds the cursor, an hour behind the newest one
+    assert sync.cursor == int(now - 3600)
+    state.set_status(late_id, "captured")
+    assert sync.poll_once() == 1
+    assert late_id in ingested
+    # Nothing pending any more: the cursor moves up to the newest payment
+    assert sync.cursor == int(now)
+
+
+def test_stale_pending_payment_does_not_hold_the_cursor(stub, tmp_path):
+    state, base_url = stub
+    now = time.time()
+    state.add_payments(1, status="authorized", created_at=now - 7200)
+    state.add_payments(1, created_at=now)
+    sync = make_sync(base_url, tmp_path, [], max_pending_age=3600)
+    sync.poll_once()
+    assert sync.cursor == int(now)
+
+
+def test_retryable_status_carries_retry_after(stub, tmp_path):
+    state, base_url = stub
+    state.fail_every, state.fail_status = 1, 503
+    sync = make_sync(base_url, tmp_path, [], min_interval=0.01, max_backoff=0.01)
+    with pytest.raises(RetryableError) as error:
+        sync.poll_once()
+    assert error.value.status == 503
+    assert error.value.retry_after == 0
+    # The failed sweep resumes, and the backoff is at least Retry-After
+    assert sync.sweep is not None
+    assert sync.step() >= 0
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("120", 120.0), ("1.5", 1.5), ("-5", 0.0), ("soon", None), ("nan", None), (None, None), ("", None),
+])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    assert 25 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
@@ -0,0 +1,101 @@
+import pandas as pd
+import pytest
+import store
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    # A seeded store in a temp dir; no bundled CSV is ever re-imported
+    monkeypatch.setattr(store, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(store, "STORE_PATH", str(tmp_path / "transactions.arrow"))
+    monkeypatch.setattr(store, "USERS_DIR", str(tmp_path / "users"))
+    monkeypatch.setattr(store, "LOCAL_CSV", str(tmp_path / "missing.csv"))
+    monkeypatch.setattr(store, "RAZORPAY_CSV", str(tmp_path / "missing.csv"))
+    store.write_table(store.to_table(payments(["local-0", "local-1"], start="2024-01-01")), store.STORE_PATH)
+    return tmp_path
+
+
+def payments(ids, start="2024-02-01"):
+    return pd.DataFrame({
+        "txn_id": ids,
+        "ts": pd.date_range(start, periods=len(ids), freq="min").to_numpy().view("int64"),
+        "amount": [100.0] * len(ids),
+        "category": "Food",
+        "type": "debit",
+        "app": "Razorpay",
+        "description": "Stub merchant",
+    })
+
+
+def test_segments_show_up_in_loads_and_the_change_feed(data_dir):
+    old_version = store.store_version("alice")
+    df = store.load_transactions("alice")
+    store.append_segment(payments(["pay_1", "pay_2"]), "alice")
+    new_version = store.store_version("alice")
+    assert new_version != old_version
+
+    refreshed = store.refresh_transactions(df, "alice", old_version, new_version)
+    reloaded = store.load_transactions("alice")
+    assert list(refreshed["txn_id"]) == ["local-0", "local-1", "pay_1", "pay_2"]
+    pd.testing.assert_frame_equal(refreshed, reloaded, check_categorical=False)
+
+
+def test_partitions_are_private(data_dir):
+    store.append_segment(payments(["pay_1"]), "alice")
+    assert "pay_1" not in set(store.load_transactions("bob")["txn_id"])
+
+
+def test_compaction_folds_segments_and_forces_a_reload(data_dir):
+    for i in range(3):
+        store.append_segment(payments([f"pay_{i}"]), "alice")
+    old_version = store.store_version("alice")
+    assert store.compact("alice") == 3
+    new_version = store.store_version("alice")
+
+    assert store.segment_paths("alice") == []
+    assert store.appended_rows("alice", old_version, new_version) is None
+    assert list(store.load_transactions("alice")["txn_id"]) == ["local-0", "local-1", "pay_0", "pay_1", "pay_2"]
+
+
+def test_compact_if_needed_waits_for_enough_segments(data_dir, monkeypatch):
+    monkeypatch.setattr(store, "COMPACT_AFTER", 2)
+    store.append_segment(payments(["pay_0"]), "alice")
+    assert store.compact_if_needed("alice") == 0
+    store.append_segment(payments(["pay_1"]), "alice")
+    assert store.compact_if_needed("alice") == 2
+
+
+def test_duplicates_left_by_a_crash_are_dropped(data_dir):
+    # Compaction wrote payments.arrow but died before removing the segment
+    store.append_segment(payments(["pay_0", "pay_1"]), "alice")
+    store.compact("alice")
+    store.append_segment(payments(["pay_1", "pay_2"]), "alice")
+    assert list(store.load_transactions("alice")["txn_id"]) == ["local-0", "local-1", "pay_0", "pay_1", "pay_2"]
+
+
+def test_load_retries_when_compaction_removes_a_segment(data_dir, monkeypatch):
+    store.append_segment(payments(["pay_0"]), "alice")
+    store.append_segment(payments(["pay_1"]), "alice")
+    read_table = store.read_table
+    raced = []
+
+    def racing_read(path):
+        # The first segment read finds compaction has just run
+        if "seg-" in path and not raced:
+            raced.append(path)
+            monkeypatch.setattr(store, "read_table", read_table)
+            store.compact("alice")
+        return read_table(path)
+
+    monkeypatch.setattr(store, "read_table", racing_read)
+    df = store.load_transactions("alice")
+    assert raced
+    assert list(df["txn_id"]) == ["local-0", "local-1", "pay_0", "pay_1"]
+
+
+def test_change_feed_gives_up_on_a_compacted_segment(data_dir):
+    old_version = store.store_version("alice")
+    path = store.append_segment(payments(["pay_0"]), "alice")
+    new_version = store.store_version("alice")
+    store.os.remove(path)
+    assert store.appended_rows("alice", old_version, new_version) is None
@@ -0,0 +1,81 @@
+import io
+import os
+import pandas as pd
+import pytest
+import store
+import uploads
+
+
+@pytest.fixture(autouse=True)
+def users_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, "USERS_DIR", str(tmp_path / "users"))
+
+
+def csv_file(text):
+    # Streamlit hands uploads over as an in-memory buffer
+    return io.BytesIO(text.encode())
+
+
+def test_rows_are_parsed_into_the_store_schema():
+    summary = uploads.ingest_upload(csv_file(
+        "datetime,amount,category,type,description\n"
+        "05/03/2024 09:15,\"1,234.50\",Food,Expense,Lunch\n"
+        "06/03/2024 18:00,20,Travel,Expense,Cab\n"
+    ), "alice", "file-1")
+    assert summary["rows"] == 2 and summary["bad_rows"] == 0
+
+    df = uploads.load_upload("alice")
+    assert list(df["datetime"]) == [pd.Timestamp("2024-03-05 09:15"), pd.Timestamp("2024-03-06 18:00")]
+    assert list(df["amount"]) == [1234.5, 20.0]
+    assert list(df["category"]) == ["Food", "Travel"]
+    assert list(df["description"]) == ["Lunch", "Cab"]
+    assert list(df["app"]) == ["", ""]
+
+
+def test_bad_rows_are_reported_not_fatal():
+    summary = uploads.ingest_upload(csv_file(
+        "datetime,amount,category,type\n"
+        "2024-03-05,10,Food,Expense\n"
+        "not a date,10,Food,Expense\n"
+        "2024-03-06,ten,Food,Expense\n"
+        "2024-03-07,10,Food\n"
+        "2024-03-08,30,Food,Expense\n"
+    ), "alice", "file-1")
+    assert summary["rows"] == 2
+    assert summary["bad_rows"] == 3
+    reasons = sorted(entry["reason"] for entry in summary["report"])
+    assert reasons == ["expected 4 fields, saw 3", "unreadable amount", "unreadable datetime"]
+    assert list(uploads.load_upload("alice")["amount"]) == [10.0, 30.0]
+
+
+def test_small_blocks_grow_the_category_dictionary():
+    lines = [f"2024-03-{day:02d},{day},{'Food' if day < 20 else 'Rent'},Expense" for day in range(1, 29)]
+    summary = uploads.ingest_upload(csv_file("datetime,amount,category,type\n" + "\n".join(lines)),
+                                    "alice", "file-1", block_bytes=64)
+    assert summary["rows"] == 28
+    df = uploads.load_upload("alice")
+    assert list(df["category"]) == ["Food"] * 19 + ["Rent"] * 9
+    assert df["txn_id"].is_unique
+
+
+def test_missing_columns_are_rejected():
+    with pytest.raises(uploads.UploadError, match="amount"):
+        uploads.ingest_upload(csv_file("datetime,category,type\n2024-03-05,Food,Expense\n"), "alice", "file-1")
+
+
+def test_file_without_readable_rows_leaves_nothing_behind():
+    with pytest.raises(uploads.UploadError):
+        uploads.ingest_upload(csv_file("datetime,amount,category,type\nnever,10,Food,Expense\n"), "alice", "file-1")
+    assert os.listdir(store.partition_dir("alice")) == []
+
+
+def test_ensure_upload_parses_each_file_once():
+    first = uploads.ensure_upload(csv_file("datetime,amount,category,type\n2024-03-05,10,Food,Expense\n"),
+                                  "alice", "file-1")
+    version = uploads.upload_version("alice")
+    again = uploads.ensure_upload(csv_file("garbage"), "alice", "file-1")
+    assert again == first
+    assert uploads.upload_version("alice") == version
+
+    uploads.ensure_upload(csv_file("datetime,amount,category,type\n2024-04-01,99,Rent,Expense\n"), "alice", "file-2")
+    assert list(uploads.load_upload("alice")["amount"]) == [99.0]
@@ -0,0 +1,211 @@
+import csv
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import store
+
+# --- STREAMING CSV UPLOADS --- #
+# An upload is validated on its header line, then streamed through Arrow's
+# CSV reader in fixed-size blocks with every column read as text and
+# converted explicitly (fixed-format strptime for timestamps, a numeric
+# pattern check before casting amounts). Each block is appended to the
+# user's upload dataset (data/users/<user>/upload.arrow) as soon as it is
+# parsed, so memory stays bounded by the block size however big the file
+# is. Rows that fail to parse are counted and sampled into a report
+# instead of aborting the upload.
+REQUIRED_COLUMNS = ["datetime", "amount", "category", "type"]
+OPTIONAL_COLUMNS = ["description", "app"]
+# Arrow's reader reads a few dozen blocks ahead, so the block size sets the
+# memory ceiling (about 40 MB at 1 MB blocks)
+BLOCK_BYTES = 1 << 20
+REPORT_ROWS = 1000
+# Tried in order against the first timestamp; the winner parses every block
+DATETIME_FORMATS = [
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d",
+    "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y", "%d-%m-%Y %H:%M:%S", "%d-%m-%Y",
+]
+AMOUNT_PATTERN = r"^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$"
+
+
+class UploadError(ValueError):
+    pass
+
+
+def upload_path(user):
+    return os.path.join(store.partition_dir(user), "upload.arrow")
+
+
+def report_path(user):
+    return os.path.join(store.partition_dir(user), "upload.json")
+
+
+def upload_version(user):
+    path = upload_path(user)
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+
+
+def _input_stream(file):
+    # Arrow pulls whole-file reads through Python file objects, so give it a
+    # native stream: a path, or a zero-copy view of an in-memory upload
+    if isinstance(file, (str, os.PathLike)):
+        return pa.input_stream(file)
+    if hasattr(file, "getbuffer"):
+        return pa.BufferReader(pa.py_buffer(file.getbuffer()))
+    return file
+
+
+def read_header(file):
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            first = f.readline()
+    else:
+        first = file.readline()
+        file.seek(0)
+    if isinstance(first, bytes):
+        first = first.decode("utf-8-sig", errors="replace")
+    header = next(csv.reader([first]), [])
+    missing = [col for col in REQUIRED_COLUMNS if col not in header]
+    if missing:
+        raise UploadError(f"Missing required column(s): {', '.join(missing)}.")
+    return header
+
+
+def detect_datetime_format(values):
+    sample = next((v.strip() for v in values if v and v.strip()), None)
+    for fmt in DATETIME_FORMATS:
+        try:
+            datetime.strptime(sample, fmt)
+            return fmt
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def parse_datetimes(values, fmt):
+    values = pc.utf8_trim_whitespace(values)
+    if fmt is not None:
+        return pc.strptime(values, format=fmt, unit="ns", error_is_null=True)
+    # Unrecognised layout: slow per-value parsing
+    parsed = pd.to_datetime(values.to_pandas(), format="mixed", errors="coerce")
+    return pa.array(parsed.to_numpy(dtype="datetime64[ns]"), mask=parsed.isna().to_numpy())
+
+
+def parse_amounts(values):
+    # "1,234.50" style thousands separators are accepted
+    values = pc.replace_substring(pc.utf8_trim_whitespace(values), ",", "")
+    valid = pc.match_substring_regex(values, AMOUNT_PATTERN)
+    return pc.cast(pc.if_else(valid, values, pa.scalar(None, pa.string())), pa.float64())
+
+
+def encode(values, known):
+    # Dictionaries may only grow between batches of an Arrow file, so new
+    # values are appended to the running dictionary
+    values = pc.utf8_trim_whitespace(values)
+    seen = set(known)
+    known.extend(v for v in pc.unique(values).to_pylist() if v not in seen)
+    dictionary = pa.array(known, pa.string())
+    return pa.DictionaryArray.from_arrays(pc.cast(pc.index_in(values, value_set=dictionary), pa.int32()), dictionary)
+
+
+def ingest_upload(file, user, file_id=None, block_bytes=BLOCK_BYTES):
+    header = read_header(file)
+    columns = [col for col in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if col in header]
+    upload_id = hashlib.sha1(str(file_id or time.time_ns()).encode()).hexdigest()[:8]
+    path = upload_path(user)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+
+    report = []
+    bad = 0
+
+    def skip_row(row):
+        nonlocal bad
+        bad += 1
+        if len(report) < REPORT_ROWS:
+            reason = f"expected {row.expected_columns} fields, saw {row.actual_columns}"
+            report.append({"line": row.number, "reason": reason, "values": row.text})
+        return "skip"
+
+    reader = pacsv.open_csv(
+        _input_stream(file),
+        read_options=pacsv.ReadOptions(block_size=block_bytes),
+        parse_options=pacsv.ParseOptions(invalid_row_handler=skip_row),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=columns,
+            column_types={col: pa.string() for col in columns},
+            strings_can_be_null=False,
+        ),
+    )
+    rows = read = 0
+    datetime_format = None
+    known = {"category": [], "type": []}
+    options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, store.SCHEMA, options=options) as writer:
+        for batch in reader:
+            if datetime_format is None:
+                datetime_format = detect_datetime_format(batch.column("datetime").to_pylist()[:100])
+            ts = parse_datetimes(batch.column("datetime"), datetime_format)
+            amount = parse_amounts(batch.column("amount"))
+            good = pc.and_(pc.is_valid(ts), pc.is_valid(amount))
+            failed = len(batch) - pc.sum(good).as_py() if len(batch) else 0
+            if failed:
+                bad += failed
+                if len(report) < REPORT_ROWS:
+                    positions = pc.indices_nonzero(pc.invert(good)).to_pylist()[:REPORT_ROWS - len(report)]
+                    sample = batch.take(positions).to_pylist()
+                    for position, values in zip(positions, sample):
+                        reason = "unreadable datetime" if not ts[position].is_valid else "unreadable amount"
+                        report.append({"row": read + position + 1, "reason": reason, "values": ", ".join(values.values())})
+                batch, ts, amount = batch.filter(good), ts.filter(good), amount.filter(good)
+            read += len(good)
+            n = len(batch)
+            ids = pc.cast(pa.array(range(rows, rows + n), pa.int64()), pa.string())
+            empty = pa.repeat(pa.scalar("", pa.string()), n)
+            writer.write_batch(pa.RecordBatch.from_arrays([
+                pc.binary_join_element_wise(f"upload-{upload_id}-", ids, ""),
+                pc.cast(ts, pa.int64()),
+                amount,
+                encode(batch.column("category"), known["category"]),
+                encode(batch.column("type"), known["type"]),
+                batch.column("app") if "app" in columns else empty,
+                batch.column("description") if "description" in columns else empty,
+            ], schema=store.SCHEMA))
+            rows += n
+    if not rows:
+        os.remove(tmp_path)
+        raise UploadError("No readable rows in the file.")
+
+    os.replace(tmp_path, path)
+    summary = {"file_id": file_id, "rows": rows, "bad_rows": bad, "report": report, "at": time.time()}
+    tmp_report = report_path(user) + ".tmp"
+    with open(tmp_report, "w") as f:
+        json.dump(summary, f)
+    os.replace(tmp_report, report_path(user))
+    return summary
+
+
+def load_report(user):
+    try:
+        with open(report_path(user)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def ensure_upload(file, user, file_id):
+    # Re-parse only when a different file is selected
+    summary = load_report(user)
+    if summary is None or summary.get("file_id") != file_id or not os.path.exists(upload_path(user)):
+        summary = ingest_upload(file, user, file_id)
+    return summary
+
+
+def load_upload(user):
+    df = store.to_frame(store.read_table(upload_path(user)))
+    return store.apply_tags(df, store.load_tags(user))
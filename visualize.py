@@ -2,52 +2,88 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
+from functools import lru_cache
 
 # Apply Seaborn theme
 sns.set(style="whitegrid")
 
-# Load and clean data
-df = pd.read_csv("mock_transactions.csv")
-df['date'] = pd.to_datetime(df['date'])
-df['month'] = df['date'].dt.to_period('M').astype(str)
-df['week'] = df['date'].dt.strftime('%G-W%V')
+# Load and clean data (on first use, so importing this module stays cheap)
+@lru_cache(maxsize=1)
+def load_data():
+    df = pd.read_csv("mock_transactions.csv")
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+# --- AGGREGATES --- #
+# Plot inputs from any frame with date, category and amount columns: the
+# sample CSV above, or a user's ledger (see reports.py)
+def week_start(day):
+    day = pd.Timestamp(day).normalize()
+    return day - pd.Timedelta(days=day.weekday())
+
+def monthly_totals(df):
+    month = df['date'].dt.to_period('M').rename('month')
+    monthly = df.groupby(month)['amount'].sum().reset_index()
+    monthly['month'] = monthly['month'].astype(str)
+    return monthly
+
+def week_by_category(df, week=None):
+    start = week_start(week if week is not None else datetime.now())
+    in_week = (df['date'] >= start) & (df['date'] < start + pd.Timedelta(days=7))
+    return df[in_week].groupby('category', observed=True)['amount'].sum()
+
+def category_totals(df):
+    totals = df.groupby('category', observed=True)['amount'].sum().sort_values(ascending=False)
+    return totals.reset_index()
+
+# --- DRAWING --- #
+# Each draws into the axes it is given, so one figure can be cleared and
+# redrawn for many datasets
+def draw_monthly_trend(ax, monthly, title="📈 Monthly Spending Trend"):
+    sns.lineplot(data=monthly, x='month', y='amount', marker='o', color='royalblue', ax=ax)
+    ax.set_title(title, fontsize=14)
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Total Spending (₹)")
+    ax.tick_params(axis='x', labelrotation=45)
+
+def draw_weekly_pie(ax, pie_data, title):
+    pie_data.plot(kind='pie', ax=ax, autopct='%1.1f%%', startangle=140, colors=sns.color_palette('pastel'))
+    ax.set_title(title)
+    ax.set_ylabel("")
+
+def draw_category_spending(ax, category_data, title="📊 Total Spending by Category"):
+    sns.barplot(data=category_data, x='amount', y='category', hue='category', palette='viridis', legend=False, ax=ax)
+    ax.set_title(title, fontsize=14)
+    ax.set_xlabel("Total Amount (₹)")
+    ax.set_ylabel("Category")
 
 # Line Chart – Monthly Spending Trend
-def plot_monthly_trend():
-    monthly = df.groupby('month')['amount'].sum().reset_index()
-    plt.figure(figsize=(10, 5))
-    sns.lineplot(data=monthly, x='month', y='amount', marker='o', color='royalblue')
-    plt.title("📈 Monthly Spending Trend", fontsize=14)
-    plt.xlabel("Month")
-    plt.ylabel("Total Spending (₹)")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+def plot_monthly_trend(df=None):
+    df = load_data() if df is None else df
+    fig, ax = plt.subplots(figsize=(10, 5))
+    draw_monthly_trend(ax, monthly_totals(df))
+    fig.tight_layout()
     plt.show()
 
 # Pie Chart – This Week's Spending by Category
-def plot_weekly_pie():
+def plot_weekly_pie(df=None):
+    df = load_data() if df is None else df
     current_week = datetime.now().strftime('%G-W%V')
-    weekly_df = df[df['week'] == current_week]
-    if weekly_df.empty:
+    pie_data = week_by_category(df)
+    if pie_data.empty:
         print("⚠️ No transactions for this week.")
         return
-    pie_data = weekly_df.groupby('category')['amount'].sum()
-    plt.figure(figsize=(6, 6))
-    pie_data.plot(kind='pie', autopct='%1.1f%%', startangle=140, colors=sns.color_palette('pastel'))
-    plt.title(f"🧁 Spending by Category – {current_week}")
-    plt.ylabel("")
-    plt.tight_layout()
+    fig, ax = plt.subplots(figsize=(6, 6))
+    draw_weekly_pie(ax, pie_data, f"🧁 Spending by Category – {current_week}")
+    fig.tight_layout()
     plt.show()
 
 # Bar Chart – Total Spent per Category (All Time)
-def plot_category_spending():
-    category_data = df.groupby('category')['amount'].sum().sort_values(ascending=False).reset_index()
-    plt.figure(figsize=(8, 5))
-    sns.barplot(data=category_data, x='amount', y='category', palette='viridis')
-    plt.title("📊 Total Spending by Category", fontsize=14)
-    plt.xlabel("Total Amount (₹)")
-    plt.ylabel("Category")
-    plt.tight_layout()
+def plot_category_spending(df=None):
+    df = load_data() if df is None else df
+    fig, ax = plt.subplots(figsize=(8, 5))
+    draw_category_spending(ax, category_totals(df))
+    fig.tight_layout()
     plt.show()
 
 # Run visualizations